@@ -0,0 +1,48 @@
+"""Registry of landmark pages, the pages other pages link to by type.
+
+Finding a page by type scans the whole page tree, so each landmark is looked
+up once and kept in the cache until a page is published, unpublished, moved or
+deleted, see :mod:`apps.cms.wagtail_hooks`.
+"""
+from django.core.cache import cache
+from wagtail.models import Page
+from .models import CollectionsPage, HomePage, VolumesPage
+
+LANDMARKS = {
+    "collections": CollectionsPage,
+    "volumes": VolumesPage,
+    "home": HomePage,
+}
+
+
+def landmark_cache_key(name):
+    """Cache key for a landmark page.
+
+    :param name: Name of the landmark in `LANDMARKS`
+    :type name: str
+    :return: Cache key
+    :rtype: str
+    """
+    return f"cms-landmark-{name}"
+
+
+def landmark_page(name):
+    """First page of the landmark's type, as `Page.objects.type(...).first()`.
+
+    :param name: Name of the landmark in `LANDMARKS`
+    :type name: str
+    :return: The page or None if there is none
+    :rtype: wagtail.models.Page
+    """
+    key = landmark_cache_key(name)
+    page = cache.get(key)
+    if page is None:
+        # Store False for a missing page so the miss is cached too.
+        page = Page.objects.type(LANDMARKS[name]).first() or False
+        cache.set(key, page, None)
+    return page or None
+
+
+def invalidate_landmark_pages():
+    """Drop every cached landmark page."""
+    cache.delete_many([landmark_cache_key(name) for name in LANDMARKS])
@@ -339,6 +339,8 @@ class HomePage(Page):
     def get_context(self, request):
         """Function that returns context"""
         context = super().get_context(request)
-        context['volumesurl'] = Page.objects.type(VolumesPage).first()
-        context['collectionsurl'] = Page.objects.type(CollectionsPage).first()
+        # pylint: disable = import-outside-toplevel
+        from .landmarks import landmark_page
+        context['volumesurl'] = landmark_page('volumes')
+        context['collectionsurl'] = landmark_page('collections')
         return context
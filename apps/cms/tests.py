@@ -1,3 +1,23 @@
+from django.core.cache import cache
 from django.test import TestCase
+from wagtail.models import Page
+from .landmarks import landmark_page
+from .models import CollectionsPage
 
-# Create your tests here.
+
+class LandmarkPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_landmark_page_is_cached_until_published(self):
+        assert landmark_page("collections") is None
+        with self.assertNumQueries(0):
+            assert landmark_page("collections") is None
+
+        collections = CollectionsPage(title="Collections", slug="landmark-collections")
+        Page.objects.get(depth=1).add_child(instance=collections)
+        collections.save_revision().publish()
+
+        assert landmark_page("collections").pk == collections.pk
+        with self.assertNumQueries(0):
+            assert landmark_page("collections").pk == collections.pk
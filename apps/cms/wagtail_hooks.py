@@ -1,8 +1,11 @@
-"""Add custom .css hook"""
+"""Add custom .css hook and keep the landmark pages current."""
 from django.templatetags.static import static
 from django.utils.html import format_html
 
 from wagtail import hooks
+from wagtail.signals import page_published, page_unpublished
+
+from .landmarks import invalidate_landmark_pages
 
 
 # Register a custom css file for the wagtail admin.
@@ -10,3 +13,20 @@ from wagtail import hooks
 def global_admin_css():
     """Add /static/css/wagtail.css."""
     return format_html('<link rel="stylesheet" href="{}">', static("css/wagtail.css"))
+
+
+@hooks.register("after_create_page")
+@hooks.register("after_delete_page")
+@hooks.register("after_move_page")
+def clear_landmark_pages(request, page):  # pylint: disable = unused-argument
+    """Landmarks are found by their place in the page tree, so drop them when it changes."""
+    invalidate_landmark_pages()
+
+
+def clear_landmark_pages_on_publish(sender, **kwargs):  # pylint: disable = unused-argument
+    """Drop the landmarks when a page is published or unpublished, in or out of the admin."""
+    invalidate_landmark_pages()
+
+
+page_published.connect(clear_landmark_pages_on_publish)
+page_unpublished.connect(clear_landmark_pages_on_publish)
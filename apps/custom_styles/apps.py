@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CustomStylesConfig(AppConfig):
     name = 'apps.custom_styles'
+
+    def ready(self):
+        from . import signals  # noqa F401 pylint: disable = import-outside-toplevel, unused-import
@@ -0,0 +1,66 @@
+"""Cache of the active style's CSS.
+
+The CSS and its fingerprint are kept in the shared cache until a
+:class:`Style` is saved or deleted, see :mod:`apps.custom_styles.signals`.
+Each process also keeps the CSS in memory for up to
+`settings.CUSTOM_STYLE_PROCESS_TIMEOUT` seconds, but only uses it while its
+fingerprint matches the shared one, so every process switches to a new style
+at once.
+"""
+from hashlib import md5
+from time import monotonic
+from django.conf import settings
+from django.core.cache import cache
+
+ACTIVE_CSS_KEY = 'custom-style-active-css'
+ACTIVE_CSS_FINGERPRINT_KEY = 'custom-style-active-css-fingerprint'
+
+_active_css = None
+_active_css_fingerprint = None
+_active_css_at = None
+
+
+def get_active_css():
+    """CSS of the active style, or an empty string when no style is active.
+
+    :rtype: str
+    """
+    global _active_css, _active_css_fingerprint, _active_css_at  # pylint: disable = global-statement
+    now = monotonic()
+    fingerprint = cache.get(ACTIVE_CSS_FINGERPRINT_KEY)
+    if (
+        _active_css is not None
+        and fingerprint == _active_css_fingerprint
+        and now - _active_css_at < settings.CUSTOM_STYLE_PROCESS_TIMEOUT
+    ):
+        return _active_css
+
+    css = cache.get(ACTIVE_CSS_KEY)
+    if css is None:
+        from .models import Style  # pylint: disable = import-outside-toplevel
+        active_style = Style.objects.filter(active=True).first()
+        css = active_style.css if active_style else ''
+        cache.set(ACTIVE_CSS_KEY, css, None)
+    if fingerprint != css_fingerprint(css):
+        fingerprint = css_fingerprint(css)
+        cache.set(ACTIVE_CSS_FINGERPRINT_KEY, fingerprint, None)
+
+    _active_css, _active_css_fingerprint, _active_css_at = css, fingerprint, now
+    return css
+
+
+def invalidate_active_css():
+    """Drop the cached CSS. Called when a style is saved or deleted."""
+    global _active_css  # pylint: disable = global-statement
+    _active_css = None
+    cache.delete_many([ACTIVE_CSS_KEY, ACTIVE_CSS_FINGERPRINT_KEY])
+
+
+def css_fingerprint(css):
+    """Short digest of the CSS used in its URL, so browsers can cache it forever.
+
+    :param css: CSS of a style
+    :type css: str
+    :rtype: str
+    """
+    return md5(css.encode('utf-8')).hexdigest()[:12]
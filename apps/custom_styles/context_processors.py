@@ -1,22 +1,25 @@
 """Exposes the custom style to the base template."""
-from .models import Style
 from django.conf import settings
+from django.urls import reverse
+from .cache import css_fingerprint, get_active_css
 
 def add_custom_style(request):
-    """Return user defined CSS.
+    """Return user defined CSS and the fingerprinted URL it is served at.
 
     :param request: Current Request
     :type request: django.HttpRequest
     :return: CSS from active style.
     :rtype: str
     """
-    try:
-        active_style = Style.objects.get(active=True)
-        if active_style:
-            return {'css': active_style.css}
-    except Style.DoesNotExist:
-        pass
-    return {'css': ''}
+    css = get_active_css()
+    if not css:
+        return {'css': '', 'custom_style_url': ''}
+    return {
+        'css': css,
+        'custom_style_url': reverse(
+            'custom_style_css', kwargs={'fingerprint': css_fingerprint(css)}
+        ),
+    }
 
 def background_image_url(request):
     """
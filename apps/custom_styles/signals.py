@@ -0,0 +1,12 @@
+"""Signals to keep the cached active style current."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_active_css
+from .models import Style
+
+
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def style_changed(sender, **kwargs):  # pylint: disable = unused-argument
+    """Drop the cached CSS when any style is saved or deleted."""
+    invalidate_active_css()
@@ -1,8 +1,11 @@
 # pylint: disable = no-self-use
 """Testcases for CustomStyles"""
+from time import monotonic
 import pytest
 from django.test import TestCase, RequestFactory
+from django.urls import reverse
 from .factories import StyleFactory
+from .. import cache as style_cache
 from ..context_processors import add_custom_style
 from ..models import Style
 
@@ -97,3 +100,60 @@ class TestCustomStyle(TestCase):
         Style.objects.get(active=True).delete()
         style = StyleFactory.create()
         assert style.active
+
+    def test_style_context_is_cached(self):
+        """
+        The active style is only looked up once, until a style is saved.
+        """
+        style = StyleFactory.create(primary_color='#00000', active=True)
+        req = RequestFactory()
+        add_custom_style(req)
+        with self.assertNumQueries(0):
+            context_css = add_custom_style(req)
+        assert context_css['css'] == ':root{--link-color:#00000;}'
+        style.primary_color = '#11111'
+        style.save()
+        assert add_custom_style(req)['css'] == ':root{--link-color:#11111;}'
+
+    def test_custom_style_css_url(self):
+        """
+        The active style is served at a URL that changes with the CSS.
+        """
+        StyleFactory.create(primary_color='#00000', active=True)
+        url = add_custom_style(RequestFactory())['custom_style_url']
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/css'
+        assert 'immutable' in response['Cache-Control']
+        assert response.content.decode() == ':root{--link-color:#00000;}'
+        stale = reverse('custom_style_css', kwargs={'fingerprint': 'stale'})
+        assert self.client.get(stale).status_code == 404
+
+    def test_custom_style_css_is_linked(self):
+        """
+        Pages link the active style's stylesheet.
+        """
+        StyleFactory.create(primary_color='#00000', active=True)
+        url = add_custom_style(RequestFactory())['custom_style_url']
+        response = self.client.get('/no-such-page/')
+        self.assertContains(
+            response, f'<link rel="stylesheet" href="{url}" />', status_code=404
+        )
+
+    def test_other_processes_switch_styles_at_once(self):
+        """
+        A process holding the old CSS serves the new style once it is saved elsewhere.
+        """
+        style = StyleFactory.create(primary_color='#00000', active=True)
+        old_css = style_cache.get_active_css()
+        old_fingerprint = style_cache.css_fingerprint(old_css)
+        style.primary_color = '#11111'
+        style.save()
+        # what another worker still holds in memory
+        style_cache._active_css = old_css  # pylint: disable = protected-access
+        style_cache._active_css_fingerprint = old_fingerprint  # pylint: disable = protected-access
+        style_cache._active_css_at = monotonic()  # pylint: disable = protected-access
+
+        url = add_custom_style(RequestFactory())['custom_style_url']
+        assert old_fingerprint not in url
+        assert self.client.get(url).content.decode() == ':root{--link-color:#11111;}'
@@ -0,0 +1,11 @@
+"""URL patterns for custom styles"""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path(
+        'custom-style/<fingerprint>.css',
+        views.custom_style_css,
+        name='custom_style_css'
+    ),
+]
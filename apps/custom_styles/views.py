@@ -0,0 +1,23 @@
+"""Serve the active style as a stylesheet."""
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from .cache import css_fingerprint, get_active_css
+
+
+def custom_style_css(request, fingerprint):  # pylint: disable = unused-argument
+    """Active style's CSS. The URL changes with the CSS so it is cached for a year.
+
+    :param request: Current Request
+    :type request: django.HttpRequest
+    :param fingerprint: Fingerprint of the CSS the page was rendered with
+    :type fingerprint: str
+    :raises Http404: If the fingerprint is not the active style's
+    :return: CSS response
+    :rtype: django.http.HttpResponse
+    """
+    css = get_active_css()
+    if not css or fingerprint != css_fingerprint(css):
+        raise Http404('Style not found')
+    response = HttpResponse(css, content_type='text/css')
+    patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    return response
@@ -0,0 +1,171 @@
+"""Caches for Jekyll site exports.
+
+The Jekyll theme is extracted once per worker process and copied for each
+export, see :func:`jekyll_theme_dir`.
+
+Generated sites are stored on disk under `settings.EXPORT_CACHE_DIR`, named
+after a digest of everything that goes into them, see :func:`export_revision`.
+An export of an unchanged volume with unchanged annotations copies the stored
+site instead of running the IIIF export and the Jekyll import script again.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from hashlib import sha256
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from apps.iiif.annotations.models import Annotation
+from apps.iiif.canvases.models import Canvas
+from apps.readux import __version__
+from apps.readux.models import UserAnnotation
+
+LOGGER = logging.getLogger(__name__)
+
+_theme_dirs = {}
+_theme_lock = threading.Lock()
+
+
+def jekyll_theme_dir(theme_zip):
+    """Directory the Jekyll theme is extracted to, extracting it on first use.
+
+    :param theme_zip: Path to the zipped theme
+    :type theme_zip: str
+    :return: System path for the extracted theme
+    :rtype: str
+    """
+    key = (theme_zip, os.path.getmtime(theme_zip))
+    with _theme_lock:
+        theme_dir = _theme_dirs.get(key)
+        if theme_dir is None or not os.path.isdir(theme_dir):
+            theme_dir = tempfile.mkdtemp(prefix="tmp-rdx-theme")
+            with zipfile.ZipFile(theme_zip, "r") as jekyllzip:
+                jekyllzip.extractall(theme_dir)
+            _theme_dirs[key] = theme_dir
+        return theme_dir
+
+
+def export_revision(manifest, version, owners, no_deep_zoom):
+    """Digest identifying the content of an export.
+
+    Covers the manifest's `modified_at`, the number of canvases and when one
+    last changed, and, for the OCR and each annotation owner, the number of
+    their annotations on the volume and when they last changed one, so adding,
+    editing or deleting a canvas or an annotation changes the revision.
+
+    :param manifest: Manifest to be exported
+    :type manifest: apps.iiif.manifests.models.Manifest
+    :param version: IIIF API version
+    :type version: str
+    :param owners: List of annotation owner ids
+    :type owners: list
+    :param no_deep_zoom: True when deep zoom is excluded
+    :type no_deep_zoom: bool
+    :return: Hex digest
+    :rtype: str
+    """
+    user_annotations = (
+        UserAnnotation.objects.filter(canvas__manifest=manifest, owner__in=owners or [])
+        .values("owner")
+        .annotate(latest=Max("modified_at"), count=Count("id"))
+        .order_by("owner")
+    )
+    annotations = (
+        Annotation.objects.filter(canvas__manifest=manifest)
+        .filter(Q(owner__username="ocr") | Q(owner__in=owners or []))
+        .values("owner")
+        .annotate(latest=Max("modified_at"), count=Count("id"))
+        .order_by("owner")
+    )
+    canvases = Canvas.objects.filter(manifest=manifest).aggregate(
+        latest=Max("modified_at"), count=Count("id")
+    )
+    content = {
+        "readux": __version__,
+        "manifest": manifest.pid,
+        "modified_at": manifest.modified_at,
+        "version": version,
+        "no_deep_zoom": no_deep_zoom,
+        "owners": sorted(str(owner) for owner in owners or []),
+        "canvases": canvases,
+        "annotations": list(annotations),
+        "user_annotations": list(user_annotations),
+    }
+    return sha256(
+        json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def cached_export_path(revision):
+    """Path a generated site is stored at.
+
+    :param revision: Digest from :func:`export_revision`
+    :type revision: str
+    :rtype: str
+    """
+    return os.path.join(settings.EXPORT_CACHE_DIR, revision)
+
+
+def copy_cached_export(revision, edition_dir):
+    """Copy a stored site to `edition_dir`.
+
+    :param revision: Digest from :func:`export_revision`
+    :type revision: str
+    :param edition_dir: System path to copy the site to
+    :type edition_dir: str
+    :return: True if a fresh stored site was copied
+    :rtype: bool
+    """
+    if not settings.EXPORT_CACHE_TIMEOUT:
+        return False
+    cached = cached_export_path(revision)
+    try:
+        if time.time() - os.path.getmtime(cached) > settings.EXPORT_CACHE_TIMEOUT:
+            return False
+        shutil.copytree(cached, edition_dir)
+    except (OSError, shutil.Error):
+        # Not stored, or pruned while copying.
+        shutil.rmtree(edition_dir, ignore_errors=True)
+        return False
+    LOGGER.debug("Reusing stored export %s", revision)
+    return True
+
+
+def store_export(revision, edition_dir):
+    """Store a generated site and prune stored sites that have expired.
+
+    The site is copied next to its final path and renamed into place, so
+    concurrent exports never see a partial copy.
+
+    :param revision: Digest from :func:`export_revision`
+    :type revision: str
+    :param edition_dir: System path of the generated site
+    :type edition_dir: str
+    """
+    if not settings.EXPORT_CACHE_TIMEOUT:
+        return
+    os.makedirs(settings.EXPORT_CACHE_DIR, exist_ok=True)
+    prune_exports()
+    staging = tempfile.mkdtemp(prefix=".tmp-", dir=settings.EXPORT_CACHE_DIR)
+    try:
+        shutil.copytree(edition_dir, os.path.join(staging, revision))
+        os.rename(os.path.join(staging, revision), cached_export_path(revision))
+    except OSError:
+        # Another worker stored the same revision first.
+        pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def prune_exports():
+    """Remove stored sites older than `settings.EXPORT_CACHE_TIMEOUT`."""
+    expired = time.time() - settings.EXPORT_CACHE_TIMEOUT
+    with os.scandir(settings.EXPORT_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.stat().st_mtime < expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -27,12 +27,19 @@ from git.cmd import Git
 from yaml import load, safe_dump
 from django.conf import settings
 from django.core.mail import send_mail
-from django.core.serializers import serialize
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.template.loader import get_template
+from apps.iiif.annotations.models import Annotation
+from apps.iiif.canvases.models import Canvas
+from apps.iiif.serializers.annotation_list import PREFETCHED_ANNOTATIONS
+from apps.iiif.serializers.base import iter_chunks, serialize_to_dicts
+from apps.readux.models import annotations_by_canvas
 from apps.users.models import User
 from apps.readux import __version__
 import digitaledition_jekylltheme
 import config.settings.local as settings
+from .cache import copy_cached_export, export_revision, jekyll_theme_dir, store_export
 from .github import GithubApi, GithubAccountNotFound
 
 
@@ -58,15 +65,43 @@ class ExportException(Exception):
     pass
 
 
+class ZipStream(io.RawIOBase):
+    """Unseekable file object that holds what a zip file wrote until it is drained.
+
+    :class:`zipfile.ZipFile` writes data descriptors instead of seeking back
+    when its file object cannot seek, so entries can be sent as they are written.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        """Return, and forget, everything written since the last drain.
+
+        :rtype: bytes
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
 class IiifManifestExport:
     """Manifest Export
 
-    :return: Return bytes containing the entire contents of the buffer.
-    :rtype: bytes
+    Entries are written to the zip file one at a time, so an export only holds
+    one chunk of canvases and their annotations in memory.
     """
 
     @classmethod
-    def get_zip(self, manifest, version, owners=[]):
+    def get_zip(cls, manifest, version, owners=[]):
         """Generate zipfile of manifest.
 
         :param manifest: Manifest to be exported.
@@ -78,15 +113,134 @@ class IiifManifestExport:
         :return: Return bytes containing the entire contents of the buffer.
         :rtype: bytes
         """
-        # zip_subdir = manifest.label
-        # zip_filename = "iiif_export.zip"
-
-        # Open BytesIO to grab in-memory ZIP contents
         byte_stream = io.BytesIO()
+        cls.write_zip(manifest, version, byte_stream, owners=owners)
+        return byte_stream.getvalue()
+
+    @classmethod
+    def write_zip(cls, manifest, version, fileobj, owners=[]):
+        """Write the export to a file, e.g. a temporary file on disk.
 
-        # The zip compressor
-        zip_file = zipfile.ZipFile(byte_stream, "w")
+        :param manifest: Manifest to be exported.
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param version: IIIF API version to use.
+        :type version: str
+        :param fileobj: Path or binary file object to write the zip file to.
+        :type fileobj: str or file object
+        :param owners: List of annotation owners, defaults to []
+        :type owners: list, optional
+        """
+        with zipfile.ZipFile(fileobj, "w") as zip_file:
+            for _ in cls.write_entries(zip_file, manifest, version, owners):
+                pass
 
+    @classmethod
+    def stream_zip(cls, manifest, version, owners=[]):
+        """Generate the export as chunks of bytes for a streaming response.
+
+        :param manifest: Manifest to be exported.
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param version: IIIF API version to use.
+        :type version: str
+        :param owners: List of annotation owners, defaults to []
+        :type owners: list, optional
+        :return: Chunks of the zip file, one or more entries each.
+        :rtype: generator
+        """
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, "w") as zip_file:
+            for _ in cls.write_entries(zip_file, manifest, version, owners):
+                yield stream.drain()
+        yield stream.drain()
+
+    @classmethod
+    def write_entries(cls, zip_file, manifest, version, owners):
+        """Write the README, manifest and annotation lists to `zip_file`.
+
+        Canvases are fetched in chunks with their OCR annotations prefetched,
+        and every owner's annotations are fetched in one grouped query, so the
+        number of queries does not grow with each page or owner.
+
+        :param zip_file: Zip file open for writing.
+        :type zip_file: zipfile.ZipFile
+        :param manifest: Manifest to be exported.
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param version: IIIF API version to use.
+        :type version: str
+        :param owners: List of annotation owners
+        :type owners: list
+        :return: Yields after each entry is written.
+        :rtype: generator
+        """
+        annotations, annotation_owners = cls.write_metadata(
+            zip_file, manifest, version, owners
+        )
+        yield
+
+        # Then write the OCR and user annotations, a chunk of canvases at a time
+        listed_annotations = Annotation.objects.filter(
+            Q(owner__username="ocr") | Q(owner__in=owners)
+        ).select_related("owner", "canvas__manifest")
+        canvases = Canvas.objects.filter(manifest=manifest).select_related("manifest")
+        for chunk in iter_chunks(canvases):
+            prefetch_related_objects(
+                chunk,
+                Prefetch(
+                    "annotation_set",
+                    queryset=listed_annotations,
+                    to_attr=PREFETCHED_ANNOTATIONS,
+                ),
+            )
+            for canvas in chunk:
+                if getattr(canvas, PREFETCHED_ANNOTATIONS):
+                    cls.write_annotation_list(
+                        zip_file,
+                        serialize_to_dicts(
+                            "annotation_list", [canvas], version=version, owners=owners
+                        )[0],
+                    )
+
+                # then each owner's annotations, from the grouped query
+                for owner in annotation_owners.get(canvas.id, []):
+                    setattr(
+                        canvas,
+                        PREFETCHED_ANNOTATIONS,
+                        [
+                            annotation
+                            for annotation in annotations[canvas.id]
+                            if annotation.owner_id == owner.id
+                        ],
+                    )
+                    cls.write_annotation_list(
+                        zip_file,
+                        serialize_to_dicts(
+                            "user_annotation_list",
+                            [canvas],
+                            version=version,
+                            is_list=False,
+                            owners=[owner],
+                        )[0],
+                    )
+                delattr(canvas, PREFETCHED_ANNOTATIONS)
+            yield
+
+    @classmethod
+    def write_metadata(cls, zip_file, manifest, version, owners):
+        """Write the README and manifest, which carry the export date and the
+        annotators, to `zip_file`.
+
+        :param zip_file: Zip file open for writing.
+        :type zip_file: zipfile.ZipFile
+        :param manifest: Manifest to be exported.
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param version: IIIF API version to use.
+        :type version: str
+        :param owners: List of annotation owners
+        :type owners: list
+        :return: The owners' annotations by canvas id, and the owners with
+            annotations on each canvas
+        :rtype: tuple
+        """
         # First write basic human-readable metadata
         # Annotated edition from {grab site identity/version of Readux} at {grab site URL}
         # volume title
@@ -105,10 +259,25 @@ class IiifManifestExport:
         page_count = manifest.canvas_set.count()
         now = datetime.utcnow()
         readux_url = settings.HOSTNAME
-        annotators = User.objects.filter(
-            userannotation__canvas__manifest__id=manifest.id
-        ).distinct()
-        annotators_string = ", ".join([i.name for i in annotators])
+        # one query for the owners' annotations, grouped by canvas
+        owner_users = list(User.objects.filter(id__in=owners).order_by("username"))
+        annotations = annotations_by_canvas(manifest, owner_users)
+        annotation_owners = {
+            canvas_id: [
+                owner
+                for owner in owner_users
+                if any(annotation.owner_id == owner.id for annotation in canvas_annotations)
+            ]
+            for canvas_id, canvas_annotations in annotations.items()
+        }
+        annotated = {
+            annotation.owner_id
+            for canvas_annotations in annotations.values()
+            for annotation in canvas_annotations
+        }
+        annotators_string = ", ".join(
+            [owner.name for owner in owner_users if owner.id in annotated]
+        )
         # pylint: enable = possibly-unused-variable
 
         # pylint: disable = line-too-long
@@ -136,65 +305,49 @@ class IiifManifestExport:
             + explanation
         )
         zip_file.writestr("README.txt", readme)
-        current_user = User.objects.get(id__in=owners)
 
         # pylint: enable = line-too-long
 
         # Next write the manifest
-        zip_file.writestr(
+        cls.write_json(
+            zip_file,
             "manifest.json",
-            json.dumps(
-                json.loads(
-                    serialize(
-                        "manifest",
-                        [manifest],
-                        version=version,
-                        annotators=current_user.name,
-                        exportdate=now,
-                        current_user=current_user,
-                    )
-                ),
-                indent=4,
-            ),
+            serialize_to_dicts(
+                "manifest",
+                [manifest],
+                version=version,
+                annotators=annotators_string,
+                exportdate=now,
+                annotation_owners=annotation_owners,
+            )[0],
         )
+        return annotations, annotation_owners
 
-        # Then write the OCR annotations
-        for canvas in manifest.canvas_set.all():
-            if canvas.annotation_set.count() > 0:
-                json_hash = json.loads(
-                    serialize(
-                        "annotation_list", [canvas], version=version, owners=owners
-                    )
-                )
-                anno_uri = json_hash["@id"]
-
-                annotation_file = re.sub(r"\W", "_", anno_uri) + ".json"
-
-                zip_file.writestr(annotation_file, json.dumps(json_hash, indent=4))
-        # Then write the user annotations
-        for canvas in manifest.canvas_set.all():
-            user_annotations = current_user.userannotation_set.filter(canvas=canvas)
-
-            if user_annotations.count() > 0:
-                # annotations = canvas.userannotation_set.filter(owner__in=owners).all()
-                json_hash = json.loads(
-                    serialize(
-                        "user_annotation_list",
-                        [canvas],
-                        version=version,
-                        is_list=False,
-                        owners=[current_user],
-                    )
-                )
-                print(json_hash)
-                anno_uri = json_hash["@id"]
-                annotation_file = re.sub(r"\W", "_", anno_uri) + ".json"
-
-                zip_file.writestr(annotation_file, json.dumps(json_hash, indent=4))
-
-        zip_file.close()  # flush zipfile to byte stream
+    @classmethod
+    def write_annotation_list(cls, zip_file, annotation_list):
+        """Write an annotation list to a file named after its `@id`.
 
-        return byte_stream.getvalue()
+        :param zip_file: Zip file open for writing.
+        :type zip_file: zipfile.ZipFile
+        :param annotation_list: Serialized annotation list.
+        :type annotation_list: dict
+        """
+        annotation_file = re.sub(r"\W", "_", annotation_list["@id"]) + ".json"
+        cls.write_json(zip_file, annotation_file, annotation_list)
+
+    @staticmethod
+    def write_json(zip_file, name, data):
+        """Encode `data` straight into a new zip entry.
+
+        :param zip_file: Zip file open for writing.
+        :type zip_file: zipfile.ZipFile
+        :param name: Name of the entry.
+        :type name: str
+        :param data: JSON serializable data.
+        :type data: dict
+        """
+        with io.TextIOWrapper(zip_file.open(name, "w"), encoding="utf-8") as text:
+            json.dump(data, text, indent=4, cls=DjangoJSONEncoder)
 
 
 class GithubExportException(Exception):
@@ -371,21 +524,37 @@ class JekyllSiteExport(object):
         tmpdir = tempfile.mkdtemp(prefix="tmp-rdx-export")
         LOGGER.debug("Building export for %s in %s", self.manifest.id, tmpdir)
 
-        # unzip jekyll template site
-        self.log_status("Extracting jekyll template site")
-        with zipfile.ZipFile(JEKYLL_THEME_ZIP, "r") as jekyllzip:
-            jekyllzip.extractall(tmpdir)
+        # NOTE: putting export content in a separate dir to make it easy to create
+        # the zip file with the right contents and structure
+        export_dir = os.path.join(tmpdir, "export")
+
+        # reuse the site from an identical earlier export
+        revision = export_revision(
+            self.manifest, self.version, self.owners, self.no_deep_zoom
+        )
+        if copy_cached_export(revision, self.edition_dir(export_dir)):
+            self.restamp_iiif_export(self.edition_dir(export_dir))
+            return export_dir
+
+        # copy the jekyll template site, unzipped once per process
+        self.log_status("Copying jekyll template site")
         self.jekyll_site_dir = os.path.join(tmpdir, "digitaledition-jekylltheme")
+        shutil.copytree(
+            os.path.join(
+                jekyll_theme_dir(JEKYLL_THEME_ZIP), "digitaledition-jekylltheme"
+            ),
+            self.jekyll_site_dir,
+        )
         LOGGER.debug("Jekyll site dir:")
         LOGGER.debug(self.jekyll_site_dir)
 
         LOGGER.debug("Exporting IIIF bundle")
-        iiif_zip_stream = IiifManifestExport.get_zip(
-            self.manifest, "v2", owners=self.owners
-        )
-        iiif_zip = zipfile.ZipFile(io.BytesIO(iiif_zip_stream), "r")
-
-        iiif_zip.extractall(self.iiif_dir())
+        with tempfile.TemporaryFile(suffix=".zip") as iiif_zip_file:
+            IiifManifestExport.write_zip(
+                self.manifest, "v2", iiif_zip_file, owners=self.owners
+            )
+            with zipfile.ZipFile(iiif_zip_file, "r") as iiif_zip:
+                iiif_zip.extractall(self.iiif_dir())
 
         # TODO
         # # save image files if requested, and update image paths
@@ -398,16 +567,29 @@ class JekyllSiteExport(object):
         # run the script to import IIIF as jekyll site content
         self.import_iiif_jekyll(self.manifest, self.jekyll_site_dir)
 
-        # NOTE: putting export content in a separate dir to make it easy to create
-        # the zip file with the right contents and structure
-        export_dir = os.path.join(tmpdir, "export")
         os.mkdir(export_dir)
 
         # rename the jekyll dir and move it into the export dir
         shutil.move(self.jekyll_site_dir, self.edition_dir(export_dir))
+        store_export(revision, self.edition_dir(export_dir))
 
         return export_dir
 
+    def restamp_iiif_export(self, edition_dir):
+        """Write the README and manifest of a reused site's IIIF bundle again,
+        so it carries this export's date rather than the stored one's.
+
+        :param edition_dir: System path of the reused site
+        :type edition_dir: str
+        """
+        with tempfile.TemporaryFile(suffix=".zip") as metadata_file:
+            with zipfile.ZipFile(metadata_file, "w") as metadata_zip:
+                IiifManifestExport.write_metadata(
+                    metadata_zip, self.manifest, "v2", self.owners
+                )
+            with zipfile.ZipFile(metadata_file, "r") as metadata_zip:
+                metadata_zip.extractall(os.path.join(edition_dir, "iiif_export"))
+
     def edition_dir(self, export_dir):
         """Convenience function for system path to the edition directory
 
@@ -667,12 +849,12 @@ class JekyllSiteExport(object):
         self.jekyll_site_dir = tmpdir
 
         LOGGER.debug("Exporting IIIF bundle")
-        iiif_zip_stream = IiifManifestExport.get_zip(
-            self.manifest, "v2", owners=self.owners
-        )
-        iiif_zip = zipfile.ZipFile(io.BytesIO(iiif_zip_stream), "r")
-
-        iiif_zip.extractall(self.iiif_dir())
+        with tempfile.TemporaryFile(suffix=".zip") as iiif_zip_file:
+            IiifManifestExport.write_zip(
+                self.manifest, "v2", iiif_zip_file, owners=self.owners
+            )
+            with zipfile.ZipFile(iiif_zip_file, "r") as iiif_zip:
+                iiif_zip.extractall(self.iiif_dir())
 
         # TODO
         # # save image files if requested, and update image paths
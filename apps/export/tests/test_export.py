@@ -6,13 +6,19 @@ import os
 import re
 import tempfile
 import zipfile
+from unittest.mock import patch
+from uuid import uuid4
 import httpretty
 from slugify import slugify
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.test import RequestFactory
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from apps.iiif.annotations.models import Annotation
 from apps.iiif.manifests.models import Manifest
 from apps.iiif.canvases.models import Canvas
 from apps.export.export import (
@@ -117,6 +123,73 @@ class ManifestExportTests(TestCase):
             comment_annotation_list = json.load(json_file)
         assert comment_annotation_list["@id"] == comment_annotation_list_id
 
+    def test_zip_creation_for_several_owners(self):
+        other = UserFactory.create()
+        annotation = UserAnnotation.objects.get(
+            pk="18f24705-398a-401d-a106-acfca6e72070"
+        )
+        annotation.pk = uuid4()
+        annotation.owner = other
+        annotation._state.adding = True
+        annotation.save()
+
+        with CaptureQueriesContext(connection) as one_owner:
+            IiifManifestExport.get_zip(self.volume, "v2", owners=[self.user.id])
+        with CaptureQueriesContext(connection) as two_owners:
+            zip_file = zipfile.ZipFile(
+                io.BytesIO(
+                    IiifManifestExport.get_zip(
+                        self.volume, "v2", owners=[self.user.id, other.id]
+                    )
+                )
+            )
+        # Owners' annotations are fetched in one query, however many there are.
+        assert len(two_owners) == len(one_owner)
+        manifest = json.loads(zip_file.read("manifest.json"))
+        canvas = [
+            canvas
+            for canvas in manifest["sequences"][0]["canvases"]
+            if canvas["@id"].endswith(annotation.canvas.pid)
+        ][0]
+        user_lists = [
+            content
+            for content in canvas["otherContent"]
+            if content["label"].startswith("Annotations by")
+        ]
+        assert sorted(content["label"] for content in user_lists) == sorted(
+            [
+                f"Annotations by {self.user.username}",
+                f"Annotations by {other.username}",
+            ]
+        )
+        for content in user_lists:
+            annotation_list = json.loads(
+                zip_file.read(re.sub(r"\W", "_", content["@id"]) + ".json")
+            )
+            assert len(annotation_list["resources"]) == 1
+
+    def test_streamed_zip_matches_zip(self):
+        zip_file = zipfile.ZipFile(
+            io.BytesIO(
+                IiifManifestExport.get_zip(self.volume, "v2", owners=[self.user.id])
+            )
+        )
+        streamed = zipfile.ZipFile(
+            io.BytesIO(
+                b"".join(
+                    IiifManifestExport.stream_zip(
+                        self.volume, "v2", owners=[self.user.id]
+                    )
+                )
+            )
+        )
+        assert streamed.testzip() is None
+        assert sorted(streamed.namelist()) == sorted(zip_file.namelist())
+        for name in zip_file.namelist():
+            # The README and manifest include the time of export.
+            if name not in ("README.txt", "manifest.json"):
+                assert streamed.read(name) == zip_file.read(name)
+
     def test_jekyll_site_export(self):
         user_anno = UserAnnotation.objects.get(
             pk="18f24705-398a-401d-a106-acfca6e72070"
@@ -167,6 +240,64 @@ class ManifestExportTests(TestCase):
         tags_yaml = open(os.path.join(jekyll_path, "_data", "tags.yml")).read()
         assert "tag1" in tags_yaml
 
+    def test_jekyll_site_export_is_reused(self):
+        with override_settings(
+            EXPORT_CACHE_DIR=tempfile.mkdtemp(prefix="tmp-rdx-export-cache-"),
+            EXPORT_CACHE_TIMEOUT=3600,
+        ), patch.object(
+            JekyllSiteExport,
+            "import_iiif_jekyll",
+            autospec=True,
+            side_effect=JekyllSiteExport.import_iiif_jekyll,
+        ) as import_iiif_jekyll:
+            j = JekyllSiteExport(self.volume, "v2", owners=[self.user.id])
+            first = j.generate_website()
+            second = j.generate_website()
+            assert import_iiif_jekyll.call_count == 1
+            assert first != second
+            assert sorted(os.listdir(j.edition_dir(second))) == sorted(
+                os.listdir(j.edition_dir(first))
+            )
+            # The reused site is stamped with this export's date.
+            readmes = [
+                open(os.path.join(j.edition_dir(export), "iiif_export", "README.txt")).read()
+                for export in (first, second)
+            ]
+            export_dates = [
+                re.search(r"export date: (.*) UTC", readme).group(1) for readme in readmes
+            ]
+            assert export_dates[0] != export_dates[1]
+            manifest_dates = []
+            for export in (first, second):
+                with open(
+                    os.path.join(j.edition_dir(export), "iiif_export", "manifest.json")
+                ) as manifest_file:
+                    manifest_dates.append(
+                        {
+                            entry["label"]: entry["value"]
+                            for entry in json.load(manifest_file)["metadata"]
+                        }["Export Date"]
+                    )
+            assert manifest_dates[0] != manifest_dates[1]
+
+            # A changed annotation is a new revision of the export.
+            self.user.userannotation_set.first().save()
+            j.generate_website()
+            assert import_iiif_jekyll.call_count == 2
+
+            # So is a changed canvas or OCR annotation.
+            Canvas.objects.filter(pk=self.volume.canvas_set.first().pk).update(
+                modified_at=timezone.now()
+            )
+            j.generate_website()
+            assert import_iiif_jekyll.call_count == 3
+            ocr = Annotation.objects.filter(
+                canvas__manifest=self.volume, owner__username="ocr"
+            ).first()
+            Annotation.objects.filter(pk=ocr.pk).update(modified_at=timezone.now())
+            j.generate_website()
+            assert import_iiif_jekyll.call_count == 4
+
     def test_jekyll_export_error(self):
         export = JekyllSiteExport(
             self.volume, "v2", owners=[self.user.id], deep_zoom="exclude"
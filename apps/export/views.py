@@ -2,7 +2,7 @@
 import logging
 from os import environ
 from slugify import slugify
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views import View
 from django.views.generic.base import TemplateView
@@ -39,8 +39,10 @@ class ManifestExport(View):
         manifest = self.get_queryset()[0]
         owners = [request.user.id]
 
-        zip = IiifManifestExport.get_zip(manifest, kwargs['version'], owners=owners)
-        resp = HttpResponse(zip, content_type = "application/x-zip-compressed")
+        resp = StreamingHttpResponse(
+            IiifManifestExport.stream_zip(manifest, kwargs['version'], owners=owners),
+            content_type = "application/x-zip-compressed"
+        )
         resp['Content-Disposition'] = 'attachment; filename=iiif_export.zip'
 
         return resp
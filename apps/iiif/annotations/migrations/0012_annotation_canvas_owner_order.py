@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('annotations', '0011_annotation_raw_content'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='annotation',
+            index=models.Index(fields=['canvas', 'owner', 'order'], name='annotation_canvas_owner_order'),
+        ),
+    ]
@@ -13,6 +13,16 @@ USER = get_user_model()
 LOGGER = logging.getLogger(__name__)
 
 
+def get_ocr_user():
+    """
+    Get, or create, the user that owns all OCR annotations.
+
+    :return: The OCR user
+    :rtype: apps.users.models.User
+    """
+    return USER.objects.get_or_create(username="ocr", name="OCR")[0]
+
+
 class AbstractAnnotation(IiifBase):
     """Base class for IIIF annotations."""
 
@@ -105,16 +115,21 @@ class Annotation(AbstractAnnotation):
     class Meta:  # pylint: disable=too-few-public-methods, missing-class-docstring
         ordering = ["order"]
         abstract = False
+        # OCR for a canvas is read, and rebuilt, in order.
+        indexes = [
+            models.Index(
+                fields=["canvas", "owner", "order"], name="annotation_canvas_owner_order"
+            )
+        ]
 
     # @receiver(signals.pre_save, sender=Annotation)
-    def set_span_element(self):
+    def set_span_element(self, ocr_user=None):
         """
         Post save function to wrap the OCR content in a `<span>` to be overlaid in OpenSeadragon.
 
-        :param sender: Class calling function
-        :type sender: apps.iiif.annotations.models.Annotation
-        :param instance: Annotation object
-        :type instance: apps.iiif.annotations.models.Annotation
+        :param ocr_user: The OCR user, if already resolved. Passing this in avoids a
+            lookup for every annotation when many are prepared at once, defaults to None
+        :type ocr_user: apps.users.models.User, optional
         """
         # Guard for when an OCR annotation gets re-saved.
         # Without this, it would nest the current span in a new span.
@@ -124,7 +139,7 @@ class Annotation(AbstractAnnotation):
             # pylint: disable=unsupported-assignment-operation
             self.oa_annotation["annotatedBy"] = {"name": "ocr"}
             # pylint: enable=unsupported-assignment-operation
-            self.owner = USER.objects.get_or_create(username="ocr", name="OCR")[0]
+            self.owner = ocr_user or get_ocr_user()
             character_count = len(self.content)
             # 1.6 is a "magic number" that seems to work pretty well ¯\_(ツ)_/¯
             font_size = self.h / 1.6
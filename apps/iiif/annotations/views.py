@@ -1,11 +1,10 @@
 """Django views for :class:`apps.iiif.annotations`"""
-import json
 from django.views import View
-from django.core.serializers import serialize
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 from ..canvases.models import Canvas
 from .models import Annotation
+from ..serializers.base import serialize_to_dicts
 
 USER = get_user_model()
 class AnnotationsForPage(View):
@@ -33,12 +32,9 @@ class AnnotationsForPage(View):
         # TODO: Does this view need owners?
         # owners = [request.user.id]
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'annotation',
-                    self.get_queryset(),
-                    is_list=True
-                )
+            serialize_to_dicts(
+                'annotation',
+                self.get_queryset().select_related('owner', 'canvas__manifest')
             ),
             safe=False
         )
@@ -70,13 +66,11 @@ class OcrForPage(View):
         owners = [USER.objects.get(username='ocr', name='OCR')]
 
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'annotation_list',
-                    self.get_queryset(),
-                    version=kwargs['version'],
-                    owners=owners
-                )
-            ),
+            serialize_to_dicts(
+                'annotation_list',
+                self.get_queryset(),
+                version=kwargs['version'],
+                owners=owners
+            )[0],
             safe=False
         )
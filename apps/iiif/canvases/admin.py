@@ -12,7 +12,9 @@ from .tasks import add_ocr_task
 from . import services
 
 def resave_gethw_admin_action(modeladmin, request, queryset):
-    for canvas in queryset:
+    canvases = list(queryset.select_related('manifest__image_server', 'image_server'))
+    Canvas.prefetch_image_info(canvases)
+    for canvas in canvases:
         canvas.save()
 resave_gethw_admin_action.short_description = 'Resave for Height Width'
 
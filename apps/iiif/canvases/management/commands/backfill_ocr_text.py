@@ -0,0 +1,54 @@
+"""
+Manage command to store the plain OCR text for existing canvases.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from ...models import Canvas, ocr_text_from_annotations
+from ....annotations.models import Annotation
+
+
+class Command(BaseCommand):
+    help = "Store the plain OCR text for canvases in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of canvases to update per batch.",
+        )
+        parser.add_argument(
+            "--manifest",
+            help="Only backfill canvases for the manifest with supplied pid.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the text for canvases that already have it stored.",
+        )
+
+    def handle(self, *args, **options):
+        canvases = Canvas.objects.all()
+        if options["manifest"]:
+            canvases = canvases.filter(manifest__pid=options["manifest"])
+        if not options["all"]:
+            canvases = canvases.filter(ocr_text__isnull=True)
+
+        pks = list(canvases.order_by("pk").values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        ocr_words = Annotation.objects.filter(owner__username="ocr").order_by("order")
+
+        for start in range(0, len(pks), batch_size):
+            batch = list(
+                Canvas.objects.filter(pk__in=pks[start : start + batch_size])
+                .prefetch_related(
+                    Prefetch("annotation_set", queryset=ocr_words, to_attr="ocr_words")
+                )
+            )
+            for canvas in batch:
+                canvas.ocr_text = ocr_text_from_annotations(canvas.ocr_words)
+            Canvas.objects.bulk_update(batch, ["ocr_text"])
+            self.stdout.write(f"Stored OCR text for {start + len(batch)} of {len(pks)} canvases")
+
+        self.stdout.write(self.style.SUCCESS("OCR text backfilled"))
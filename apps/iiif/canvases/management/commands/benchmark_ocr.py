@@ -0,0 +1,120 @@
+"""
+Manage command to benchmark writing OCR annotations.
+"""
+
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import Canvas
+from ... import services
+from ....annotations.models import Annotation
+from ....manifests.models import Manifest
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark adding OCR annotations to a synthetic volume. "
+        "Nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=400,
+            help="Number of canvases in the synthetic volume.",
+        )
+        parser.add_argument(
+            "--words",
+            type=int,
+            default=250,
+            help="Number of OCR words per canvas.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Annotations per INSERT for the bulk writer.",
+        )
+        parser.add_argument(
+            "--skip-legacy",
+            action="store_true",
+            help="Only benchmark the bulk writer.",
+        )
+
+    def handle(self, *args, **options):
+        pages = options["pages"]
+        words = options["words"]
+        ocr = [
+            {
+                "content": f"word{index}",
+                "x": index * 10,
+                "y": index * 5,
+                "w": 40,
+                "h": 12,
+            }
+            for index in range(words)
+        ]
+        total = pages * words
+        self.stdout.write(
+            f"Synthetic volume: {pages} canvases, {words} words each ({total} words)"
+        )
+
+        if not options["skip_legacy"]:
+            elapsed = self.__run(pages, lambda canvas: self.__legacy(canvas, ocr))
+            self.__report("per-word save", total, elapsed)
+
+        elapsed = self.__run(
+            pages,
+            lambda canvas: services.add_ocr_annotations(
+                canvas, [dict(word) for word in ocr], options["batch_size"]
+            ),
+        )
+        self.__report("bulk writer", total, elapsed)
+
+    def __run(self, pages, writer):
+        """Create a throwaway volume, time the writer over every canvas and roll back."""
+        with transaction.atomic():
+            # `bulk_create` skips the save side effects (indexing, image info requests)
+            # so only the OCR writes are measured.
+            manifest = Manifest.objects.bulk_create([Manifest(label="OCR benchmark")])[0]
+            canvases = Canvas.objects.bulk_create(
+                [
+                    Canvas(
+                        manifest=manifest,
+                        position=position,
+                        width=1000,
+                        height=1000,
+                        resource=f"benchmark-{position}",
+                    )
+                    for position in range(1, pages + 1)
+                ]
+            )
+            start = perf_counter()
+            for canvas in canvases:
+                writer(canvas)
+            elapsed = perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    @staticmethod
+    def __legacy(canvas, ocr):
+        """The original path, one `Annotation.save()` per word."""
+        for order, word in enumerate(ocr, start=1):
+            Annotation(
+                canvas=canvas,
+                x=word["x"],
+                y=word["y"],
+                w=word["w"],
+                h=word["h"],
+                resource_type=Annotation.OCR,
+                content=word["content"],
+                order=order,
+            ).save()
+
+    def __report(self, name, total, elapsed):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name}: {total} words in {elapsed:.2f}s ({total / elapsed:.0f} words/second)"
+            )
+        )
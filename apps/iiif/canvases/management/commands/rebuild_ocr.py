@@ -2,22 +2,29 @@
 Manage commands for Canvas objects.
 """
 
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 from os import environ
-from progress.bar import Bar
-import httpretty
+from time import perf_counter
+from celery import group
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from ...tasks import add_ocr_task
+from django.db import connections
+from ...tasks import rebuild_canvas_ocr, rebuild_ocr_task
 from ...models import Canvas
 from ... import services
-from ....annotations.models import Annotation
+from ....kollections.models import Collection
 from ....manifests.models import Manifest
-
-USER = get_user_model()
+from ....manifests.cache import invalidate_manifest_cache
+from ....manifests.tasks import index_manifest_task
 
 
 class Command(BaseCommand):
-    help = "Rebuild OCR for a canvas"
+    help = (
+        "Rebuild OCR for a canvas, manifest or collection. Each canvas' OCR "
+        "annotations are diffed against freshly fetched OCR, so the command "
+        "can safely be run again."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -29,22 +36,78 @@ class Command(BaseCommand):
             help="Rebuild OCR for entire manifest/volume with supplied pid.",
         )
         parser.add_argument(
-            "--testing",
-            help="Tells command to mock http requests with testing",
-            default=False,
+            "--collection",
+            help="Rebuild OCR for every manifest in the collection with supplied pid.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Rebuild canvases in a pool of this many processes.",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Rebuild canvases as a group of Celery tasks and wait for them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Fetch and diff OCR for at most this many canvases of a manifest at a time.",
         )
 
     def handle(self, *args, **options):
-        if options["manifest"]:
+        canvases = self.__get_canvases(options)
+        if canvases is None:
+            return
+
+        canvases = list(
+            canvases.select_related("manifest__image_server", "image_server").order_by(
+                "manifest_id", "position"
+            )
+        )
+        self.stdout.write(f"Rebuilding OCR for {len(canvases)} canvases")
+
+        start = perf_counter()
+        if options["celery"]:
+            results = self.__rebuild_with_celery(canvases)
+        elif options["workers"] > 1:
+            results = self.__rebuild_with_processes(canvases, options["workers"])
+        else:
+            results = self.__rebuild(canvases, options["batch_size"])
+        elapsed = perf_counter() - start
+
+        # Every canvas' text changed, so reindex each manifest once.
+        manifests = {canvas.manifest for canvas in canvases}
+        for manifest in manifests:
+            invalidate_manifest_cache(manifest.pid)
+            if environ["DJANGO_ENV"] != "test":
+                index_manifest_task.apply_async(args=[str(manifest.id)])
+            else:
+                index_manifest_task(str(manifest.id))
+
+        self.__report(canvases, results, elapsed)
+
+    def __get_canvases(self, options):
+        """Canvases to rebuild, or None after reporting a missing object."""
+        if options["collection"]:
             try:
-                manifest = Manifest.objects.get(pid=options["manifest"])
-                for canvas in manifest.canvas_set.all():
-                    self.__rebuild(canvas)
+                collection = Collection.objects.get(pid=options["collection"])
+            except Collection.DoesNotExist:
                 self.stdout.write(
-                    self.style.SUCCESS(
-                        "OCR rebuilt for manifest {m}".format(m=options["manifest"])
+                    self.style.ERROR(
+                        "ERROR: collection not found with pid {c}".format(
+                            c=options["collection"]
+                        )
                     )
                 )
+                return None
+            return Canvas.objects.filter(manifest__collections=collection)
+
+        if options["manifest"]:
+            try:
+                manifest = Manifest.objects.get(pid=options["manifest"])
             except Manifest.DoesNotExist:
                 self.stdout.write(
                     self.style.ERROR(
@@ -53,18 +116,12 @@ class Command(BaseCommand):
                         )
                     )
                 )
-        elif options["canvas"]:
-            try:
-                canvas = Canvas.objects.get(pid=options["canvas"])
-                print(canvas.image_server)
+                return None
+            return manifest.canvas_set.all()
 
-                self.__rebuild(canvas, options["testing"])
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        "OCR rebuilt for canvas {c}".format(c=options["canvas"])
-                    )
-                )
-            except Canvas.DoesNotExist:
+        if options["canvas"]:
+            canvases = Canvas.objects.filter(pid=options["canvas"])
+            if not canvases.exists():
                 self.stdout.write(
                     self.style.ERROR(
                         "ERROR: canvas not found with pid {p}".format(
@@ -72,62 +129,83 @@ class Command(BaseCommand):
                         )
                     )
                 )
-        else:
-            self.stdout.write(
-                self.style.ERROR("ERROR: your must provide a manifest or canvas pid")
-            )
+                return None
+            return canvases
 
-    def __rebuild(self, canvas, testing=False):
-        print(canvas.annotation_set.exists())
-        if not canvas.annotation_set.exists():
-            if environ["DJANGO_ENV"] != "test":
-                add_ocr_task(canvas.id)
-            else:
-                ocr = services.get_ocr(canvas)
+        self.stdout.write(
+            self.style.ERROR(
+                "ERROR: your must provide a collection, manifest or canvas pid"
+            )
+        )
+        return None
 
-                if ocr is not None:
-                    services.add_ocr_annotations(canvas, ocr)
-        else:
-            ocr = services.get_ocr(canvas)
-            if ocr is None:
-                print("GRRRRRRRRRRRRRRRRRRRRRRRRRRR")
-                return
-
-            word_order = 1
-            self.stdout.write("Adding OCR for canvas {c}".format(c=canvas.pid))
-            with Bar("Processing", max=len(ocr)) as prog_bar:
-                for word in ocr:
-                    if (
-                        word == ""
-                        or "content" not in word
-                        or not word["content"]
-                        or word["content"].isspace()
-                    ):
-                        continue
-                    anno = None
+    @staticmethod
+    def __rebuild(canvases, batch_size):
+        """Fetch OCR concurrently for a batch of a manifest's canvases at a time,
+        then diff each canvas of the batch in this process."""
+        results = []
+        for _, manifest_canvases in groupby(canvases, key=lambda canvas: canvas.manifest_id):
+            manifest_canvases = list(manifest_canvases)
+            for start in range(0, len(manifest_canvases), batch_size):
+                batch = manifest_canvases[start : start + batch_size]
+                for canvas, ocr in services.get_ocr_for_canvases(batch):
                     try:
-                        anno = Annotation.objects.get(
-                            w=word["w"],
-                            h=word["h"],
-                            x=word["x"],
-                            y=word["y"],
-                            owner=USER.objects.get(username="ocr"),
-                            canvas=canvas,
-                        )
-                    except Annotation.DoesNotExist:
-                        anno = Annotation(
-                            w=word["w"],
-                            h=word["h"],
-                            x=word["x"],
-                            y=word["y"],
-                            canvas=canvas,
-                            owner=USER.objects.get(username="ocr"),
-                            resource_type=Annotation.OCR,
-                            order=word_order,
+                        results.append(
+                            services.rebuild_ocr_annotations(canvas, ocr)
+                            if ocr is not None
+                            else None
                         )
-                    word_order += 1
-                    anno.content = word["content"]
-                    anno.save()
-                    prog_bar.next()
-                canvas.save()
-                prog_bar.finish()
+                    except Exception as error:  # pylint: disable = broad-except
+                        results.append(error)
+        return results
+
+    @staticmethod
+    def __rebuild_with_processes(canvases, workers):
+        # Forked workers must open their own database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(rebuild_canvas_ocr, canvas.id) for canvas in canvases]
+            return [future.exception() or future.result() for future in futures]
+
+    @staticmethod
+    def __rebuild_with_celery(canvases):
+        result = group(
+            rebuild_ocr_task.s(str(canvas.id)) for canvas in canvases
+        ).apply_async()
+        # Failed canvases are returned as their exceptions.
+        return result.get(propagate=False)
+
+    def __report(self, canvases, results, elapsed):
+        totals = Counter()
+        missing = 0
+        failed = []
+        for canvas, counts in zip(canvases, results):
+            if counts is None:
+                missing += 1
+            elif isinstance(counts, Exception):
+                failed.append(f"{canvas.pid} ({counts})")
+            else:
+                totals.update(counts)
+        words = sum(totals[key] for key in ("created", "updated", "unchanged"))
+        elapsed = max(elapsed, 1e-6)
+        self.stdout.write(
+            f"Created {totals['created']}, updated {totals['updated']}, "
+            f"deleted {totals['deleted']} and left {totals['unchanged']} unchanged "
+            f"OCR annotations. Kept {totals['kept']} stale annotations that user "
+            "annotations are anchored to."
+        )
+        if missing:
+            self.stdout.write(self.style.WARNING(f"No OCR found for {missing} canvases"))
+        if failed:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Failed to rebuild OCR for {len(failed)} canvases: {', '.join(failed)}"
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"OCR rebuilt for {len(results)} canvases in {elapsed:.2f}s "
+                f"({len(results) / elapsed:.1f} canvases/second, "
+                f"{words / elapsed:.0f} words/second)"
+            )
+        )
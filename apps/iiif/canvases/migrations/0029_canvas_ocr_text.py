@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canvases', '0028_alter_canvas_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canvas',
+            name='ocr_text',
+            field=models.TextField(blank=True, editable=False, help_text="Plain text of the canvas' OCR. Updated when OCR is added or rebuilt.", null=True),
+        ),
+    ]
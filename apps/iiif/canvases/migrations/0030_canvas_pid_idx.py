@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('canvases', '0029_canvas_ocr_text'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='canvas',
+            index=models.Index(fields=['pid'], name='canvas_pid_idx'),
+        ),
+    ]
@@ -1,21 +1,121 @@
 """Django models representing IIIF canvases and IIIF image server info."""
 
 import os
-from functools import cached_property
 from urllib.parse import quote
 from boto3 import resource
 from bs4 import BeautifulSoup
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import config.settings.local as settings
+from apps.utils.noid import encode_noid
 from ..models import IiifBase
+from ..manifests.cache import invalidate_manifest_cache
 from ..manifests.models import Manifest, ImageServer
+from ..manifests.tasks import index_manifest_on_commit
 from ..annotations.models import Annotation
 from . import services
 
 USER = get_user_model()
 
 
+def ocr_text_from_annotations(annotations):
+    """Join the text of OCR annotations, stripping the `<span>` markup.
+
+    :param annotations: OCR annotations in reading order
+    :type annotations: iterable of apps.iiif.annotations.models.Annotation
+    :return: OCR words joined by spaces
+    :rtype: str
+    """
+    return " ".join(
+        BeautifulSoup(word.content, "html.parser").text for word in annotations
+    )
+
+
+class CanvasManager(models.Manager):  # pylint: disable = too-few-public-methods
+    """Model manager for canvases."""
+
+    def bulk_import(self, manifest, canvas_specs, batch_size=None):
+        """Create many canvases for one manifest without the side effects of
+        saving each canvas and the manifest.
+
+        Canvases without a `position` are numbered after the manifest's last
+        canvas, in the order given. Dimensions missing from the specs are read
+        from the IIIF image info, fetched concurrently. The canvases are
+        inserted with `bulk_create`, the manifest gets a start canvas if it has
+        none, and the manifest is reindexed once.
+
+        :param manifest: Manifest the canvases belong to
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param canvas_specs: Dicts of canvas field values, e.g. `pid`, `label`,
+            `resource` and `ocr_file_path`
+        :type canvas_specs: list
+        :param batch_size: Number of canvases per INSERT, defaults to all of them
+        :type batch_size: int, optional
+        :return: Created canvases
+        :rtype: list
+        """
+        last_position = (
+            self.filter(manifest=manifest).aggregate(Max("position"))["position__max"] or 0
+        )
+        canvases = []
+        for offset, spec in enumerate(canvas_specs, start=1):
+            canvas = self.model(
+                **{"image_server": manifest.image_server, **spec, "manifest": manifest}
+            )
+            canvas.clean_pid()
+            if canvas.position is None:
+                canvas.position = last_position + offset
+            if canvas.resource is None:
+                canvas.resource = canvas.pid
+            canvases.append(canvas)
+
+        # Same as `IiifBase.save`: a taken pid is replaced with a new one.
+        taken = set(
+            self.filter(pid__in=[canvas.pid for canvas in canvases]).values_list(
+                "pid", flat=True
+            )
+        )
+        for canvas in canvases:
+            if canvas.pid in taken or not canvas.pid:
+                canvas.dup_pid = canvas.pid
+                canvas.pid = encode_noid()
+            taken.add(canvas.pid)
+
+        missing_dimensions = [
+            canvas for canvas in canvases if not canvas.width or not canvas.height
+        ]
+        infos = services.get_canvas_infos(missing_dimensions)
+        for canvas, info in zip(missing_dimensions, infos):
+            if info is not None:
+                canvas.width = info["width"]
+                canvas.height = info["height"]
+
+        with transaction.atomic():
+            self.bulk_create(canvases, batch_size=batch_size)
+            updates = {"modified_at": timezone.now()}
+            if manifest.start_canvas_id is None and canvases:
+                start_canvas = self.filter(manifest=manifest).order_by("position").first()
+                self.filter(manifest=manifest).update(is_starting_page=False)
+                self.filter(pk=start_canvas.pk).update(is_starting_page=True)
+                updates["start_canvas"] = start_canvas
+            Manifest.objects.filter(pk=manifest.pk).update(**updates)
+            manifest.collections.update(
+                modified_at=updates["modified_at"], updated_at=updates["modified_at"]
+            )
+            for field, value in updates.items():
+                setattr(manifest, field, value)
+
+        invalidate_manifest_cache(manifest.pid)
+        # bulk_create sends no signals, so drop the annotation counts listing the canvases here
+        from apps.readux.cache import invalidate_manifest_annotation_counts  # pylint: disable = import-outside-toplevel
+
+        invalidate_manifest_annotation_counts(manifest.id)
+        index_manifest_on_commit(manifest.id)
+        return canvases
+
+
 class Canvas(IiifBase):
     """Django model for IIIF Canvas objects."""
 
@@ -35,6 +135,16 @@ class Canvas(IiifBase):
     # TODO: move this to the manifest level.
     default_ocr = models.CharField(max_length=30, choices=preferred_ocr, default="word")
     ocr_file_path = models.CharField(max_length=500, null=True, blank=True)
+    ocr_text = models.TextField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Plain text of the canvas' OCR. Updated when OCR is added or rebuilt.",
+    )
+    # Resource id and IIIF image info last fetched for this instance.
+    _image_info = None
+
+    objects = CanvasManager()
 
     @property
     def file_name(self):
@@ -75,8 +185,23 @@ class Canvas(IiifBase):
 
     @property
     def image_info(self):
-        """Convenience property for the canvas' IIIF info json URL."""
-        return services.get_canvas_info(self)
+        """Convenience property for the canvas' IIIF image info. Fetched once per
+        instance and resource id, see :func:`.services.get_canvas_info`."""
+        resource_id = self.resource_id
+        if self._image_info is None or self._image_info[0] != resource_id:
+            self._image_info = (resource_id, services.get_canvas_info(self))
+        return self._image_info[1]
+
+    @staticmethod
+    def prefetch_image_info(canvases):
+        """Fetch the IIIF image info for many canvases concurrently before saving them.
+
+        :param canvases: Canvas objects
+        :type canvases: list
+        """
+        infos = services.get_canvas_infos(canvases)
+        for canvas, info in zip(canvases, infos):
+            canvas._image_info = (canvas.resource_id, info)  # pylint: disable = protected-access
 
     @property
     def thumbnail(self):
@@ -136,15 +261,39 @@ class Canvas(IiifBase):
         # Let CSS handle fitting within the square container with object-fit: contain
         return f"{self.resource_id}/full/600,/0/default.jpg"
 
-    @cached_property
+    @property
     def result(self):
-        """Cached property containing OCR text content from associated annotations."""
+        """OCR text content from associated annotations.
+
+        Reads the stored `ocr_text`. Canvases that have not been backfilled
+        fall back to building the text from their annotations.
+        """
+        if self.ocr_text is None:
+            return self.build_ocr_text()
+        return self.ocr_text
+
+    def build_ocr_text(self):
+        """Build the plain text of the canvas' OCR from its annotations.
+
+        :return: OCR words joined by spaces
+        :rtype: str
+        """
         words = self.annotation_set.filter(owner__username="ocr").order_by("order")
-        clean_words = []
-        for word in words:
-            clean_word = BeautifulSoup(word.content, "html.parser").text
-            clean_words.append(clean_word)
-        return " ".join(clean_words)
+        return ocr_text_from_annotations(words)
+
+    def refresh_ocr_text(self):
+        """Rebuild and store the plain text of the canvas' OCR.
+
+        Writes only the `ocr_text` column so none of the save side effects
+        run, apart from dropping the rendered manifest.
+
+        :return: OCR words joined by spaces
+        :rtype: str
+        """
+        self.ocr_text = self.build_ocr_text()
+        Canvas.objects.filter(pk=self.pk).update(ocr_text=self.ocr_text)
+        invalidate_manifest_cache(self.manifest.pid)
+        return self.ocr_text
 
     def before_save(self):
         """
@@ -160,15 +309,16 @@ class Canvas(IiifBase):
         if self.position is None:
             self.position = self.manifest.canvas_set.count() + 1
 
-        if self.image_info is not None:
+        image_info = self.image_info
+        if image_info is not None:
             # TODO: Consider changing the default value for height and width
             # so we don't have to check for 0 in addition to None.
             if self.width == 0 or self.height == 0:
                 self.width = None
                 self.height = None
             if self.width is None and self.height is None:
-                self.width = self.image_info["width"]
-                self.height = self.image_info["height"]
+                self.width = image_info["width"]
+                self.height = image_info["height"]
 
         if self.resource is None:
             self.resource = self.pid
@@ -179,6 +329,7 @@ class Canvas(IiifBase):
         """
         self.before_save()
         super().save(*args, **kwargs)
+        invalidate_manifest_cache(self.manifest.pid)
 
     def delete(self, *args, **kwargs):
         """
@@ -203,6 +354,7 @@ class Canvas(IiifBase):
                 pass
 
         super().delete(*args, **kwargs)
+        invalidate_manifest_cache(self.manifest.pid)
 
     # TODO: The way we construct PIDs for Canvas objects might need some
     # rethinking.
@@ -225,6 +377,7 @@ class Canvas(IiifBase):
 
     class Meta:  # pylint: disable=too-few-public-methods, missing-class-docstring
         ordering = ["position"]
+        indexes = [models.Index(fields=["pid"], name="canvas_pid_idx")]
 
 
 class Meta:  # pylint: disable=too-few-public-methods, missing-class-docstring
@@ -1,32 +1,42 @@
 # pylint: disable=invalid-name
 """Module to provide some common functions for Canvas objects."""
-import csv
+import codecs
 import pysftp
-from tempfile import gettempdir
+from collections import defaultdict
+from hashlib import md5
 from io import BytesIO
 import json
-from os import environ, path, unlink, remove
+from os import environ, path
 import re
-import tempfile
+import threading
 import logging
+from bs4 import BeautifulSoup
 from hocr_spec import HocrValidator
 from lxml import etree
 from django.conf import settings
+from django.core.cache import cache
 from django.core.serializers import deserialize
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 import httpretty
-from apps.iiif.annotations.models import Annotation
-from apps.utils.fetch import fetch_url
+from apps.iiif.annotations.models import Annotation, get_ocr_user
+from apps.utils.fetch import fetch_concurrently, fetch_url
 
 LOGGER = logging.getLogger(__name__)
 
+ALTO_SCHEMAS = {
+    "ns-v2": "xml_schema/alto-2-1.xsd",
+    "ns-v3": "xml_schema/alto-3-1.xsd",
+    "ns-v4": "xml_schema/alto-4-2.xsd",
+}
+ALTO_DEFAULT_SCHEMA = "xml_schema/alto-1-4.xsd"
+TEI_SCHEMA = "xml_schema/tei_all.xsd"
+# Bytes read to guess the format of fetched OCR.
+SNIFF_LENGTH = 1024
 
-class IncludeQuotesDialect(csv.Dialect):  # pylint: disable=too-few-public-methods
-    """Subclass of csv.Dialect to include the quote marks in OCR content."""
-
-    # include the quote marks in content
-    lineterminator = "\n"
-    delimiter = "\t"
-    quoting = csv.QUOTE_NONE  # perform no special processing of quote characters
+_xml_schemas = {}
+_xml_schemas_lock = threading.Lock()
 
 
 class HocrValidationError(Exception):
@@ -35,6 +45,46 @@ class HocrValidationError(Exception):
     pass  # pylint: disable=unnecessary-pass
 
 
+def xml_schema(schema_file):
+    """Compiled XML schema, compiled once per process.
+
+    Compiling `tei_all.xsd` takes seconds, so schemas are kept for the life
+    of the process. Parsers are still created per document.
+
+    :param schema_file: Path to the XSD file
+    :type schema_file: str
+    :rtype: lxml.etree.XMLSchema
+    """
+    schema = _xml_schemas.get(schema_file)
+    if schema is None:
+        with _xml_schemas_lock:
+            schema = _xml_schemas.get(schema_file)
+            if schema is None:
+                schema = etree.XMLSchema(file=schema_file)
+                _xml_schemas[schema_file] = schema
+    return schema
+
+
+def compile_xml_schemas():
+    """Compile every OCR schema, e.g. when a Celery worker starts."""
+    for schema_file in (*ALTO_SCHEMAS.values(), ALTO_DEFAULT_SCHEMA, TEI_SCHEMA):
+        xml_schema(schema_file)
+
+
+def validates_ocr(canvas):
+    """Whether OCR for a canvas should be validated against its schema.
+
+    :param canvas: Canvas object
+    :type canvas: apps.iiif.canvases.models.Canvas
+    :return: False if the canvas' image server turns validation off
+    :rtype: bool
+    """
+    image_server = canvas.image_server
+    if image_server is None and canvas.manifest is not None:
+        image_server = canvas.manifest.image_server
+    return image_server is None or image_server.validate_ocr
+
+
 # @httpretty.activate
 def activate_fake_canvas_info(canvas):
     """Function to mock a response for testing.
@@ -52,43 +102,246 @@ def activate_fake_canvas_info(canvas):
     )
 
 
-def get_ocr(canvas):
+class StorageClients:
+    """Connections to image servers' storage, reused across a batch of canvases.
+
+    S3 buckets are kept per thread because boto3 resources are not thread safe.
+    SFTP connections are pooled and handed to one thread at a time.
+    Use as a context manager so the SFTP connections are closed afterwards.
+    """
+
+    def __init__(self):
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__idle_sftp = defaultdict(list)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def bucket(self, image_server):
+        """S3 bucket for an image server.
+
+        :param image_server: Image server
+        :type image_server: apps.iiif.manifests.models.ImageServer
+        :rtype: boto3.resources.factory.s3.Bucket
+        """
+        if not hasattr(self.__local, "buckets"):
+            self.__local.buckets = {}
+        if image_server.id not in self.__local.buckets:
+            self.__local.buckets[image_server.id] = image_server.bucket
+        return self.__local.buckets[image_server.id]
+
+    def read_sftp(self, image_server, remote_path):
+        """Read a file from an image server over SFTP.
+
+        A pooled connection that fails is dropped and the read is tried once
+        more on a new connection.
+
+        :param image_server: Image server
+        :type image_server: apps.iiif.manifests.models.ImageServer
+        :param remote_path: Path relative to the server's storage path
+        :type remote_path: str
+        :return: File contents
+        :rtype: bytes
+        """
+        with self.__lock:
+            idle = self.__idle_sftp[image_server.id]
+            sftp = idle.pop() if idle else None
+
+        if sftp is not None:
+            try:
+                contents = self.__read(sftp, remote_path)
+            except Exception:  # pylint: disable = broad-except
+                sftp.close()
+            else:
+                self.__release(image_server, sftp)
+                return contents
+
+        connection_options = pysftp.CnOpts()
+        connection_options.hostkeys = None
+        sftp = pysftp.Connection(
+            **image_server.sftp_connection, cnopts=connection_options
+        )
+        try:
+            contents = self.__read(sftp, remote_path)
+        except Exception:
+            sftp.close()
+            raise
+        self.__release(image_server, sftp)
+        return contents
+
+    def close(self):
+        """Close the pooled SFTP connections."""
+        with self.__lock:
+            for connections in self.__idle_sftp.values():
+                for sftp in connections:
+                    sftp.close()
+            self.__idle_sftp.clear()
+
+    def __release(self, image_server, sftp):
+        with self.__lock:
+            self.__idle_sftp[image_server.id].append(sftp)
+
+    @staticmethod
+    def __read(sftp, remote_path):
+        with sftp.open(remote_path, "rb") as remote_file:
+            return remote_file.read()
+
+
+def get_ocr(canvas, clients=None):
     """Function to determine method for fetching OCR for a canvas.
 
     :param canvas: Canvas object
     :type canvas: apps.iiif.canvases.models.Canvas
+    :param clients: Storage connections to reuse, defaults to new connections
+    :type clients: StorageClients, optional
     :return: List of dicts of parsed OCR data.
     :rtype: list
     """
+    return parse_ocr(canvas, fetch_ocr(canvas, clients))
+
+
+def fetch_ocr(canvas, clients=None):
+    """Function to fetch the unparsed OCR for a canvas.
+
+    :param canvas: Canvas object
+    :type canvas: apps.iiif.canvases.models.Canvas
+    :param clients: Storage connections to reuse, defaults to new connections
+    :type clients: StorageClients, optional
+    :return: OCR data
+    :rtype: requests.models.Response
+    """
     if canvas.default_ocr == "line":
-        result = fetch_tei_ocr(canvas)
-        return parse_tei_ocr(result)
+        return fetch_tei_ocr(canvas)
+    return fetch_positional_ocr(canvas, clients)
+
+
+def parse_ocr(canvas, result):
+    """Function to parse OCR fetched with :func:`fetch_ocr`.
 
-    result = fetch_positional_ocr(canvas)
+    :param canvas: Canvas object
+    :type canvas: apps.iiif.canvases.models.Canvas
+    :param result: Previously fetched OCR data
+    :type result: requests.models.Response
+    :return: List of dicts of parsed OCR data.
+    :rtype: list
+    """
+    if canvas.default_ocr == "line":
+        return parse_tei_ocr(result, validate=validates_ocr(canvas))
     return add_positional_ocr(canvas, result)
 
 
+def get_ocr_for_canvases(canvases, max_workers=None, max_per_second=None):
+    """Fetch OCR for many canvases concurrently, reusing connections, and parse it.
+
+    Fetches are bounded and rate limited, see :func:`apps.utils.fetch.fetch_concurrently`.
+    Select the canvases' `manifest__image_server` and `image_server` first so
+    the fetching threads do not query the database.
+
+    :param canvases: Canvas objects
+    :type canvases: iterable
+    :param max_workers: Concurrent fetches, defaults to `settings.FETCH_MAX_WORKERS`
+    :type max_workers: int, optional
+    :param max_per_second: Rate limit, defaults to `settings.FETCH_MAX_PER_SECOND`
+    :type max_per_second: float, optional
+    :return: List of (canvas, parsed OCR) tuples, in the order given
+    :rtype: list
+    """
+    canvases = list(canvases)
+    with StorageClients() as clients:
+        results = fetch_concurrently(
+            lambda canvas: fetch_ocr(canvas, clients),
+            canvases,
+            max_workers=max_workers,
+            max_per_second=max_per_second,
+        )
+    ocr = []
+    for canvas, result in zip(canvases, results):
+        try:
+            ocr.append((canvas, parse_ocr(canvas, result)))
+        except Exception as error:  # pylint: disable = broad-except
+            LOGGER.error(f"Failed to parse OCR for canvas {canvas.pid}: {error}")
+            ocr.append((canvas, None))
+    return ocr
+
+
+def image_info_cache_key(resource_id):
+    """Cache key for the IIIF image info of a resource.
+
+    :param resource_id: Canvas resource id
+    :type resource_id: str
+    :return: Cache key
+    :rtype: str
+    """
+    return f"iiif-image-info-{md5(resource_id.encode('utf-8')).hexdigest()}"
+
+
 def get_canvas_info(canvas):
     """Given a canvas, this function returns the IIIF image info.
 
+    The info is cached for `settings.IMAGE_INFO_CACHE_TIMEOUT` seconds, keyed
+    by the canvas' resource id.
+
     :param canvas: Canvas object
     :type canvas: apps.iiif.canvases.models.Canvas
     :return: IIIF image info as JSON
     :rtype: requests.models.Response
     """
+    return get_canvas_infos([canvas])[0]
+
+
+def get_canvas_infos(canvases, max_workers=None, max_per_second=None):
+    """Get the IIIF image info for many canvases, fetching those that are not
+    cached concurrently.
+
+    Fetches are bounded and rate limited, see :func:`apps.utils.fetch.fetch_concurrently`.
+    Select the canvases' `manifest__image_server` and `image_server` first to
+    avoid a query per canvas.
+
+    :param canvases: Canvas objects
+    :type canvases: iterable
+    :param max_workers: Concurrent fetches, defaults to `settings.FETCH_MAX_WORKERS`
+    :type max_workers: int, optional
+    :param max_per_second: Rate limit, defaults to `settings.FETCH_MAX_PER_SECOND`
+    :type max_per_second: float, optional
+    :return: IIIF image info, or None if it could not be fetched, in the order given
+    :rtype: list
+    """
+    canvases = list(canvases)
+    resource_ids = [canvas.resource_id for canvas in canvases]
+    keys = [image_info_cache_key(str(resource_id)) for resource_id in resource_ids]
+    infos = cache.get_many(keys) if settings.IMAGE_INFO_CACHE_TIMEOUT else {}
+
+    missing = {}
+    for canvas, resource_id, key in zip(canvases, resource_ids, keys):
+        if key not in infos:
+            missing.setdefault(key, (canvas, f"{resource_id}/info.json"))
+
     # If testing, just fake it.
-    if environ["DJANGO_ENV"] == "test":
+    if missing and environ["DJANGO_ENV"] == "test":
         httpretty.enable(allow_net_connect=False)
-        activate_fake_canvas_info(canvas)
-        # return response
+        for canvas, _ in missing.values():
+            activate_fake_canvas_info(canvas)
 
-    response = fetch_url(
-        f"{canvas.resource_id}/info.json",
-        timeout=settings.HTTP_REQUEST_TIMEOUT,
-        data_format="json",
-    )
+    def fetch_info(url):
+        return fetch_url(url, timeout=settings.HTTP_REQUEST_TIMEOUT, data_format="json")
+
+    urls = [url for _, url in missing.values()]
+    if len(urls) > 1:
+        fetched = fetch_concurrently(
+            fetch_info, urls, max_workers=max_workers, max_per_second=max_per_second
+        )
+    else:
+        fetched = [fetch_info(url) for url in urls]
+    fresh = {key: info for key, info in zip(missing, fetched) if info is not None}
+    if fresh and settings.IMAGE_INFO_CACHE_TIMEOUT:
+        cache.set_many(fresh, settings.IMAGE_INFO_CACHE_TIMEOUT)
+    infos.update(fresh)
 
-    return response
+    return [infos.get(key) for key in keys]
 
 
 def fetch_tei_ocr(canvas):
@@ -110,11 +363,13 @@ def fetch_tei_ocr(canvas):
 
 # TODO: Maybe add "OCR Source" and "OCR Type" attributes to the manifest model. That might
 # help make this more universal.
-def fetch_positional_ocr(canvas):
+def fetch_positional_ocr(canvas, clients=None):
     """Function to get OCR for a canvas depending on the image's source.
 
     :param canvas: Canvas object
     :type canvas: apps.iiif.canvases.models.Canvas
+    :param clients: Storage connections to reuse, defaults to new connections
+    :type clients: StorageClients, optional
     :return: Positional OCR data
     :rtype: requests.models.Response
     """
@@ -182,30 +437,21 @@ def fetch_positional_ocr(canvas):
 
     if canvas.ocr_file_path is not None:
         if canvas.image_server.storage_service == "s3":
-            return (
-                canvas.image_server.bucket.Object(canvas.ocr_file_path)
-                .get()["Body"]
-                .read()
+            bucket = (
+                clients.bucket(canvas.image_server)
+                if clients
+                else canvas.image_server.bucket
             )
+            return bucket.Object(canvas.ocr_file_path).get()["Body"].read()
         if canvas.image_server.storage_service == "sftp":
             try:
                 if environ["DJANGO_ENV"] == "test":
                     httpretty.disable()
 
-                connection_options = pysftp.CnOpts()
-                connection_options.hostkeys = None
-                sftp = pysftp.Connection(
-                    **canvas.image_server.sftp_connection, cnopts=connection_options
-                )
-                ocr_local_file_path = path.join(gettempdir(), canvas.ocr_file_path)
-                sftp.get(canvas.ocr_file_path, localpath=ocr_local_file_path)
-
-                with open(ocr_local_file_path, "r") as ocr_file:
-                    ocr_contents = ocr_file.read()
-
-                remove(ocr_local_file_path)
-
-                return ocr_contents.encode()
+                if clients:
+                    return clients.read_sftp(canvas.image_server, canvas.ocr_file_path)
+                with StorageClients() as single_use:
+                    return single_use.read_sftp(canvas.image_server, canvas.ocr_file_path)
             except Exception as error:
                 LOGGER.error(
                     f"Failed to get OCR files from SFTP server with exception: {error}"
@@ -215,6 +461,64 @@ def fetch_positional_ocr(canvas):
     return fetch_url(url, data_format="text/plain")
 
 
+def ocr_word(content, x, y, w, h):
+    """The record every OCR parser yields for a word (or a TEI line).
+
+    :return: Dict with the word's `content` and its box
+    :rtype: dict
+    """
+    return {"content": content, "x": x, "y": y, "w": w, "h": h}
+
+
+def _ocr_text(result):
+    """Fetched OCR as a string."""
+    if isinstance(result, bytes):
+        return result.decode("utf-8")
+    return str(result)
+
+
+def _xml_source(result):
+    """Fetched XML OCR as a file-like object for `etree.iterparse`."""
+    if isinstance(result, str):
+        return BytesIO(result.encode("utf-8"))
+    return BytesIO(result)
+
+
+def _release(element):
+    """Free a parsed element and its earlier siblings while iterparsing."""
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def sniff_ocr_format(result):
+    """Function to guess the format of fetched OCR from its first bytes.
+
+    :param result: Fetched OCR data
+    :type result: requests.models.Response
+    :return: "json", "xml", "tsv", "fedora" (a TSV with a byte order mark) or None
+    :rtype: str
+    """
+    if isinstance(result, dict):
+        return "json"
+    if not result:
+        return None
+    head = result[:SNIFF_LENGTH]
+    fedora = False
+    if isinstance(head, bytes):
+        fedora = head.startswith(codecs.BOM_UTF8)
+        # The cut may split a multibyte character.
+        head = head.decode("utf-8-sig", errors="ignore")
+    head = str(head).lstrip()
+    if head[:1] in ("{", "["):
+        return "json"
+    if head[:1] == "<":
+        return "xml"
+    if "\t" in head:
+        return "fedora" if fedora else "tsv"
+    return None
+
+
 def is_json(to_test):
     """Function to test if data is shaped like JSON.
 
@@ -223,15 +527,7 @@ def is_json(to_test):
     :return: True if shaped like JSON, False if not.
     :rtype: bool
     """
-    if isinstance(to_test, bytes):
-        as_str = to_test.decode("utf-8")
-    else:
-        as_str = str(to_test)
-    try:
-        json.loads(as_str)
-    except ValueError:
-        return False
-    return True
+    return sniff_ocr_format(to_test) == "json"
 
 
 def is_tsv(to_test):
@@ -242,16 +538,7 @@ def is_tsv(to_test):
     :return: True if shaped like a TSV, False if not.
     :rtype: bool
     """
-    if isinstance(to_test, bytes):
-        as_str = to_test.decode("utf-8")
-        as_list = as_str.splitlines()
-    else:
-        as_str = str(to_test)
-        as_list = as_str.split("\n")
-    if len(as_list) > 1:
-        if len(as_str.split("\t")) > 1:
-            return True
-    return False
+    return sniff_ocr_format(to_test) in ("tsv", "fedora")
 
 
 def add_positional_ocr(canvas, result):
@@ -267,127 +554,152 @@ def add_positional_ocr(canvas, result):
     ocr = None
     if result is None:
         return None
+    validate = validates_ocr(canvas)
     if canvas.ocr_file_path is None:
-        if isinstance(result, dict) or is_json(result):
+        ocr_format = sniff_ocr_format(result)
+        if ocr_format == "json":
             ocr = parse_dict_ocr(result)
-        elif is_tsv(result) and isinstance(result, bytes):
-            if result.decode("utf-8") == result.decode("UTF-8-sig"):
-                ocr = parse_tsv_ocr(result)
-            else:
-                ocr = parse_fedora_ocr(result)
-        elif is_tsv(result):
+        elif ocr_format == "tsv":
             ocr = parse_tsv_ocr(result)
+        elif ocr_format == "fedora":
+            ocr = parse_fedora_ocr(result)
     elif canvas.ocr_file_path.endswith(".json"):
         ocr = parse_dict_ocr(result)
     elif canvas.ocr_file_path.endswith(".tsv") or canvas.ocr_file_path.endswith(".tab"):
         ocr = parse_tsv_ocr(result)
     elif canvas.ocr_file_path.endswith(".xml"):
-        ocr = parse_xml_ocr(result)
+        ocr = parse_xml_ocr(result, validate=validate)
     elif canvas.ocr_file_path.endswith(".hocr"):
-        ocr = parse_hocr_ocr(result)
+        ocr = parse_hocr_ocr(result, validate=validate)
     return ocr
 
 
-def parse_alto_ocr(result):
+def iter_alto_words(result, validate=True):
+    """Generator of words in ALTO OCR, parsed incrementally.
+
+    :param result: Fetched ALTO OCR data
+    :type result: requests.models.Response
+    :param validate: Validate against the ALTO schema, defaults to True
+    :type validate: bool, optional
+    :return: Words from :func:`ocr_word`
+    :rtype: generator
+    """
+    schema = None
+    if validate:
+        # The root element's namespace gives the ALTO version.
+        _, root = next(etree.iterparse(_xml_source(result), events=("start",)))
+        schema = xml_schema(
+            next(
+                (schema for ns, schema in ALTO_SCHEMAS.items() if ns in root.tag),
+                ALTO_DEFAULT_SCHEMA,
+            )
+        )
+    # The following will raise etree.XMLSyntaxError if invalid
+    for _, string in etree.iterparse(_xml_source(result), tag="{*}String", schema=schema):
+        attrib = {k.lower(): v for k, v in string.attrib.items()}
+        yield ocr_word(
+            attrib["content"],
+            int(attrib["hpos"]),
+            int(attrib["vpos"]),
+            int(attrib["width"]),
+            int(attrib["height"]),
+        )
+        _release(string)
+
+
+def parse_alto_ocr(result, validate=True):
     """Function to parse fetched ALTO OCR data for a given canvas.
 
     :param result: Fetched ALTO OCR data
     :type result: requests.models.Response
+    :param validate: Validate against the ALTO schema, defaults to True
+    :type validate: bool, optional
     :return: Parsed OCR data
     :rtype: list
     """
     if result is None:
         return None
-    ocr = []
-    unvalidated_root = etree.fromstring(result)
-    if "ns-v2" in unvalidated_root.tag:
-        schema_file = "xml_schema/alto-2-1.xsd"
-    elif "ns-v3" in unvalidated_root.tag:
-        schema_file = "xml_schema/alto-3-1.xsd"
-    elif "ns-v4" in unvalidated_root.tag:
-        schema_file = "xml_schema/alto-4-2.xsd"
-    else:
-        schema_file = "xml_schema/alto-1-4.xsd"
-    parser = etree.XMLParser(schema=etree.XMLSchema(file=schema_file))
-    # The following will raise etree.XMLSyntaxError if invalid
-    root = etree.fromstring(result, parser=parser)
-    strings = root.findall(".//String")
-    if not strings:
-        strings = root.findall(".//{*}String")
-    for string in strings:
-        attrib = {k.lower(): v for k, v in string.attrib.items()}
-        ocr.append(
-            {
-                "content": attrib["content"],
-                "h": int(attrib["height"]),
-                "w": int(attrib["width"]),
-                "x": int(attrib["hpos"]),
-                "y": int(attrib["vpos"]),
-            }
-        )
-    if ocr:
-        return ocr
-    return None
+    return list(iter_alto_words(result, validate)) or None
 
 
-def parse_hocr_ocr(result):
-    """Function to parse fetched hOCR data for a given canvas.
+def iter_hocr_words(result, validate=True):
+    """Generator of words in hOCR, parsed incrementally after validation.
 
     :param result: Fetched hOCR data
     :type result: requests.models.Response
-    :return: Parsed OCR data
-    :rtype: list
+    :param validate: Validate against the hOCR spec, defaults to True
+    :type validate: bool, optional
+    :return: Words from :func:`ocr_word`
+    :rtype: generator
     """
-    if isinstance(result, bytes):
-        as_string = result.decode("utf-8")
-    else:
-        as_string = str(result)
     # Regex to ignore x_size, x_ascenders, x_descenders. this is a known issue with
     # tesseract producded hOCR: https://github.com/tesseract-ocr/tesseract/issues/3303
     result_without_invalid = re.sub(
         r"([ ;]+)(x_size [0-9\.\-;]+)|( x_descenders [0-9\.\-;]+)|( x_ascenders [0-9\.\-;]+)",
         repl="",
-        string=as_string,
+        string=_ocr_text(result),
     )
     file_like_hocr = BytesIO(result_without_invalid.encode("utf-8"))
-    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+    if validate:
+        validator = HocrValidator(profile="relaxed")
+        # The report names the source, which must be a string.
+        report = validator.validate(source=file_like_hocr, filename="hocr")
+        is_valid = report.format("bool")
+        if not is_valid:
+            report_text = report.format("text")
+            raise HocrValidationError(str(report_text))
         file_like_hocr.seek(0)
-        tmp_file.write(file_like_hocr.read())
-        tmp_file.flush()
-        temp_file_name = tmp_file.name
-    validator = HocrValidator(profile="relaxed")
-    report = validator.validate(source=temp_file_name)
-    is_valid = report.format("bool")
-    if not is_valid:
-        report_text = report.format("text")
-        unlink(temp_file_name)
-        raise HocrValidationError(str(report_text))
-    unlink(temp_file_name)
-    ocr = []
-    file_like_hocr.seek(0)
-    tree = etree.parse(file_like_hocr)
-    words = tree.findall(".//span[@class]")
-    if not words:
-        words = tree.findall(".//{*}span[@class]")
-    for word in words:
-        if word.attrib["class"] == "ocrx_word":
+    for _, word in etree.iterparse(file_like_hocr, tag="{*}span"):
+        if word.get("class") == "ocrx_word":
             all_attribs = word.attrib["title"].split(";")
             bbox = next((attrib for attrib in all_attribs if "bbox" in attrib), "")
             # Splitting 'bbox x0 y0 x1 y1'
             bbox_attribs = bbox.split(" ")
             if len(bbox_attribs) == 5:
-                ocr.append(
-                    {
-                        "content": word.text,
-                        "h": int(bbox_attribs[4]) - int(bbox_attribs[2]),
-                        "w": int(bbox_attribs[3]) - int(bbox_attribs[1]),
-                        "x": int(bbox_attribs[1]),
-                        "y": int(bbox_attribs[2]),
-                    }
+                x0, y0, x1, y1 = (int(coordinate) for coordinate in bbox_attribs[1:])
+                yield ocr_word(word.text, x0, y0, x1 - x0, y1 - y0)
+            _release(word)
+
+
+def parse_hocr_ocr(result, validate=True):
+    """Function to parse fetched hOCR data for a given canvas.
+
+    :param result: Fetched hOCR data
+    :type result: requests.models.Response
+    :param validate: Validate against the hOCR spec, defaults to True
+    :type validate: bool, optional
+    :return: Parsed OCR data
+    :rtype: list
+    """
+    return list(iter_hocr_words(result, validate)) or None
+
+
+def iter_dict_words(result):
+    """Generator of words in dict or JSON OCR data.
+
+    :param result: Fetched dict OCR data
+    :type result: requests.models.Response
+    :return: Words from :func:`ocr_word`
+    :rtype: generator
+    """
+    if isinstance(result, (bytes, str)):
+        try:
+            as_dict = json.loads(result)
+        except ValueError:
+            # Sniffed as JSON from the first character, but not JSON after all.
+            return
+    else:
+        as_dict = result
+    if isinstance(as_dict, dict) and as_dict.get("ocr") is not None:
+        for word in as_dict["ocr"]:
+            for w in word:
+                yield ocr_word(
+                    w[0],
+                    w[1][0],
+                    w[1][3],
+                    w[1][2] - w[1][0],
+                    w[1][1] - w[1][3],
                 )
-    if ocr:
-        return ocr
-    return None
 
 
 def parse_dict_ocr(result):
@@ -398,63 +710,83 @@ def parse_dict_ocr(result):
     :return: Parsed OCR data
     :rtype: list
     """
-    ocr = []
-    if isinstance(result, bytes):
-        as_string = result.decode("utf-8")
-        as_dict = json.loads(as_string)
-    elif isinstance(result, str):
-        as_dict = json.loads(result)
-    else:
-        as_dict = result
-    if "ocr" in as_dict and as_dict["ocr"] is not None:
-        for index, word in enumerate(as_dict["ocr"]):  # pylint: disable=unused-variable
-            if len(word) > 0:
-                for w in word:
-                    ocr.append(
-                        {
-                            "content": w[0],
-                            "w": (w[1][2] - w[1][0]),
-                            "h": (w[1][1] - w[1][3]),
-                            "x": w[1][0],
-                            "y": w[1][3],
-                        }
-                    )
-    if ocr:
-        return ocr
-    return None
+    return list(iter_dict_words(result)) or None
+
 
+def iter_tei_words(result, validate=True):
+    """Generator of lines in TEI OCR, parsed incrementally.
 
-def parse_tei_ocr(result):
+    Each line is a `zone` in a block `zone` on the `surface`; its text is in
+    the line zone's last child.
+
+    :param result: Fetched TEI OCR data
+    :type result: requests.models.Response
+    :param validate: Validate against the TEI schema, defaults to True
+    :type validate: bool, optional
+    :return: Lines from :func:`ocr_word`
+    :rtype: generator
+    """
+    schema = xml_schema(TEI_SCHEMA) if validate else None
+    # The following will raise etree.XMLSyntaxError if invalid
+    for _, zones in etree.iterparse(_xml_source(result), tag="{*}zone", schema=schema):
+        surface = zones.getparent()
+        if surface is None or etree.QName(surface).localname != "surface":
+            # A line zone, read with its block.
+            continue
+        for line in zones:
+            # if line[-1].text is None:
+            #     continue
+            ulx, uly = int(line.get("ulx")), int(line.get("uly"))
+            yield ocr_word(
+                line[-1].text,
+                ulx,
+                uly,
+                int(line.get("lrx")) - ulx,
+                int(line.get("lry")) - uly,
+            )
+        _release(zones)
+
+
+def parse_tei_ocr(result, validate=True):
     """Function to parse fetched TEI OCR data for a given canvas.
 
     :param result: Fetched TEI OCR data
     :type result: requests.models.Response
+    :param validate: Validate against the TEI schema, defaults to True
+    :type validate: bool, optional
     :return: Parsed OCR data
     :rtype: list
     """
     if result is None:
         return None
-    ocr = []
-    parser = etree.XMLParser(schema=etree.XMLSchema(file="xml_schema/tei_all.xsd"))
-    # The following will raise etree.XMLSyntaxError if invalid
-    surface = etree.fromstring(result, parser=parser)[-1][0]
-    for zones in surface:
-        if "zone" in zones.tag:
-            for line in zones:
-                # if line[-1].text is None:
-                #     continue
-                ocr.append(
-                    {
-                        "content": line[-1].text,
-                        "h": int(line.get("lry")) - int(line.get("uly")),
-                        "w": int(line.get("lrx")) - int(line.get("ulx")),
-                        "x": int(line.get("ulx")),
-                        "y": int(line.get("uly")),
-                    }
-                )
-    if ocr:
-        return ocr
-    return None
+    return list(iter_tei_words(result, validate)) or None
+
+
+def iter_tsv_words(result):
+    """Generator of words in TSV OCR data, splitting each line once.
+
+    :param result: Fetched TSV OCR data
+    :type result: requests.models.Response
+    :return: Words from :func:`ocr_word`
+    :rtype: generator
+    """
+    columns = None
+    for line in _ocr_text(result).splitlines():
+        # Sometimes the TSV has some extra tabs at the beginning and the end.
+        line = line.strip()
+        if not line:
+            continue
+        # It might be true that the "content" column is empty. However, we just
+        # removed it. So we have to add it back.
+        if line.count("\t") == 3:
+            line = " \t" + line
+        fields = line.split("\t")
+        if columns is None:
+            # The header row names the columns.
+            columns = [fields.index(name) for name in ("content", "x", "y", "w", "h")]
+            continue
+        content, x, y, w, h = (fields[column] for column in columns)
+        yield ocr_word(content, int(x), int(y), int(w), int(h))
 
 
 def parse_tsv_ocr(result):
@@ -465,43 +797,24 @@ def parse_tsv_ocr(result):
     :return: Parsed OCR data
     :rtype: list
     """
-    ocr = []
-    if isinstance(result, bytes):
-        lines = result.decode("utf-8").splitlines()
-    else:
-        lines = str(result).split("\n")
+    return list(iter_tsv_words(result)) or None
 
-    # Sometimes the TSV has some extra tabs at the beginning and the end. These have
-    # to be cleaned out. It gets complicatied.
-    for index, line in enumerate(lines):
-        # First we remove any leading column that is empty.
-        line = line.strip()
-        lines[index] = line
-        # It might be true that the "content" column is empty. However, we just
-        # removed it. So we have to add it back.
-        if lines[index].count("\t") == 3:
-            lines[index] = " \t" + lines[index]
-
-    reader = csv.DictReader(lines, dialect=IncludeQuotesDialect)
-
-    for row in reader:
-        content = row["content"]
-        w = int(row["w"])
-        h = int(row["h"])
-        x = int(row["x"])
-        y = int(row["y"])
-        ocr.append(
-            {
-                "content": content,
-                "w": w,
-                "h": h,
-                "x": x,
-                "y": y,
-            }
-        )
-    if ocr:
-        return ocr
-    return None
+
+def iter_fedora_words(result):
+    """Generator of words in Fedora OCR data: headerless, tab separated
+    x, y, w, h and content.
+
+    :param result: Fetched Fedora OCR data (bytes)
+    :type result: requests.models.Response
+    :return: Words from :func:`ocr_word`
+    :rtype: generator
+    """
+    # What comes back from fedora is 8-bit bytes
+    for line in result.decode("UTF-8-sig").strip().split("\r\n"):
+        fields = line.split("\t")
+        if len(fields) == 5:
+            x, y, w, h, content = fields
+            yield ocr_word(content, int(x), int(y), int(w), int(h))
 
 
 def parse_fedora_ocr(result):
@@ -512,49 +825,77 @@ def parse_fedora_ocr(result):
     :return: Parsed OCR data
     :rtype: list
     """
-    ocr = []
     if isinstance(result, bytes):
-        # What comes back from fedora is 8-bit bytes
-        for _, word in enumerate(result.decode("UTF-8-sig").strip().split("\r\n")):
-            if len(word.split("\t")) == 5:
-                ocr.append(
-                    {
-                        "content": word.split("\t")[4],
-                        "w": int(word.split("\t")[2]),
-                        "h": int(word.split("\t")[3]),
-                        "x": int(word.split("\t")[0]),
-                        "y": int(word.split("\t")[1]),
-                    }
-                )
-    return ocr
+        return list(iter_fedora_words(result))
+    return []
+
 
+def sniff_xml_flavor(result):
+    """Function to determine the flavor of XML OCR, reading only as far as the
+    first element that gives it away.
 
-def parse_xml_ocr(result):
+    :param result: Fetched XML OCR data
+    :type result: requests.models.Response
+    :return: "alto", "tei", "hocr" or None
+    :rtype: str
+    """
+    for position, (_, element) in enumerate(
+        etree.iterparse(_xml_source(result), events=("start",))
+    ):
+        if position == 0 and re.match(r"{[0-9A-Za-z.:/#-]+}alto|alto", element.tag):
+            return "alto"
+        if position == 1 and "www.loc.gov/standards/alto" in element.tag:
+            return "alto"
+        name = etree.QName(element).localname
+        if name == "teiHeader":
+            return "tei"
+        if name == "div":
+            # Fallback to hOCR if it looks like XHTML
+            return "hocr"
+    return None
+
+
+def parse_xml_ocr(result, validate=True):
     """Function to determine the flavor of XML OCR and then parse accordingly.
 
     :param result: Fetched XML OCR data
     :type result: requests.models.Response
+    :param validate: Validate against the flavor's schema, defaults to True
+    :type validate: bool, optional
     :return: Parsed OCR data
     :rtype: list
     """
-    root = etree.fromstring(result)
-    if (
-        re.match(r"{[0-9A-Za-z.:/#-]+}alto|alto", root.tag)
-        or "www.loc.gov/standards/alto" in root.find(".//*").tag
-    ):
-        return parse_alto_ocr(result)
-    if (
-        root.find(".//teiHeader") is not None
-        or root.find(".//{*}teiHeader") is not None
-    ):
-        return parse_tei_ocr(result)
-    if root.find(".//div") is not None or root.find(".//{*}div") is not None:
-        # Fallback to hOCR if it looks like XHTML
-        return parse_hocr_ocr(result)
+    flavor = sniff_xml_flavor(result)
+    if flavor == "alto":
+        return parse_alto_ocr(result, validate=validate)
+    if flavor == "tei":
+        return parse_tei_ocr(result, validate=validate)
+    if flavor == "hocr":
+        return parse_hocr_ocr(result, validate=validate)
     return None
 
 
-def add_ocr_annotations(canvas, ocr):
+def add_ocr_annotations(canvas, ocr, batch_size=None):
+    """Function to create OCR annotations for a canvas in bulk.
+
+    The `<span>` and style markup for each word is built in memory and the
+    annotations are written with `bulk_create` inside a single transaction.
+
+    :param canvas: Canvas object
+    :type canvas: apps.iiif.canvases.models.Canvas
+    :param ocr: List of dicts of parsed OCR data.
+    :type ocr: list
+    :param batch_size: Number of annotations per INSERT, defaults to
+        `settings.OCR_ANNOTATION_BATCH_SIZE`
+    :type batch_size: int, optional
+    :return: List of created annotations
+    :rtype: list
+    """
+    if batch_size is None:
+        batch_size = settings.OCR_ANNOTATION_BATCH_SIZE
+
+    ocr_user = get_ocr_user()
+    annotations = []
     word_order = 1
     for word in ocr:
         # A quick check to make sure the header row didn't slip through.
@@ -578,13 +919,151 @@ def add_ocr_annotations(canvas, ocr):
         anno.resource_type = anno.OCR
         anno.content = word["content"]
         anno.order = word_order
-        anno.save()
+        anno.set_span_element(ocr_user)
+        annotations.append(anno)
         word_order += 1
 
+    with transaction.atomic():
+        Annotation.objects.bulk_create(annotations, batch_size=batch_size)
+        canvas.refresh_ocr_text()
+
+    return annotations
+
+
+def rebuild_ocr_annotations(canvas, ocr, batch_size=None):
+    """Function to bring a canvas' OCR annotations in line with freshly parsed OCR.
+
+    The canvas' existing OCR annotations are indexed in memory by their
+    bounding box and diffed against `ocr`. Words with a matching box keep
+    their annotation and are updated if their text or order changed, new
+    boxes are inserted, and annotations whose box is gone are deleted. Stale
+    annotations that a user annotation is anchored to are kept so the user's
+    annotation is not deleted with them, and are ordered after the new words.
+    All writes are made in bulk in one
+    transaction, so running it again with the same OCR changes nothing.
+
+    :param canvas: Canvas object
+    :type canvas: apps.iiif.canvases.models.Canvas
+    :param ocr: List of dicts of parsed OCR data.
+    :type ocr: list
+    :param batch_size: Number of annotations per query, defaults to
+        `settings.OCR_ANNOTATION_BATCH_SIZE`
+    :type batch_size: int, optional
+    :return: Number of annotations `created`, `updated`, `deleted`, `kept` and `unchanged`
+    :rtype: dict
+    """
+    if batch_size is None:
+        batch_size = settings.OCR_ANNOTATION_BATCH_SIZE
+
+    ocr_user = get_ocr_user()
+    existing = defaultdict(list)
+    for anno in Annotation.objects.filter(canvas=canvas, owner=ocr_user).order_by("order"):
+        existing[(anno.x, anno.y, anno.w, anno.h)].append(anno)
+
+    created = []
+    updated = []
+    unchanged = 0
+    word_order = 1
+    with transaction.atomic():
+        for word in ocr:
+            if (
+                word == ""
+                or "content" not in word
+                or not word["content"]
+                or word["content"].isspace()
+            ):
+                continue
+            matches = existing.get(
+                (int(word["x"]), int(word["y"]), int(word["w"]), int(word["h"]))
+            )
+            if matches:
+                anno = matches.pop(0)
+                if anno.order == word_order and _ocr_word(anno) == word["content"]:
+                    unchanged += 1
+                else:
+                    anno.content = word["content"]
+                    anno.order = word_order
+                    anno.set_span_element(ocr_user)
+                    # bulk_update does not apply auto_now
+                    anno.modified_at = timezone.now()
+                    updated.append(anno)
+            else:
+                anno = Annotation(
+                    canvas=canvas,
+                    x=word["x"],
+                    y=word["y"],
+                    w=word["w"],
+                    h=word["h"],
+                    resource_type=Annotation.OCR,
+                    content=word["content"],
+                    order=word_order,
+                )
+                anno.set_span_element(ocr_user)
+                created.append(anno)
+            word_order += 1
+
+        stale = sorted(
+            (anno for annos in existing.values() for anno in annos),
+            key=lambda anno: anno.order,
+        )
+        anchored = set()
+        if stale:
+            # User annotations are deleted along with the words they are anchored to.
+            anchored = set(
+                Annotation.objects.filter(pk__in=[anno.pk for anno in stale])
+                .filter(Q(start_selector__isnull=False) | Q(end_selector__isnull=False))
+                .values_list("pk", flat=True)
+            )
+        deleted = [anno.pk for anno in stale if anno.pk not in anchored]
+
+        # Kept words follow the new ones so no two words share an order.
+        renumbered = []
+        for anno in stale:
+            if anno.pk not in anchored:
+                continue
+            if anno.order != word_order:
+                anno.order = word_order
+                anno.modified_at = timezone.now()
+                renumbered.append(anno)
+            word_order += 1
+
+        Annotation.objects.bulk_create(created, batch_size=batch_size)
+        Annotation.objects.bulk_update(
+            updated,
+            ["content", "order", "style", "oa_annotation", "modified_at"],
+            batch_size=batch_size,
+        )
+        Annotation.objects.bulk_update(
+            renumbered, ["order", "modified_at"], batch_size=batch_size
+        )
+        for start in range(0, len(deleted), batch_size):
+            Annotation.objects.filter(pk__in=deleted[start : start + batch_size]).delete()
+        canvas.refresh_ocr_text()
+
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "deleted": len(deleted),
+        "kept": len(stale) - len(deleted),
+        "unchanged": unchanged,
+    }
+
+
+def _ocr_word(annotation):
+    """The plain text of an OCR annotation, without the `<span>` markup."""
+    if annotation.content and annotation.content.startswith("<span"):
+        return BeautifulSoup(annotation.content, "html.parser").span.string
+    return annotation.content
+
 
 def add_oa_annotations(annotation_list_url):
     data = fetch_url(annotation_list_url)
+    canvases = {}
     for oa_annotation in data["resources"]:
         anno, _ = deserialize("annotation", oa_annotation)
         annotation = Annotation(**anno)
         Annotation.objects.bulk_create([annotation])
+        if annotation.canvas_id is not None:
+            canvases[annotation.canvas_id] = annotation.canvas
+    for canvas in canvases.values():
+        canvas.refresh_ocr_text()
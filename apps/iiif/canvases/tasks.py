@@ -1,13 +1,26 @@
 """ Common tasks for canvases. """
 from celery import Celery
+from celery.signals import worker_init
 from .models import Canvas
-from .services import add_ocr_annotations, get_ocr, add_oa_annotations
+from .services import (
+    add_ocr_annotations,
+    compile_xml_schemas,
+    get_ocr,
+    add_oa_annotations,
+    rebuild_ocr_annotations,
+)
 from django.conf import settings
 
 app = Celery('apps.iiif.canvases')
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+@worker_init.connect
+def warm_xml_schemas(**kwargs):  # pylint: disable=unused-argument
+    """Compile the OCR schemas before the worker starts its pool, so the
+    forked processes share them."""
+    compile_xml_schemas()
+
 @app.task(name='adding_ocr_to_canvas', autoretry_for=(Canvas.DoesNotExist,), retry_backoff=5)
 def add_ocr_task(canvas_id, *args, **kwargs):
     """Function for parsing and adding OCR."""
@@ -21,3 +34,24 @@ def add_ocr_task(canvas_id, *args, **kwargs):
 @app.task(name='adding_oa_ocr_to_canvas', retry_backoff=5)
 def add_oa_ocr_task(annotation_list_url):
     add_oa_annotations(annotation_list_url)
+
+def rebuild_canvas_ocr(canvas_id):
+    """Function for fetching a canvas' OCR and diffing it against its OCR annotations.
+
+    :return: Counts from :func:`.services.rebuild_ocr_annotations`, or None if
+        no OCR was found.
+    :rtype: dict
+    """
+    canvas = Canvas.objects.select_related(
+        'manifest__image_server', 'image_server'
+    ).get(pk=canvas_id)
+    ocr = get_ocr(canvas)
+
+    if ocr is None:
+        return None
+    return rebuild_ocr_annotations(canvas, ocr)
+
+@app.task(name='rebuilding_ocr_for_canvas', autoretry_for=(Canvas.DoesNotExist,), retry_backoff=5)
+def rebuild_ocr_task(canvas_id, *args, **kwargs):
+    """Function for rebuilding a canvas' OCR annotations."""
+    return rebuild_canvas_ocr(canvas_id)
@@ -1,6 +1,8 @@
 from apps.iiif.canvases.models import Canvas
 from os.path import join
+from unittest.mock import patch
 from urllib.parse import quote
+from django.core.cache import cache
 from django.test import TestCase, Client
 from boto3 import client, resource
 from botocore.exceptions import ClientError
@@ -8,6 +10,7 @@ from moto import mock_aws
 from django.conf import settings
 from apps.iiif.manifests.tests.factories import ManifestFactory, ImageServerFactory
 from .factories import CanvasFactory, CanvasNoDimensionsFactory
+from .. import services
 
 
 class TestCanvasModels(TestCase):
@@ -173,6 +176,59 @@ class TestCanvasModels(TestCase):
         assert canvas.height == 3000
         assert canvas.width == 3000
 
+    def test_image_info_fetched_once_per_save(self):
+        canvas = CanvasNoDimensionsFactory.build(manifest=ManifestFactory.create())
+        with patch.object(services, "fetch_url", wraps=services.fetch_url) as fetch_url:
+            canvas.save()
+        assert fetch_url.call_count == 1
+        assert canvas.height == 3000
+
+    def test_image_info_cached_by_resource_id(self):
+        manifest = ManifestFactory.create()
+        canvases = [
+            CanvasFactory.create(manifest=manifest, resource=f"page-{position}")
+            for position in range(3)
+        ]
+        cache.clear()
+        with self.settings(IMAGE_INFO_CACHE_TIMEOUT=60), patch.object(
+            services, "fetch_url", wraps=services.fetch_url
+        ) as fetch_url:
+            Canvas.prefetch_image_info(canvases)
+            assert fetch_url.call_count == 3
+            Canvas.prefetch_image_info(
+                list(Canvas.objects.filter(pk__in=[canvas.pk for canvas in canvases]))
+            )
+            assert fetch_url.call_count == 3
+            assert canvases[0].image_info["width"] == 3000
+            assert fetch_url.call_count == 3
+
+    def test_bulk_import(self):
+        manifest = ManifestFactory.create()
+        existing = manifest.canvas_set.first()
+        specs = [{"pid": f"bulk-{page}", "label": f"Page {page}"} for page in range(3)]
+        specs.append({"pid": "bulk-sized", "width": 10, "height": 20})
+        specs.append({"pid": existing.pid})
+        with patch.object(
+            services, "fetch_url", wraps=services.fetch_url
+        ) as fetch_url, patch(
+            "apps.iiif.canvases.models.index_manifest_on_commit"
+        ) as index_manifest_on_commit:
+            canvases = Canvas.objects.bulk_import(manifest, specs)
+
+        assert [canvas.position for canvas in canvases] == [
+            existing.position + offset for offset in range(1, 6)
+        ]
+        # Only canvases without dimensions need their image info.
+        assert fetch_url.call_count == 4
+        index_manifest_on_commit.assert_called_once_with(manifest.id)
+        assert Canvas.objects.get(pid="bulk-0").width == 3000
+        assert Canvas.objects.get(pid="bulk-sized").width == 10
+        # A taken pid is replaced.
+        assert canvases[-1].pid != existing.pid
+        assert manifest.canvas_set.count() == 6
+        manifest.refresh_from_db()
+        assert manifest.start_canvas == existing
+
     def test_setting_height_and_width(self):
         canvas = CanvasNoDimensionsFactory.build(manifest=ManifestFactory.create())
         assert canvas.height == 0
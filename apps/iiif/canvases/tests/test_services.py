@@ -3,18 +3,24 @@ Test cases for :class:`apps.iiif.canvases`
 """
 
 import json
+from io import StringIO
+from unittest.mock import patch
 from os.path import join
 import boto3
 import httpretty
 from moto import mock_aws
 from django.test import TestCase, Client
+from django.core.management import call_command
 from django.urls import reverse
 from django.core.serializers import serialize
 from lxml.etree import XMLSyntaxError
 import config.settings.local as settings
+from apps.export.cache import export_revision
 from apps.iiif.manifests.tests.factories import ManifestFactory, ImageServerFactory
 from apps.iiif.annotations.tests.factories import AnnotationFactory
 from apps.iiif.annotations.models import Annotation
+from apps.readux.models import UserAnnotation
+from apps.readux.tests.factories import UserAnnotationFactory
 from apps.users.tests.factories import UserFactory
 from apps.utils.noid import encode_noid
 from ..models import Canvas
@@ -292,6 +298,36 @@ class CanvasTests(TestCase):
         fetched_ocr = services.fetch_positional_ocr(canvas)
         assert open(tsv_file_path, "rb").read() == fetched_ocr
 
+    @mock_aws
+    def test_get_ocr_for_canvases(self):
+        """OCR for every canvas should be fetched concurrently over one bucket per thread."""
+        bucket_name = encode_noid()
+        manifest = ManifestFactory.create(
+            image_server=ImageServerFactory.create(
+                storage_service="s3",
+                storage_path=bucket_name,
+                server_base="images.readux.ecds.emory",
+            )
+        )
+        self.set_up_mock_aws(manifest)
+        tsv_file_path = "apps/iiif/canvases/fixtures/00000002.tsv"
+        manifest.image_server.bucket.upload_file(
+            tsv_file_path, f"{manifest.pid}/_*ocr*_/00000002.tsv"
+        )
+        for position in range(2, 5):
+            CanvasFactory.create(manifest=manifest, position=position)
+        manifest.canvas_set.update(ocr_file_path=f"{manifest.pid}/_*ocr*_/00000002.tsv")
+        canvases = manifest.canvas_set.select_related(
+            "manifest__image_server", "image_server"
+        )
+
+        fetched = services.get_ocr_for_canvases(canvases, max_workers=3)
+
+        assert [canvas.pk for canvas, _ in fetched] == [canvas.pk for canvas in canvases]
+        for _, ocr in fetched:
+            assert len(ocr) == 10
+            assert ocr[0]["content"] == "Manuscript"
+
     @mock_aws
     def test_fetched_ocr_result_is_string(self):
         """Test when fetched OCR is a string."""
@@ -368,9 +404,30 @@ class CanvasTests(TestCase):
         """Test parsing bad hOCR"""
         with open("apps/iiif/canvases/fixtures/bad_hocr.hocr", "rb") as file:
             bad_hocr = file.read()
-            self.assertRaises(
-                services.HocrValidationError, services.parse_hocr_ocr, bad_hocr
-            )
+            with self.assertRaises(services.HocrValidationError) as error:
+                services.parse_hocr_ocr(bad_hocr)
+            assert "hocr:" in str(error.exception)
+
+    def test_bad_hocr_without_validation(self):
+        """Test hOCR from an image server that skips validation is parsed as is"""
+        with open("apps/iiif/canvases/fixtures/bad_hocr.hocr", "rb") as file:
+            bad_hocr = file.read()
+            ocr = services.parse_hocr_ocr(bad_hocr, validate=False)
+            assert ocr[0]["content"] == "MAGNA"
+
+    def test_ocr_validation_follows_image_server(self):
+        """Test OCR validation can be turned off per image server"""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        assert services.validates_ocr(canvas)
+        canvas.image_server = ImageServerFactory.create(validate_ocr=False)
+        assert not services.validates_ocr(canvas)
+
+    def test_xml_schemas_compiled_once(self):
+        """Test each schema is compiled once and reused"""
+        services.compile_xml_schemas()
+        assert services.xml_schema(services.TEI_SCHEMA) is services.xml_schema(
+            services.TEI_SCHEMA
+        )
 
     def test_identifying_alto_xml(self):
         """Test identifying XML file as ALTO OCR"""
@@ -507,6 +564,27 @@ class CanvasTests(TestCase):
         is_tsv = services.is_tsv(not_tsv)
         self.assertFalse(is_tsv)
 
+    def test_sniffing_ocr_formats(self):
+        """Test guessing the OCR format from the first bytes"""
+        assert services.sniff_ocr_format({"ocr": []}) == "json"
+        assert services.sniff_ocr_format(b' \n{"ocr": null}') == "json"
+        assert services.sniff_ocr_format("<alto/>") == "xml"
+        assert services.sniff_ocr_format("content\tx\ty\tw\th\n") == "tsv"
+        assert services.sniff_ocr_format("1\t2\t3\t4\tword".encode("UTF-8-sig")) == "fedora"
+        assert services.sniff_ocr_format("test string") is None
+        assert services.sniff_ocr_format(b"") is None
+        # Malformed JSON is sniffed as JSON but parses to nothing.
+        assert services.sniff_ocr_format("{bad") == "json"
+        assert services.parse_dict_ocr("{bad") is None
+
+    def test_ocr_parsers_are_generators(self):
+        """Test words are yielded one at a time as uniform records"""
+        with open("apps/iiif/canvases/fixtures/alto.xml", "rb") as file:
+            words = services.iter_alto_words(file.read())
+        assert next(words) == {"content": "MAGNA", "x": 1894, "y": 1787, "w": 758, "h": 164}
+        words = services.iter_tsv_words("content\tx\ty\tw\th\nJordan\t459\t391\t89\t43\n")
+        assert list(words) == [{"content": "Jordan", "x": 459, "y": 391, "w": 89, "h": 43}]
+
     @httpretty.httprettified(allow_net_connect=False)
     def test_ocr_from_oa_annotation(self):
         """Test deserializing OA annotations"""
@@ -540,3 +618,154 @@ class CanvasTests(TestCase):
         )
         canvas.refresh_from_db()
         assert canvas.annotation_set.count() == 12
+
+    def test_add_ocr_annotations_in_bulk(self):
+        """Test OCR annotations are written in batches with span markup."""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        ocr = [
+            {"content": f"word{index}", "x": index, "y": index, "w": 20, "h": 16}
+            for index in range(25)
+        ]
+        ocr.append({"content": "", "x": 30, "y": 30, "w": 20, "h": 16})
+        created = services.add_ocr_annotations(canvas, ocr, batch_size=10)
+        annotations = canvas.annotation_set.all()
+        assert len(created) == 26
+        assert annotations.count() == 26
+        assert annotations.values("owner").distinct().count() == 1
+        assert annotations.first().owner.username == "ocr"
+        for order, anno in enumerate(annotations, start=1):
+            assert anno.order == order
+            assert anno.content.startswith(f"<span id='{anno.pk}'")
+            assert f".anno-{anno.pk}:" in anno.style
+        assert "> </span>" in annotations.last().content
+
+    def test_benchmark_ocr_command(self):
+        """Test the OCR benchmark leaves nothing behind."""
+        annotation_count = Annotation.objects.count()
+        out = StringIO()
+        call_command("benchmark_ocr", pages=2, words=5, stdout=out)
+        assert "per-word save: 10 words" in out.getvalue()
+        assert "bulk writer: 10 words" in out.getvalue()
+        assert Annotation.objects.count() == annotation_count
+
+    def test_adding_ocr_stores_plain_text(self):
+        """Test adding OCR stores the plain text on the canvas."""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        ocr = [
+            {"content": word, "x": 1, "y": 1, "w": 20, "h": 16}
+            for word in ["a", "retto", ",", "dio"]
+        ]
+        services.add_ocr_annotations(canvas, ocr)
+        assert canvas.ocr_text == "a retto , dio"
+        assert Canvas.objects.get(pk=canvas.pk).result == "a retto , dio"
+
+    def test_backfill_ocr_text_command(self):
+        """Test backfilling the plain OCR text for existing canvases."""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        for order, word in enumerate(["Emma", "Goldman"], start=1):
+            AnnotationFactory.create(content=word, canvas=canvas, order=order)
+        assert Canvas.objects.get(pk=canvas.pk).ocr_text is None
+        call_command("backfill_ocr_text", batch_size=1, stdout=StringIO())
+        assert Canvas.objects.get(pk=canvas.pk).ocr_text == "Emma Goldman"
+
+    def test_rebuild_ocr_annotations(self):
+        """Test rebuilding OCR diffs it against the existing annotations."""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        services.add_ocr_annotations(
+            canvas,
+            [
+                {"content": "Emma", "x": 1, "y": 1, "w": 20, "h": 16},
+                {"content": "Goldmn", "x": 30, "y": 1, "w": 20, "h": 16},
+                {"content": "stale", "x": 60, "y": 1, "w": 20, "h": 16},
+                {"content": "anchor", "x": 90, "y": 1, "w": 20, "h": 16},
+            ],
+        )
+        anchor = canvas.annotation_set.get(x=90)
+        user_annotation = UserAnnotationFactory.create(
+            canvas=canvas, start_selector=anchor, end_selector=anchor
+        )
+        emma = canvas.annotation_set.get(x=1)
+        ocr = [
+            {"content": "Emma", "x": 1, "y": 1, "w": 20, "h": 16},
+            {"content": "Goldman", "x": 30, "y": 1, "w": 20, "h": 16},
+            {"content": "Living", "x": 1, "y": 30, "w": 20, "h": 16},
+        ]
+
+        counts = services.rebuild_ocr_annotations(canvas, [dict(word) for word in ocr])
+
+        assert counts == {
+            "created": 1,
+            "updated": 1,
+            "deleted": 1,
+            "kept": 1,
+            "unchanged": 1,
+        }
+        assert canvas.annotation_set.get(x=1).pk == emma.pk
+        assert "Goldman</span>" in canvas.annotation_set.get(x=30).content
+        assert not canvas.annotation_set.filter(x=60).exists()
+        assert UserAnnotation.objects.filter(pk=user_annotation.pk).exists()
+        assert Canvas.objects.get(pk=canvas.pk).ocr_text.startswith("Emma Goldman Living")
+
+        counts = services.rebuild_ocr_annotations(canvas, [dict(word) for word in ocr])
+        assert counts["unchanged"] == 3
+        assert counts["created"] == counts["updated"] == counts["deleted"] == 0
+
+        # the kept word is renumbered after the new words
+        ocr.append({"content": "My", "x": 30, "y": 30, "w": 20, "h": 16})
+        services.rebuild_ocr_annotations(canvas, [dict(word) for word in ocr])
+        assert canvas.annotation_set.get(x=90).order == 5
+        orders = list(canvas.annotation_set.values_list("order", flat=True))
+        assert len(set(orders)) == len(orders)
+
+    def test_rebuild_ocr_annotations_changes_export_revision(self):
+        """Test rebuilding OCR with new word text changes the export revision."""
+        canvas = CanvasFactory.create(manifest=ManifestFactory.create())
+        services.add_ocr_annotations(
+            canvas, [{"content": "Goldmn", "x": 30, "y": 1, "w": 20, "h": 16}]
+        )
+        revision = export_revision(canvas.manifest, "v2", [], False)
+        services.rebuild_ocr_annotations(
+            canvas, [{"content": "Goldman", "x": 30, "y": 1, "w": 20, "h": 16}]
+        )
+        assert export_revision(canvas.manifest, "v2", [], False) != revision
+
+    @mock_aws
+    def test_rebuild_ocr_command(self):
+        """Test rebuilding OCR for a manifest twice only creates the annotations once."""
+        bucket_name = encode_noid()
+        manifest = ManifestFactory.create(
+            image_server=ImageServerFactory.create(
+                storage_service="s3",
+                storage_path=bucket_name,
+                server_base="images.readux.ecds.emory",
+            )
+        )
+        self.set_up_mock_aws(manifest)
+        manifest.image_server.bucket.upload_file(
+            "apps/iiif/canvases/fixtures/00000002.tsv",
+            f"{manifest.pid}/_*ocr*_/00000002.tsv",
+        )
+        manifest.canvas_set.update(ocr_file_path=f"{manifest.pid}/_*ocr*_/00000002.tsv")
+        canvas = manifest.canvas_set.first()
+
+        out = StringIO()
+        call_command("rebuild_ocr", manifest=manifest.pid, stdout=out)
+        assert "Created 10," in out.getvalue()
+        assert "OCR rebuilt for 1 canvases" in out.getvalue()
+        assert canvas.annotation_set.count() == 10
+
+        out = StringIO()
+        call_command("rebuild_ocr", manifest=manifest.pid, stdout=out)
+        assert "Created 0, updated 0, deleted 0 and left 10 unchanged" in out.getvalue()
+        assert canvas.annotation_set.count() == 10
+
+        # a failing canvas is reported and the manifest is still reindexed
+        out = StringIO()
+        with patch.object(
+            services, "rebuild_ocr_annotations", side_effect=ValueError("bad OCR")
+        ), patch(
+            "apps.iiif.canvases.management.commands.rebuild_ocr.index_manifest_task"
+        ) as index_manifest_task:
+            call_command("rebuild_ocr", manifest=manifest.pid, batch_size=1, stdout=out)
+        assert f"Failed to rebuild OCR for 1 canvases: {canvas.pid} (bad OCR)" in out.getvalue()
+        index_manifest_task.assert_called_once_with(str(manifest.id))
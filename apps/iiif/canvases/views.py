@@ -1,12 +1,11 @@
 """
 Django view for canvases
 """
-import json
 from django.http import JsonResponse
 from django.views import View
-from django.core.serializers import serialize
 from .models import Canvas
 from ..manifests.models import Manifest
+from ..serializers.base import serialize_to_dicts
 # from .serializers import CanvasSerializer
 
 class IIIFV2List(View):
@@ -31,12 +30,9 @@ class IIIFV2List(View):
         :rtype: JSON
         """
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'canvas',
-                    self.get_queryset(),
-                    is_list=True
-                )
+            serialize_to_dicts(
+                'canvas',
+                self.get_queryset().select_related('manifest', 'image_server')
             ),
             safe=False
         )
@@ -65,13 +61,10 @@ class IIIFV2Detail(View):
         :rtype: JSON
         """
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'canvas',
-                    self.get_queryset(),
-
-                )
-            ),
+            serialize_to_dicts(
+                'canvas',
+                self.get_queryset().select_related('manifest', 'image_server'),
+            )[0],
             safe=False
         )
 
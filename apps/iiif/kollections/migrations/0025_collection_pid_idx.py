@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('kollections', '0024_alter_collection_metadata'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='collection',
+            index=models.Index(fields=['pid'], name='collection_pid_idx'),
+        ),
+    ]
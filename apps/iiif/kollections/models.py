@@ -57,6 +57,9 @@ class Collection(IiifBase):
     )
     autocomplete_search_field = 'label'
 
+    class Meta: # pylint: disable=too-few-public-methods, missing-class-docstring
+        indexes = [models.Index(fields=['pid'], name='collection_pid_idx')]
+
     # TODO: Why can we not just use the label attribute directly? Or `self.__str__`?
     def autocomplete_label(self):
         """Label for autocomplete UI element
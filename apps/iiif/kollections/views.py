@@ -1,12 +1,11 @@
 """Django views for Kollections"""
-import json
 from django.http import JsonResponse
 from django.views import View
-from django.core.serializers import serialize
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
 from .models import Collection
 from ..manifests.models import Manifest
+from ..serializers.base import serialize_to_dicts
 
 class ManifestsForCollection(View):
     """
@@ -29,13 +28,10 @@ class ManifestsForCollection(View):
         :rtype: JSON
         """
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'collection_manifest',
-                    self.get_queryset(),
-                    # version=kwargs['version'],
-                    is_list=True
-                )
+            serialize_to_dicts(
+                'collection_manifest',
+                self.get_queryset(),
+                # version=kwargs['version'],
             ),
             safe=False
         )
@@ -60,13 +56,11 @@ class CollectionDetail(View):
         :rtype: JSON
         """
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'kollection',
-                    self.get_queryset(),
-                    version=kwargs['version']
-                )
-            ),
+            serialize_to_dicts(
+                'kollection',
+                self.get_queryset(),
+                version=kwargs['version']
+            )[0],
             safe=False)
 
 
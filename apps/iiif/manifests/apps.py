@@ -5,3 +5,6 @@ class ManifestsConfig(AppConfig):
     """Configuration for manifest app"""
     name = 'apps.iiif.manifests'
     verbose_name = 'Manifests'
+
+    def ready(self):
+        from . import signals  # noqa F401 pylint: disable = import-outside-toplevel, unused-import
@@ -0,0 +1,239 @@
+"""Caches of rendered IIIF manifest JSON and manifest search facets.
+
+The anonymous rendering of each manifest is stored in the Django cache and
+invalidated when the manifest, one of its canvases or a related collection,
+language or image server changes, see :mod:`.signals`. Links to the
+current user's annotation pages are layered on top of the cached JSON in
+:func:`add_user_annotation_links` so the manifest is never re-serialized for
+a signed in user.
+
+Facet buckets for searches without a query are cached for a few minutes and
+dropped whenever a manifest's faceted values are (de)indexed, see
+:func:`invalidate_search_facets` and :func:`search_facet_values_changed`.
+"""
+
+import json
+from datetime import datetime
+from hashlib import md5
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers import serialize
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+VERSIONS = ("v2", "v3")
+
+
+def manifest_cache_key(pid, version):
+    """Cache key for a rendered manifest.
+
+    :param pid: Manifest pid
+    :type pid: str
+    :param version: IIIF Presentation API version, "v2" or "v3"
+    :type version: str
+    :return: Cache key
+    :rtype: str
+    """
+    return f"iiif-manifest-{version}-{pid}"
+
+
+def invalidate_manifest_cache(*pids):
+    """Remove the rendered manifests for the given pids from the cache.
+
+    Inside a transaction the manifests are removed again once it commits, as a
+    request could render and cache the old rows in the meantime. Code that
+    changes rendered rows with `QuerySet.update` must call this itself.
+
+    :param pids: Manifest pids
+    :type pids: str
+    """
+    keys = [manifest_cache_key(pid, version) for pid in pids if pid for version in VERSIONS]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_rendered_manifest(queryset, version):
+    """Get the anonymous rendering of a manifest, rendering and caching it on a miss.
+
+    :param queryset: Queryset containing only the requested manifest
+    :type queryset: django.db.models.QuerySet
+    :param version: IIIF Presentation API version, "v2" or "v3"
+    :type version: str
+    :return: Dict with the JSON `body`, its `etag` and when it was `rendered_at`,
+        or None if the manifest does not exist.
+    :rtype: dict
+    """
+    manifest = queryset.first()
+    if manifest is None:
+        return None
+
+    key = manifest_cache_key(manifest.pid, version)
+    rendered = cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    rendered_at = timezone.now().replace(microsecond=0)
+    if version == "v2":
+        body = serialize(
+            "manifest",
+            queryset,
+            version=version,
+            annotators="",
+            exportdate=datetime.utcnow(),
+        )
+    else:
+        body = serialize("manifest_v3", queryset)
+
+    rendered = {
+        "body": body,
+        "etag": quote_etag(md5(body.encode("utf-8")).hexdigest()),
+        "rendered_at": rendered_at,
+    }
+    cache.set(key, rendered, settings.MANIFEST_CACHE_TIMEOUT)
+    return rendered
+
+
+def add_user_annotation_links(data, version, manifest_pid, user, annotated_canvases):
+    """Add the user's annotation pages, and name, to a rendered manifest.
+
+    Mirrors what the canvas serializers add for a signed in user.
+
+    :param data: Decoded manifest JSON
+    :type data: dict
+    :param version: IIIF Presentation API version, "v2" or "v3"
+    :type version: str
+    :param manifest_pid: Manifest pid
+    :type manifest_pid: str
+    :param user: Current user
+    :type user: apps.users.models.User
+    :param annotated_canvases: Pids of canvases the user has annotated
+    :type annotated_canvases: set
+    :return: Manifest with user links
+    :rtype: dict
+    """
+    if version == "v2":
+        for entry in data["metadata"]:
+            if entry["label"] == "Annotators":
+                entry["value"] = str(user.name)
+        for canvas in data["sequences"][0]["canvases"]:
+            canvas_pid = canvas["@id"].rsplit("/canvas/", 1)[-1]
+            if canvas_pid not in annotated_canvases:
+                continue
+            kwargs = {
+                "username": user.username,
+                "volume": manifest_pid,
+                "canvas": canvas_pid,
+            }
+            canvas["otherContent"].append(
+                {
+                    "label": f"Annotations by {user.username}",
+                    "@type": "sc:AnnotationList",
+                    "@id": f"{settings.HOSTNAME}{reverse('user_annotations', kwargs=kwargs)}",
+                }
+            )
+        return data
+
+    for canvas in data["items"]:
+        kwargs = {
+            "username": user.username,
+            "vol": manifest_pid,
+            "canvas": canvas["id"].split("/")[-2],
+            "version": "v3",
+        }
+        canvas["annotations"].append(
+            {
+                "type": "AnnotationPage",
+                "id": f"{settings.HOSTNAME}{reverse('user_comments', kwargs=kwargs)}",
+            }
+        )
+    return data
+
+
+def user_manifest_body(rendered, version, manifest_pid, user):
+    """Layer a user's annotation links on a cached manifest rendering.
+
+    :param rendered: Cached rendering from :func:`get_rendered_manifest`
+    :type rendered: dict
+    :param version: IIIF Presentation API version, "v2" or "v3"
+    :type version: str
+    :param manifest_pid: Manifest pid
+    :type manifest_pid: str
+    :param user: Current user
+    :type user: apps.users.models.User
+    :return: Tuple of the JSON body and when the user last annotated the manifest
+    :rtype: tuple
+    """
+    annotations = user.userannotation_set.filter(canvas__manifest__pid=manifest_pid)
+    annotated_canvases = set()
+    last_annotated = None
+    for canvas_pid, modified_at in annotations.values_list("canvas__pid", "modified_at"):
+        annotated_canvases.add(canvas_pid)
+        if modified_at and (last_annotated is None or modified_at > last_annotated):
+            last_annotated = modified_at
+
+    data = add_user_annotation_links(
+        json.loads(rendered["body"]), version, manifest_pid, user, annotated_canvases
+    )
+    return json.dumps(data), last_annotated
+
+
+SEARCH_FACETS_GENERATION_KEY = "search-facets-generation"
+
+
+def search_facets_cache_key(filters):
+    """Cache key for the facets of a search.
+
+    The key includes a generation token that :func:`invalidate_search_facets`
+    replaces, so every cached entry is dropped at once.
+
+    :param filters: Search form filters, which must be JSON serializable or dates
+    :type filters: dict
+    :return: Cache key
+    :rtype: str
+    """
+    generation = cache.get_or_set(SEARCH_FACETS_GENERATION_KEY, uuid4().hex, None)
+    digest = md5(json.dumps(filters, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"search-facets-{generation}-{digest}"
+
+
+def invalidate_search_facets():
+    """Drop all cached search facets. Called when manifests are (de)indexed."""
+    cache.set(SEARCH_FACETS_GENERATION_KEY, uuid4().hex, None)
+
+
+def search_facet_values_key(pid):
+    """Cache key for the digest of a manifest's indexed facet values.
+
+    :param pid: Manifest pid
+    :type pid: str
+    :return: Cache key
+    :rtype: str
+    """
+    return f"search-facet-values-{pid}"
+
+
+def search_facet_values_changed(pid, values):
+    """Record the facet values indexed for a manifest and report if they changed.
+
+    Reindexing a manifest for its OCR or annotations leaves the facet buckets
+    as they were, so the cached facets are kept in that case.
+
+    :param pid: Manifest pid
+    :type pid: str
+    :param values: Faceted field values, which must be JSON serializable or dates
+    :type values: dict
+    :return: True if the values differ from the ones last recorded
+    :rtype: bool
+    """
+    key = search_facet_values_key(pid)
+    digest = md5(json.dumps(values, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    if cache.get(key) == digest:
+        return False
+    cache.set(key, digest, None)
+    return True
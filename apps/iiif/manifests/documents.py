@@ -3,7 +3,7 @@
 from html import unescape
 
 from django.conf import settings
-from django.db.models.query import Prefetch
+from django.core.cache import cache
 from django.utils.html import strip_tags
 
 from django_elasticsearch_dsl import Document, fields
@@ -12,8 +12,12 @@ from django_elasticsearch_dsl.registries import registry
 from elasticsearch_dsl import MetaField, Keyword, analyzer
 from unidecode import unidecode
 
-from apps.iiif.annotations.models import Annotation
 from apps.iiif.canvases.models import Canvas
+from apps.iiif.manifests.cache import (
+    invalidate_search_facets,
+    search_facet_values_changed,
+    search_facet_values_key,
+)
 from apps.iiif.manifests.models import Manifest
 
 # TODO: Better English stemming (e.g. Rome to match Roman), multilingual stemming.
@@ -94,6 +98,41 @@ class ManifestDocument(Document):
         """
         return obj.searchable
 
+    def update(self, thing, refresh=None, action="index", **kwargs):
+        """
+        Overwriting parent method.
+        Drop the cached search facets once a faceted value in the index has changed.
+        """
+        response = super().update(thing, refresh, action, **kwargs)
+        instances = [thing] if isinstance(thing, Manifest) else thing
+        if action == "delete":
+            for instance in instances:
+                cache.delete(search_facet_values_key(instance.pid))
+            invalidate_search_facets()
+        elif any(
+            # evaluate every instance so each one records its values
+            [
+                search_facet_values_changed(instance.pid, self.facet_values(instance))
+                for instance in instances
+            ]
+        ):
+            invalidate_search_facets()
+        return response
+
+    def facet_values(self, instance):
+        """Values of the fields that search facets and date filters are built from"""
+        return {
+            "searchable": self.should_index_object(instance),
+            "authors": self.prepare_authors(instance),
+            "languages": self.prepare_languages(instance),
+            "collections": sorted(
+                collection.label for collection in instance.collections.all()
+            ),
+            "metadata": self.prepare_metadata(instance),
+            "date_earliest": instance.date_earliest,
+            "date_latest": instance.date_latest,
+        }
+
     # def get_queryset(self):
     #     """
     #     Overwrite parent method to only include searchable volumes.
@@ -173,15 +212,9 @@ class ManifestDocument(Document):
                 "collections",
                 "image_server",
                 "languages",
-                Prefetch(
-                    "canvas_set",
-                    queryset=Canvas.objects.prefetch_related(
-                        Prefetch(
-                            "annotation_set",
-                            queryset=Annotation.objects.select_related("owner"),
-                        ),
-                    ),
-                ),
+                # OCR text is read from the stored `Canvas.ocr_text`, so the
+                # annotations do not need to be fetched.
+                "canvas_set",
             )
         )
 
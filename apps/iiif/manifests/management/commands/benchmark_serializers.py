@@ -0,0 +1,115 @@
+"""
+Manage command to benchmark serializing IIIF manifests.
+"""
+
+import json
+from datetime import datetime
+from time import perf_counter
+from unittest.mock import patch
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers import serialize
+from django.db import transaction
+from ...models import Manifest
+from ....canvases.models import Canvas
+
+# Serializer modules that embed their children with `serialize_to_dicts`.
+COMPOSING_SERIALIZERS = (
+    "apps.iiif.serializers.manifest",
+    "apps.iiif.serializers.v3.manifest",
+)
+
+
+def legacy_serialize_to_dicts(format, queryset, **options):  # pylint: disable = redefined-builtin
+    """The original path, encoding each child to JSON and decoding it again."""
+    return [json.loads(serialize(format, [obj], **options)) for obj in queryset]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing a synthetic manifest to IIIF v2 and v3 and check "
+        "the output matches the original nested serializers byte for byte. "
+        "Nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--canvases",
+            type=int,
+            default=1000,
+            help="Number of canvases in the synthetic manifest.",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Number of times to serialize each version.",
+        )
+
+    def handle(self, *args, **options):
+        pages = options["canvases"]
+        rounds = options["rounds"]
+        self.stdout.write(f"Synthetic manifest: {pages} canvases, {rounds} rounds")
+
+        with transaction.atomic():
+            # `bulk_create` skips the save side effects (indexing, image info requests).
+            manifest = Manifest.objects.bulk_create(
+                [Manifest(label="Serializer benchmark", pid="serializer-benchmark")]
+            )[0]
+            Canvas.objects.bulk_create(
+                [
+                    Canvas(
+                        manifest=manifest,
+                        pid=f"serializer-benchmark-{position}",
+                        position=position,
+                        width=1000,
+                        height=1000,
+                        resource=f"benchmark-{position}",
+                    )
+                    for position in range(1, pages + 1)
+                ]
+            )
+            queryset = Manifest.objects.filter(pk=manifest.pk)
+            exportdate = datetime.utcnow()
+
+            for label, format, kwargs in (
+                ("v2", "manifest", {"annotators": "", "exportdate": exportdate}),
+                ("v3", "manifest_v3", {}),
+            ):
+                legacy_body, legacy_elapsed = self.__time(
+                    rounds, lambda: self.__legacy(format, queryset, **kwargs)
+                )
+                body, elapsed = self.__time(
+                    rounds, lambda: serialize(format, queryset, **kwargs)
+                )
+                if body != legacy_body:
+                    raise CommandError(f"{label} output differs from the nested serializers")
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{label}: {len(body)} identical bytes, nested {legacy_elapsed:.3f}s, "
+                        f"single pass {elapsed:.3f}s ({legacy_elapsed / elapsed:.1f}x)"
+                    )
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def __legacy(format, queryset, **kwargs):  # pylint: disable = redefined-builtin
+        patches = [
+            patch(f"{module}.serialize_to_dicts", legacy_serialize_to_dicts)
+            for module in COMPOSING_SERIALIZERS
+        ]
+        for module_patch in patches:
+            module_patch.start()
+        try:
+            return serialize(format, queryset, **kwargs)
+        finally:
+            for module_patch in patches:
+                module_patch.stop()
+
+    @staticmethod
+    def __time(rounds, render):
+        """Render `rounds` times, returning the last output and the mean time."""
+        start = perf_counter()
+        for _ in range(rounds):
+            body = render()
+        return body, (perf_counter() - start) / rounds
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('manifests', '0059_auto_20250113_1401'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='manifest',
+            index=models.Index(fields=['pid'], name='manifest_pid_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manifests', '0060_manifest_pid_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageserver',
+            name='validate_ocr',
+            field=models.BooleanField(default=True, help_text='Validate OCR against its schema. Turn off for trusted sources to parse OCR faster.'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 """Django models for IIIF manifests"""
 
-from os import environ
 from uuid import uuid4, UUID
 from json import JSONEncoder
 from boto3 import resource
@@ -17,7 +16,8 @@ from apps.iiif.manifests.validators import validate_edtf
 from ..choices import Choices
 from ..kollections.models import Collection
 from ..models import IiifBase
-from .tasks import index_manifest_task
+from .cache import invalidate_manifest_cache
+from .tasks import index_manifest_on_commit
 
 JSONEncoder_olddefault = JSONEncoder.default  # pylint: disable = invalid-name
 
@@ -54,6 +54,10 @@ class ImageServer(models.Model):
     sftp_port = models.IntegerField(default=22)
     private_key_path = models.CharField(max_length=500, default="~/.ssh/id_rsa.pem")
     path_delineator = models.CharField(max_length=10, default="/")
+    validate_ocr = models.BooleanField(
+        default=True,
+        help_text="Validate OCR against its schema. Turn off for trusted sources to parse OCR faster.",
+    )
 
     def __str__(self):
         return f"{self.server_base}"
@@ -271,6 +275,7 @@ class Manifest(IiifBase):
     class Meta:  # pylint: disable = too-few-public-methods, missing-class-docstring
         ordering = ["published_date"]
         # indexes = [GinIndex(fields=['search_vector'])]
+        indexes = [models.Index(fields=["pid"], name="manifest_pid_idx")]
 
     @property
     def authors(self):
@@ -383,10 +388,11 @@ class Manifest(IiifBase):
 
     # update search_vector every time the entry updates
     def save(self, *args, **kwargs):  # pylint: disable = arguments-differ
+        dirty_fields = self.get_dirty_fields() if not self._state.adding else {}
+        original_pid = dirty_fields.get("pid")
 
         if (
-            not self._state.adding
-            and "pid" in self.get_dirty_fields()
+            "pid" in dirty_fields
             and self.image_server
             and self.image_server.storage_service == "s3"
         ):
@@ -396,7 +402,7 @@ class Manifest(IiifBase):
         # This only runs on update. Creating new manifests with searchable set
         # to False throws an error because it has not been indexed yet. This
         # is despite the search returning a result.
-        if self.searchable is False and self._state.adding is False:
+        if self.searchable is False and "searchable" in dirty_fields:
             from .documents import ManifestDocument
 
             response = ManifestDocument().search().query("match", pid=self.pid)
@@ -423,14 +429,14 @@ class Manifest(IiifBase):
 
         super().save(*args, **kwargs)
 
-        for collection in self.collections.all():  # pylint: disable = no-member
-            collection.modified_at = self.modified_at
-            collection.save()
+        invalidate_manifest_cache(self.pid, original_pid)
+
+        # One UPDATE, skipping the image checks in `Collection.save`.
+        self.collections.update(  # pylint: disable = no-member
+            modified_at=self.modified_at, updated_at=self.modified_at
+        )
 
-        if environ["DJANGO_ENV"] != "test":  # pragma: no cover
-            index_manifest_task.apply_async(args=[str(self.id)])
-        else:
-            index_manifest_task(str(self.id))
+        index_manifest_on_commit(self.id)
 
     def delete(self, *args, **kwargs):
         """
@@ -444,6 +450,8 @@ class Manifest(IiifBase):
 
         super().delete(*args, **kwargs)
 
+        invalidate_manifest_cache(self.pid)
+
         # if environ["DJANGO_ENV"] != 'test': # pragma: no cover
         #     de_index_manifest_task.apply_async(args=[str(self.id)])
         # else:
@@ -0,0 +1,49 @@
+"""Signals to drop rendered manifests when related objects change.
+
+:meth:`.models.Manifest.save` and the canvas save paths invalidate the cache
+themselves. These cover the related rows a manifest rendering includes.
+"""
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from apps.iiif.canvases.models import Canvas
+from apps.iiif.kollections.models import Collection
+from .cache import invalidate_manifest_cache
+from .models import ImageServer, Manifest
+
+
+@receiver(m2m_changed, sender=Manifest.languages.through)
+@receiver(m2m_changed, sender=Manifest.collections.through)
+def manifest_relations_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):  # pylint: disable = unused-argument
+    """Drop the manifests whose languages or collections were changed."""
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_manifest_cache(instance.pid)
+    elif action == "pre_clear":
+        # pk_set is not given for a clear, so look the manifests up before they are detached
+        field = "languages" if sender is Manifest.languages.through else "collections"
+        manifests = Manifest.objects.filter(**{field: instance})
+        invalidate_manifest_cache(*manifests.values_list("pid", flat=True))
+    elif action in ("post_add", "post_remove"):
+        invalidate_manifest_cache(
+            *Manifest.objects.filter(pk__in=pk_set).values_list("pid", flat=True)
+        )
+
+
+@receiver(post_save, sender=Collection)
+@receiver(pre_delete, sender=Collection)
+def collection_changed(sender, instance, **kwargs):  # pylint: disable = unused-argument
+    """Drop the manifests that list the collection's label."""
+    invalidate_manifest_cache(*instance.manifests.values_list("pid", flat=True))
+
+
+@receiver(post_save, sender=ImageServer)
+@receiver(pre_delete, sender=ImageServer)
+def image_server_changed(sender, instance, **kwargs):  # pylint: disable = unused-argument
+    """Drop the manifests whose image URLs are built from the server."""
+    pids = set(Manifest.objects.filter(image_server=instance).values_list("pid", flat=True))
+    pids.update(
+        Canvas.objects.filter(image_server=instance).values_list("manifest__pid", flat=True)
+    )
+    invalidate_manifest_cache(*pids)
@@ -1,5 +1,8 @@
+import threading
+from os import environ
 from celery import Celery
 from django.conf import settings
+from django.db import transaction
 
 app = Celery('apps.iiif.manifests', result_extended=True)
 app.config_from_object('django.conf:settings')
@@ -33,3 +36,48 @@ def de_index_manifest_task(manifest_id):
     index = ManifestDocument()
     manifest = Manifest.objects.get(pk=manifest_id)
     index.update(manifest, True, 'delete')
+
+
+# The batch collecting manifests for the current transaction, per thread.
+_pending = threading.local()
+
+
+class ManifestIndexBatch:
+    """Manifests to index once the current transaction commits."""
+
+    def __init__(self):
+        self.manifest_ids = []
+
+    def __call__(self):
+        # The next transaction collects a new batch.
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        manifest_ids, self.manifest_ids = self.manifest_ids, []
+        for manifest_id in manifest_ids:
+            index_manifest_task.apply_async(args=[manifest_id])
+
+
+def index_manifest_on_commit(manifest_id):
+    """Enqueue :func:`index_manifest_task` when the current transaction commits.
+
+    A manifest saved several times in one transaction, e.g. one admin request,
+    is only indexed once. Nothing is enqueued if the transaction rolls back.
+    Tests index right away.
+
+    :param manifest_id: Primary key for .models.Manifest object
+    :type manifest_id: UUID
+    """
+    manifest_id = str(manifest_id)
+    if environ['DJANGO_ENV'] == 'test':
+        index_manifest_task(manifest_id)
+        return
+
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = ManifestIndexBatch()
+    if manifest_id not in batch.manifest_ids:
+        batch.manifest_ids.append(manifest_id)
+    # Every save registers the batch, so a rolled back transaction, whose
+    # callbacks Django drops, cannot strand it. Its manifests are then indexed
+    # with the next commit, which is harmless. Later calls find it empty.
+    transaction.on_commit(batch)
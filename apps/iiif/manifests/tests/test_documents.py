@@ -4,6 +4,7 @@ Test class for Elasticsearch indexing.
 
 import random
 import string
+from unittest.mock import patch
 from django.test import TestCase
 from django_elasticsearch_dsl.test import ESTestCase
 from apps.iiif.kollections.models import Collection
@@ -139,6 +140,25 @@ class ManifestDocumentTest(ESTestCase, TestCase):
         results = response.to_queryset()
         assert manifest.pid not in [m.pid for m in results]
 
+    def test_update_invalidates_facets_when_facet_values_change(self):
+        """Reindexing only drops cached facets when a faceted value changed"""
+        manifest = ManifestFactory.create(author="test author")
+        with patch(
+            "apps.iiif.manifests.documents.invalidate_search_facets"
+        ) as mock_invalidate:
+            # reindexing for OCR or annotations keeps the facets
+            self.doc.update(manifest, True, "index")
+            self.doc.update(manifest, True, "index")
+            mock_invalidate.assert_not_called()
+            # a new author changes the author facet
+            manifest.author = "example author"
+            self.doc.update(manifest, True, "index")
+            mock_invalidate.assert_called_once()
+            # de-indexing always changes the facets
+            mock_invalidate.reset_mock()
+            self.doc.update(manifest, True, "delete")
+            mock_invalidate.assert_called_once()
+
     # Removed test because we don't want to trigger a reindex when a collection is saved.
     # def test_get_instances_from_related(self):
     #     """Should get manifests from related collections"""
@@ -1,9 +1,14 @@
 from time import time
+from os import environ
+from unittest.mock import patch
 from apps.utils.noid import encode_noid
 from apps.iiif.canvases.models import Canvas
+from django.db import DatabaseError, transaction
 from django.test import TestCase
 from apps.iiif.canvases.models import Canvas
 from apps.iiif.canvases.tests.factories import CanvasFactory
+from apps.iiif.kollections.models import Collection
+from apps.iiif.kollections.tests.factories import CollectionFactory
 from .factories import ManifestFactory, ImageServerFactory
 from ..models import Manifest
 
@@ -52,6 +57,51 @@ class TestManifestModel(TestCase):
         assert 'a-random-pid' in pids
         assert len(pids) == Manifest.objects.all().count()
 
+    def test_save_touches_collections_in_one_update(self):
+        """ Saving should bump the collections' timestamps without saving them. """
+        manifest = ManifestFactory.create()
+        collections = [CollectionFactory.create() for _ in range(3)]
+        manifest.collections.add(*collections)
+        with patch.object(Collection, 'save') as collection_save:
+            manifest.save()
+        collection_save.assert_not_called()
+        for collection in collections:
+            collection.refresh_from_db()
+            assert collection.modified_at == manifest.modified_at
+
+    def test_index_enqueued_once_per_transaction(self):
+        """ Saving a manifest several times in a transaction should index it once. """
+        manifest = ManifestFactory.create()
+        with patch.dict(environ, {'DJANGO_ENV': 'production'}), patch(
+            'apps.iiif.manifests.tasks.index_manifest_task'
+        ) as index_manifest_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                manifest.label = 'first edit'
+                manifest.save()
+                manifest.label = 'second edit'
+                manifest.save()
+        index_manifest_task.apply_async.assert_called_once_with(args=[str(manifest.id)])
+
+    def test_index_enqueued_after_rolled_back_save(self):
+        """ A rolled back save should not keep later saves from being indexed. """
+        manifest = ManifestFactory.create()
+        with patch.dict(environ, {'DJANGO_ENV': 'production'}), patch(
+            'apps.iiif.manifests.tasks.index_manifest_task'
+        ) as index_manifest_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        manifest.save()
+                        raise DatabaseError
+                except DatabaseError:
+                    pass
+            index_manifest_task.apply_async.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                manifest.save()
+                manifest.save()
+            index_manifest_task.apply_async.assert_called_once_with(args=[str(manifest.id)])
+
 class TestImageServerModel(TestCase):
     def test_string_representation(self):
         """ It should return teh `server_base` property when cast as `str`. """
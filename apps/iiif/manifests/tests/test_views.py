@@ -8,17 +8,19 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.core.serializers import serialize
 
 from ..admin import ManifestAdmin
+from ..cache import manifest_cache_key
 from ..views import (
     AddToCollectionsView,
     ManifestSitemap,
     ManifestRis,
     MetadataImportView,
 )
-from ..models import Manifest
+from ..models import Language, Manifest
 from ..forms import ManifestsCollectionsForm, ManifestCSVImportForm
 from .factories import ManifestFactory, EmptyManifestFactory
 from ...canvases.models import Canvas
@@ -283,3 +285,82 @@ class ManifestTests(TestCase):
         manifest.refresh_from_db()
         self.assertEqual(manifest.languages.count(), 1)
         self.assertIn("Cherokee", [lang.name for lang in manifest.languages.all()])
+
+    def test_manifest_detail_is_cached(self):
+        """
+        Should serve the cached rendering with an ETag and respond 304 when it matches.
+        """
+        cache.clear()
+        url = reverse("ManifestRender", kwargs={"version": "v2", "pid": self.volume.pid})
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert "Last-Modified" in response
+        manifest = json.loads(response.content.decode("UTF-8-sig"))
+        assert len(manifest["sequences"][0]["canvases"]) == 3
+        assert cache.get(manifest_cache_key(self.volume.pid, "v2")) is not None
+
+        cached_response = self.client.get(url)
+        assert cached_response["ETag"] == response["ETag"]
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert not_modified.status_code == 304
+
+        self.volume.save()
+        assert cache.get(manifest_cache_key(self.volume.pid, "v2")) is None
+
+    def test_manifest_detail_cache_follows_related_changes(self):
+        """
+        Should drop the cached rendering when a related collection, language or image server changes.
+        """
+        url = reverse("ManifestRender", kwargs={"version": "v3", "pid": self.volume.pid})
+        key = manifest_cache_key(self.volume.pid, "v3")
+        collection = CollectionFactory.create()
+        language, _ = Language.objects.get_or_create(code="la", name="Latin")
+
+        def rename_collection():
+            collection.label = "Renamed"
+            collection.save()
+
+        def assert_dropped(change):
+            cache.clear()
+            self.client.get(url)
+            assert cache.get(key) is not None
+            change()
+            assert cache.get(key) is None
+
+        assert_dropped(lambda: self.volume.collections.add(collection))
+        assert_dropped(rename_collection)
+        assert_dropped(lambda: collection.manifests.clear())
+        assert_dropped(lambda: self.volume.languages.add(language))
+        assert_dropped(lambda: self.volume.image_server.save())
+        assert_dropped(lambda: self.volume.canvas_set.first().refresh_ocr_text())
+
+    def test_manifest_detail_adds_user_annotation_pages(self):
+        """
+        Should add the signed in user's annotation pages to the cached v3 manifest.
+        """
+        cache.clear()
+        url = reverse("ManifestRender", kwargs={"version": "v3", "pid": self.volume.pid})
+        anonymous = json.loads(self.client.get(url).content.decode("UTF-8-sig"))
+        assert all(len(canvas["annotations"]) == 1 for canvas in anonymous["items"])
+
+        self.client.force_login(self.user)
+        signed_in = json.loads(self.client.get(url).content.decode("UTF-8-sig"))
+        for canvas in signed_in["items"]:
+            assert len(canvas["annotations"]) == 2
+            assert canvas["annotations"][1]["id"].endswith(f"/{self.user.username}")
+
+    def test_manifest_detail_not_found(self):
+        url = reverse("ManifestRender", kwargs={"version": "v2", "pid": "nope"})
+        assert self.client.get(url).status_code == 404
+
+    def test_all_volumes_collection_is_streamed(self):
+        response = self.client.get(reverse("AllVolumesManifest"))
+        assert response.streaming
+        collection = json.loads(b"".join(response.streaming_content))
+        assert collection["@type"] == "sc:Collection"
+        assert len(collection["manifests"]) == Manifest.objects.count()
+        assert any(
+            manifest["@id"].endswith(f"/{self.volume.pid}/manifest")
+            for manifest in collection["manifests"]
+        )
@@ -3,18 +3,20 @@
 import os
 import csv
 from io import StringIO
-import json
 import logging
-from datetime import datetime
+from hashlib import md5
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views import View
 from django.views.generic.base import TemplateView
 from django.views.generic.edit import FormView
-from django.core.serializers import serialize
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
 
+from ..serializers.base import stream_json_list, stream_json_object
+from .cache import get_rendered_manifest, user_manifest_body
 from .services import normalize_header, set_metadata
 from .models import Manifest
 from .forms import ManifestCSVImportForm, ManifestsCollectionsForm
@@ -36,38 +38,46 @@ class ManifestDetail(View):
     def get(self, request, *args, **kwargs):  # pylint: disable = unused-argument
         """Responds to HTTP GET request for specific manifest.
 
+        The anonymous rendering is cached, see :mod:`.cache`. Links to the current
+        user's annotations are layered on top of it. Responds with 304 when the
+        client's ETag or Last-Modified is still current.
+
         :return: IIIF representation of a manifest/volume
         :rtype: JSON
         """
-        # manifest = self.get_queryset()[0].id
-        # annotators = User.objects.filter(annotation__canvas__manifest__id=manifest).distinct()
-        annotators = []
-        if request.user.is_authenticated:
-            annotators.append(request.user)
-        annotators_string = ", ".join([str(i.name) for i in annotators])
         if "2" in kwargs["version"]:
-            return JsonResponse(
-                json.loads(
-                    serialize(
-                        "manifest",
-                        self.get_queryset(),
-                        version=kwargs["version"],
-                        annotators=annotators_string,
-                        exportdate=datetime.utcnow(),
-                        current_user=request.user,
-                    )
-                ),
-                safe=False,
-            )
+            version = "v2"
         elif "3" in kwargs["version"]:
-            return JsonResponse(
-                json.loads(
-                    serialize(
-                        "manifest_v3", self.get_queryset(), current_user=request.user
-                    )
-                ),
-                safe=False,
+            version = "v3"
+        else:
+            raise Http404
+
+        rendered = get_rendered_manifest(self.get_queryset(), version)
+        if rendered is None:
+            raise Http404
+
+        body = rendered["body"]
+        etag = rendered["etag"]
+        last_modified = rendered["rendered_at"]
+        if request.user.is_authenticated:
+            body, last_annotated = user_manifest_body(
+                rendered, version, self.kwargs["pid"], request.user
             )
+            etag = quote_etag(md5(body.encode("utf-8")).hexdigest())
+            if last_annotated and last_annotated > last_modified:
+                last_modified = last_annotated
+
+        last_modified = int(last_modified.timestamp())
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
 
 
 class AllVolumesCollection(View):
@@ -84,6 +94,9 @@ class AllVolumesCollection(View):
     def get(self, request, *args, **kwargs):  # pylint: disable = unused-argument
         """Responds to HTTP GET request for all manifests.
 
+        The manifests are streamed in chunks so memory use does not grow with
+        the number of volumes.
+
         :return: IIIF representation of all volumes collection
         :rtype: JSON
         """
@@ -92,12 +105,17 @@ class AllVolumesCollection(View):
             "@type": "sc:Collection",
             "@context": "http://iiif.io/api/presentation/2/context.json",
             "label": "All Readux volumes",
-            "manifests": json.loads(
-                serialize("all_volumes_manifest", self.get_queryset(), is_list=True)
-            ),
         }
+        manifests = stream_json_list(
+            "all_volumes_manifest",
+            self.get_queryset(),
+            prefetch=("collections",),
+        )
 
-        return JsonResponse(collection, safe=False)
+        return StreamingHttpResponse(
+            stream_json_object(collection, "manifests", manifests),
+            content_type="application/json",
+        )
 
 
 class ManifestSitemap(Sitemap):
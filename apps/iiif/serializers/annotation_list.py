@@ -1,14 +1,18 @@
 # pylint: disable = attribute-defined-outside-init, too-few-public-methods
 """Module for serializing IIIF Annotation Lists"""
 import json
-from django.core.serializers import serialize, deserialize
-from .base import Serializer as JSONSerializer
+from django.core.serializers import deserialize
+from .base import Serializer as JSONSerializer, serialize_to_dicts
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 import config.settings.local as settings
 
 USER = get_user_model()
 
+# Attribute a caller can prefetch a canvas' listed annotations to, e.g. with
+# `Prefetch("annotation_set", queryset=..., to_attr=PREFETCHED_ANNOTATIONS)`.
+PREFETCHED_ANNOTATIONS = "list_annotations"
+
 
 class Serializer(JSONSerializer):
     """
@@ -19,6 +23,20 @@ class Serializer(JSONSerializer):
         super()._init_options()
         self.owners = self.json_kwargs.pop("owners", 0)
 
+    def get_annotations(self, obj):
+        """OCR annotations and those belonging to `owners`, unless prefetched.
+
+        :param obj: Canvas the list is for
+        :type obj: apps.iiif.canvases.models.Canvas
+        :return: Annotations to list
+        :rtype: django.db.models.QuerySet or list
+        """
+        if hasattr(obj, PREFETCHED_ANNOTATIONS):
+            return getattr(obj, PREFETCHED_ANNOTATIONS)
+        return obj.annotation_set.filter(
+            Q(owner=USER.objects.get(username="ocr")) | Q(owner__in=self.owners)
+        ).select_related("owner", "canvas__manifest")
+
     def get_dump_object(self, obj):
         # TODO: Add more validation checks before trying to serialize.
         if self.version == "v2" or self.version is None:
@@ -28,15 +46,8 @@ class Serializer(JSONSerializer):
                     h=settings.HOSTNAME, m=obj.manifest.pid, c=obj.pid
                 ),
                 "@type": "sc:AnnotationList",
-                "resources": json.loads(
-                    serialize(
-                        "annotation",
-                        obj.annotation_set.filter(
-                            Q(owner=USER.objects.get(username="ocr"))
-                            | Q(owner__in=self.owners)
-                        ),
-                        is_list=True,
-                    )
+                "resources": serialize_to_dicts(
+                    "annotation", self.get_annotations(obj)
                 ),
             }
             return data
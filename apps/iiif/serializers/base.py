@@ -1,4 +1,9 @@
 """ Base serializer """
+import json
+from django.conf import settings
+from django.core.serializers import get_serializer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
 from django.core.serializers.json import Serializer as JSONSerializer
 from django.core.serializers.base import SerializerDoesNotExist
 
@@ -22,6 +27,111 @@ class Serializer(JSONSerializer):
         else:
             self.stream.write('')
 
+    def dump_objects(self, queryset, **options):
+        """Build the IIIF dict for each object without encoding any JSON.
+
+        Parent serializers embed these directly rather than serializing each
+        child to a string and decoding it again.
+
+        :param queryset: Objects to serialize
+        :type queryset: django.db.models.QuerySet or list
+        :return: List of dicts
+        :rtype: list
+        """
+        self.options = options
+        self._init_options()
+        return [self.get_dump_object(obj) for obj in queryset]
+
+
+def serialize_to_dicts(format, queryset, **options):  # pylint: disable = redefined-builtin
+    """Like `django.core.serializers.serialize` but returns a list of dicts.
+
+    :param format: Name of a serializer in `settings.SERIALIZATION_MODULES`
+    :type format: str
+    :param queryset: Objects to serialize
+    :type queryset: django.db.models.QuerySet or list
+    :return: List of dicts
+    :rtype: list
+    """
+    return get_serializer(format)().dump_objects(queryset, **options)
+
+
+def iter_chunks(queryset, chunk_size=None, prefetch=()):
+    """Iterate over a queryset in lists of at most `chunk_size` objects.
+
+    Rows are streamed from the database with `QuerySet.iterator` so only one
+    chunk is held in memory. `iterator` ignores `prefetch_related`, so the
+    `prefetch` lookups are fetched for each chunk instead.
+
+    :param queryset: Objects to iterate over
+    :type queryset: django.db.models.QuerySet
+    :param chunk_size: Objects per chunk, defaults to `settings.IIIF_STREAM_CHUNK_SIZE`
+    :type chunk_size: int, optional
+    :param prefetch: Lookups to prefetch for each chunk
+    :type prefetch: tuple, optional
+    :return: Lists of objects
+    :rtype: generator
+    """
+    chunk_size = chunk_size or settings.IIIF_STREAM_CHUNK_SIZE
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *prefetch)
+            yield chunk
+            chunk = []
+    if chunk:
+        prefetch_related_objects(chunk, *prefetch)
+        yield chunk
+
+
+def stream_json_list(format, queryset, chunk_size=None, prefetch=(), **options):  # pylint: disable = redefined-builtin
+    """Serialize a queryset to a JSON list, one chunk of objects at a time.
+
+    The output matches `JsonResponse(serialize_to_dicts(format, queryset, **options))`.
+
+    :param format: Name of a serializer in `settings.SERIALIZATION_MODULES`
+    :type format: str
+    :param queryset: Objects to serialize
+    :type queryset: django.db.models.QuerySet
+    :param chunk_size: Objects per chunk, defaults to `settings.IIIF_STREAM_CHUNK_SIZE`
+    :type chunk_size: int, optional
+    :param prefetch: Lookups to prefetch for each chunk
+    :type prefetch: tuple, optional
+    :return: Pieces of JSON
+    :rtype: generator
+    """
+    serializer = get_serializer(format)()
+    serializer.options = options
+    serializer._init_options()  # pylint: disable = protected-access
+    yield '['
+    separator = ''
+    for chunk in iter_chunks(queryset, chunk_size, prefetch):
+        yield separator + ', '.join(
+            json.dumps(serializer.get_dump_object(obj), cls=DjangoJSONEncoder)
+            for obj in chunk
+        )
+        separator = ', '
+    yield ']'
+
+
+def stream_json_object(data, key, value):
+    """Encode `data` as a JSON object ending with the streamed member `key`.
+
+    :param data: The object's other members
+    :type data: dict
+    :param key: Name of the streamed member
+    :type key: str
+    :param value: Pieces of JSON for the member's value, see :func:`stream_json_list`
+    :type value: generator
+    :return: Pieces of JSON
+    :rtype: generator
+    """
+    head = json.dumps(data, cls=DjangoJSONEncoder)[:-1]
+    yield f'{head}{", " if data else ""}{json.dumps(key)}: '
+    yield from value
+    yield '}'
+
 def Deserializer(object):
     """Deserialize IIIF Annotation List
 
@@ -18,6 +18,11 @@ class Serializer(JSONSerializer):
     def _init_options(self):
         super()._init_options()
         self.current_user = self.json_kwargs.pop("current_user", None)
+        # Ids of canvases the current user has annotated, when already known.
+        self.annotated_canvases = self.json_kwargs.pop("annotated_canvases", None)
+        # Users with annotations on each canvas, by canvas id, to link every
+        # owner's annotation list rather than the current user's.
+        self.annotation_owners = self.json_kwargs.pop("annotation_owners", None)
 
     def get_dump_object(self, obj):
         obj.label = str(obj.position)
@@ -36,14 +41,21 @@ class Serializer(JSONSerializer):
                 }
             ]
 
-            current_user_has_annotations = (
+            if self.annotation_owners is not None:
+                owners = self.annotation_owners.get(obj.id, [])
+            elif self.annotated_canvases is not None:
+                owners = [self.current_user] if obj.id in self.annotated_canvases else []
+            elif (
                 self.current_user
                 and self.current_user.is_authenticated
                 and self.current_user.userannotation_set.filter(canvas=obj).exists()
-            )
-            if current_user_has_annotations:
+            ):
+                owners = [self.current_user]
+            else:
+                owners = []
+            for owner in owners:
                 kwargs = {
-                    "username": self.current_user.username,
+                    "username": owner.username,
                     "volume": obj.manifest.pid,
                     "canvas": obj.pid,
                 }
@@ -53,7 +65,7 @@ class Serializer(JSONSerializer):
 
                 otherContent.append(
                     {
-                        "label": f"Annotations by {self.current_user.username}",
+                        "label": f"Annotations by {owner.username}",
                         "@type": "sc:AnnotationList",
                         "@id": annotation_list_url,
                     }
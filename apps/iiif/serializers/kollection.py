@@ -1,10 +1,8 @@
 # pylint: disable = attribute-defined-outside-init, too-few-public-methods
 """Module for serializing IIIF Annotation Lists"""
-import json
 from django.core.serializers.base import SerializerDoesNotExist
-from django.core.serializers import serialize
 import config.settings.local as settings
-from apps.iiif.serializers.base import Serializer as JSONSerializer
+from apps.iiif.serializers.base import Serializer as JSONSerializer, serialize_to_dicts
 
 
 class Serializer(JSONSerializer):
@@ -24,8 +22,8 @@ class Serializer(JSONSerializer):
                 "viewingHint": "top",
                 "description": obj.summary,
                 "attribution": obj.attribution,
-                "manifests": json.loads(
-                    serialize("collection_manifest", obj.manifests.all(), is_list=True)
+                "manifests": serialize_to_dicts(
+                    "collection_manifest", obj.manifests.all()
                 ),
             }
             return data
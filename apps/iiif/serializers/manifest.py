@@ -2,9 +2,9 @@
 """Module for serializing IIIF Annotation Lists"""
 import json
 from datetime import datetime
-from django.core.serializers import serialize, deserialize
+from django.core.serializers import deserialize
 from apps.iiif.canvases.models import Canvas
-from apps.iiif.serializers.base import Serializer as JSONSerializer
+from apps.iiif.serializers.base import Serializer as JSONSerializer, serialize_to_dicts
 
 
 class Serializer(JSONSerializer):
@@ -18,6 +18,8 @@ class Serializer(JSONSerializer):
         # if 'exportdate' in self.json_kwargs:
         self.exportdate = self.json_kwargs.pop("exportdate", datetime.utcnow())
         self.current_user = self.json_kwargs.pop("current_user", None)
+        # Users with annotations on each canvas, by canvas id, see `annotation_owners`.
+        self.annotation_owners = self.json_kwargs.pop("annotation_owners", None)
         # else:
         #      self.exportdate =
 
@@ -28,6 +30,25 @@ class Serializer(JSONSerializer):
     def end_serialization(self):
         self.stream.write("")
 
+    def annotated_canvases(self, obj):
+        """Ids of the manifest's canvases the current user has annotated.
+
+        :return: Canvas ids or None when there is no signed in user, or the
+            owners of each canvas' annotations were given
+        :rtype: set
+        """
+        if (
+            self.annotation_owners is not None
+            or self.current_user is None
+            or not self.current_user.is_authenticated
+        ):
+            return None
+        return set(
+            self.current_user.userannotation_set.filter(
+                canvas__manifest=obj
+            ).values_list("canvas_id", flat=True)
+        )
+
     def serialize_metadata(self, obj):
         """Convert metadata on object into list of {label, value} dicts"""
         if isinstance(obj.metadata, list):
@@ -101,13 +122,12 @@ class Serializer(JSONSerializer):
                         "@type": "sc:Sequence",
                         "label": "Current Page Order",
                         "startCanvas": obj.start_canvas.identifier,
-                        "canvases": json.loads(
-                            serialize(
-                                "canvas",
-                                obj.canvas_set.all(),
-                                is_list=True,
-                                current_user=self.current_user,
-                            )
+                        "canvases": serialize_to_dicts(
+                            "canvas",
+                            obj.canvas_set.select_related("image_server"),
+                            current_user=self.current_user,
+                            annotated_canvases=self.annotated_canvases(obj),
+                            annotation_owners=self.annotation_owners,
                         ),
                     }
                 ],
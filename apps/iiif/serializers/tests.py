@@ -1,6 +1,8 @@
 """Test Module for IIIF Serializers"""
 
+from io import StringIO
 from django.test import TestCase
+from django.core.management import call_command
 from django.core.serializers import serialize, deserialize
 from apps.iiif.annotations.tests.factories import AnnotationFactory
 from apps.iiif.canvases.models import Canvas
@@ -48,6 +50,12 @@ class SerializerTests(TestCase):
             )
             assert "null" in obj
 
+    def test_single_pass_matches_nested_serializers(self):
+        """Embedding child dicts gives the same JSON as serializing each child."""
+        out = StringIO()
+        call_command("benchmark_serializers", canvases=5, rounds=1, stdout=out)
+        assert out.getvalue().count("identical bytes") == 2
+
     def test_web_annotation_comment_fragment_deserialization(self):
         user = UserFactory.create()
         canvas = CanvasFactory.create(manifest=ManifestFactory.create())
@@ -1,11 +1,11 @@
 # pylint: disable = attribute-defined-outside-init, too-few-public-methods
 """Module for serializing IIIF User Annotation Lists"""
-import json
 from django.core.serializers.base import SerializerDoesNotExist
-from django.core.serializers import serialize
 from apps.iiif.serializers.annotation_list import (
+    PREFETCHED_ANNOTATIONS,
     Serializer as IIIFAnnotationListSerializer,
 )
+from apps.iiif.serializers.base import serialize_to_dicts
 import config.settings.local as settings
 
 
@@ -14,6 +14,20 @@ class Serializer(IIIFAnnotationListSerializer):
     IIIF V2 Annotation List https://iiif.io/api/presentation/2.1/#annotation-list
     """
 
+    def get_annotations(self, obj):
+        """The first owner's annotations, unless prefetched.
+
+        :param obj: Canvas the list is for
+        :type obj: apps.iiif.canvases.models.Canvas
+        :return: Annotations to list
+        :rtype: django.db.models.QuerySet or list
+        """
+        if hasattr(obj, PREFETCHED_ANNOTATIONS):
+            return getattr(obj, PREFETCHED_ANNOTATIONS)
+        return obj.userannotation_set.filter(
+            owner__in=[self.owners[0].id]
+        ).select_related("owner", "canvas__manifest", "start_selector", "end_selector")
+
     def get_dump_object(self, obj):
         if (self.version == "v2") or (self.version is None):
             data = {
@@ -25,12 +39,8 @@ class Serializer(IIIFAnnotationListSerializer):
                     c=obj.pid,
                 ),
                 "@type": "sc:AnnotationList",
-                "resources": json.loads(
-                    serialize(
-                        "annotation",
-                        obj.userannotation_set.filter(owner__in=[self.owners[0].id]),
-                        is_list=True,
-                    )
+                "resources": serialize_to_dicts(
+                    "annotation", self.get_annotations(obj)
                 ),
             }
             return data
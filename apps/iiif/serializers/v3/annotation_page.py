@@ -1,12 +1,9 @@
 # pylint: disable = attribute-defined-outside-init, too-few-public-methods
 """Module for serializing IIIF Annotation Lists"""
-import json
-from django.core.serializers import serialize, deserialize
-from django.core.serializers.base import SerializerDoesNotExist
+from django.core.serializers import deserialize
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 import config.settings.local as settings
-from ..base import Serializer as JSONSerializer
+from ..base import Serializer as JSONSerializer, serialize_to_dicts
 
 USER = get_user_model()
 
@@ -30,19 +27,7 @@ class Serializer(JSONSerializer):
             'type': 'AnnotationPage'
         }
 
-        items = []
-
-        for annotation in self.annotations:
-            items.append(
-                json.loads(
-                    serialize(
-                        'annotation_v3',
-                        [annotation]
-                    )
-                )
-            )
-
-        data['items'] = items
+        data['items'] = serialize_to_dicts('annotation_v3', self.annotations)
 
         return data
 
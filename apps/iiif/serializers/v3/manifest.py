@@ -1,11 +1,9 @@
 """Module for serializing IIIF Annotation Lists"""
 
 import re
-import json
-from django.core.serializers import serialize
 from apps.iiif.manifests.models import Manifest
 from apps.iiif.canvases.models import Canvas
-from apps.iiif.serializers.base import Serializer as JSONSerializer
+from apps.iiif.serializers.base import Serializer as JSONSerializer, serialize_to_dicts
 
 
 class Serializer(JSONSerializer):
@@ -95,12 +93,11 @@ class Serializer(JSONSerializer):
                 }
             ]
 
-        for canvas in obj.canvas_set.all():
-            data["items"].append(
-                json.loads(
-                    serialize("canvas_v3", [canvas], current_user=self.current_user)
-                )
-            )
+        data["items"] = serialize_to_dicts(
+            "canvas_v3",
+            obj.canvas_set.select_related("image_server"),
+            current_user=self.current_user,
+        )
 
         return data
 
@@ -7,9 +7,12 @@ from django.test import TestCase
 from django.core.serializers import serialize, deserialize
 from django.contrib.auth import get_user_model
 from apps.iiif.annotations.choices import AnnotationSelector
+from apps.iiif.annotations.models import Annotation
 from apps.iiif.annotations.tests.factories import AnnotationFactory
 from apps.iiif.canvases.tests.factories import CanvasFactory
 from apps.iiif.manifests.tests.factories import ManifestFactory
+from apps.iiif.serializers.base import serialize_to_dicts
+from apps.iiif.serializers.v3 import volume_annotation_page
 from apps.readux.tests.factories import UserAnnotationFactory
 from apps.users.tests.factories import UserFactory
 
@@ -121,3 +124,28 @@ class DeserializerTests(TestCase):
             assert annotation.y == 1263.1917724609375
             assert annotation.w == 677.0464477539062
             assert annotation.h == 737.7884521484375
+
+    def test_streamed_volume_annotation_page(self):
+        manifest = ManifestFactory.create()
+        canvases = [
+            CanvasFactory.create(manifest=manifest, position=position)
+            for position in range(1, 3)
+        ]
+        for canvas in canvases:
+            for order in range(1, 4):
+                AnnotationFactory.create(owner=self.ocr_user, canvas=canvas, order=order)
+        annotations = Annotation.objects.filter(canvas__manifest=manifest).order_by(
+            "canvas__position", "order"
+        )
+
+        streamed = json.loads(
+            "".join(volume_annotation_page.stream(manifest, annotations, chunk_size=2))
+        )
+        serialized = serialize_to_dicts(
+            "annotation_page_v3", [canvases[0]], annotations=annotations
+        )[0]
+
+        assert streamed["type"] == "AnnotationPage"
+        assert streamed["id"].endswith(f"/{manifest.pid}/annotationpage/{manifest.pid}")
+        assert len(streamed["items"]) == 6
+        assert streamed["items"] == json.loads(json.dumps(serialized["items"]))
@@ -1,12 +1,14 @@
 # pylint: disable = attribute-defined-outside-init, too-few-public-methods
 """Module for serializing IIIF Annotation Lists"""
-import json
-from django.core.serializers import serialize, deserialize
-from django.core.serializers.base import SerializerDoesNotExist
+from django.core.serializers import deserialize
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 import config.settings.local as settings
-from ..base import Serializer as JSONSerializer
+from ..base import (
+    Serializer as JSONSerializer,
+    serialize_to_dicts,
+    stream_json_list,
+    stream_json_object,
+)
 
 USER = get_user_model()
 
@@ -18,9 +20,15 @@ class Serializer(JSONSerializer):
         super()._init_options()
         self.volume_annotations = self.json_kwargs.pop('volume_annotations', 0)
 
-    def get_dump_object(self, obj):
-        # TODO: Add more validation checks before trying to serialize.
-        data = {
+    @staticmethod
+    def page(obj):
+        """The Annotation Page without its items.
+
+        :param obj: Manifest the annotations belong to
+        :type obj: apps.iiif.manifests.models.Manifest
+        :rtype: dict
+        """
+        return {
             '@context': 'http://iiif.io/api/presentation/3/context.json',
             'id': '{h}/iiif/{m}/annotationpage/{c}'.format(
                 h=settings.HOSTNAME,
@@ -30,23 +38,40 @@ class Serializer(JSONSerializer):
             'type': 'AnnotationPage'
         }
 
+    def get_dump_object(self, obj):
+        # TODO: Add more validation checks before trying to serialize.
+        data = self.page(obj)
+
         items = []
 
         for canvas_annotation in self.volume_annotations:
-            for annotation in canvas_annotation:
-                items.append(
-                    json.loads(
-                        serialize(
-                            'annotation_v3',
-                            [annotation]
-                        )
-                    )
-                )
+            items += serialize_to_dicts('annotation_v3', canvas_annotation)
 
         data['items'] = items
 
         return data
 
+def stream(obj, annotations, chunk_size=None):
+    """Serialize a volume's annotations as an Annotation Page, one chunk at a time.
+
+    Unlike the serializer, which holds every annotation in memory, memory use
+    here does not grow with the size of the volume.
+
+    :param obj: Manifest the annotations belong to
+    :type obj: apps.iiif.manifests.models.Manifest
+    :param annotations: Annotations, in page order, for the whole volume
+    :type annotations: django.db.models.QuerySet
+    :param chunk_size: Annotations per chunk, defaults to `settings.IIIF_STREAM_CHUNK_SIZE`
+    :type chunk_size: int, optional
+    :return: Pieces of JSON
+    :rtype: generator
+    """
+    return stream_json_object(
+        Serializer.page(obj),
+        'items',
+        stream_json_list('annotation_v3', annotations, chunk_size),
+    )
+
 def Deserializer(data):
     """Deserialize IIIF Annotation Page
 
@@ -7,5 +7,10 @@ urlpatterns = [
         '<volume>/comments/<canvas>/ocr',
         views.WebAnnotationOCRForPage.as_view(),
         name='web_annotation_ocr'
+    ),
+    path(
+        '<volume>/comments/ocr',
+        views.WebAnnotationOCRForVolume.as_view(),
+        name='web_annotation_ocr_volume'
     )
 ]
@@ -1,10 +1,13 @@
 """Django views for :class:`apps.iiif.annotations`"""
-import json
 from django.views.generic import ListView
-from django.core.serializers import serialize
 from django.contrib.auth import get_user_model
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
+from apps.iiif.annotations.models import Annotation
 from apps.iiif.canvases.models import Canvas
+from apps.iiif.manifests.models import Manifest
+from apps.iiif.serializers.base import serialize_to_dicts
+from apps.iiif.serializers.v3 import volume_annotation_page
 
 USER = get_user_model()
 
@@ -37,12 +40,44 @@ class WebAnnotationOCRForPage(ListView):
         query_set = self.get_queryset()
 
         return JsonResponse(
-            json.loads(
-                serialize(
-                    'annotation_page_v3',
-                    query_set,
-                    annotations=query_set.first().annotation_set.filter(owner=owner)
-                )
-            ),
+            serialize_to_dicts(
+                'annotation_page_v3',
+                query_set,
+                annotations=query_set.first().annotation_set.filter(
+                    owner=owner
+                ).select_related('owner', 'canvas__manifest')
+            )[0],
             safe=False
         )
+
+class WebAnnotationOCRForVolume(View):
+    """
+    Django View for getting the OCR annotations for every canvas in a volume.
+    """
+    def get(self, request, *args, **kwargs): # pylint: disable = unused-argument
+        """
+        Function to respond to HTTP GET requests for a volume's ocr annotations.
+        The Annotation Page is streamed so large volumes are never held in memory.
+
+        :param request: HTTP GET request
+        :type request: django request object?
+        :return: Serialized JSON based on the IIIF presentation API standards.
+        :rtype: JSON
+        """
+        manifest = Manifest.objects.filter(pid=kwargs['volume']).first()
+        if manifest is None:
+            raise Http404
+
+        annotations = Annotation.objects.filter(
+            canvas__manifest=manifest,
+            owner__username='ocr'
+        ).select_related(
+            'owner',
+            'canvas__manifest__image_server',
+            'canvas__image_server'
+        ).order_by('canvas__position', 'order')
+
+        return StreamingHttpResponse(
+            volume_annotation_page.stream(manifest, annotations),
+            content_type='application/json'
+        )
@@ -3,13 +3,16 @@
 from __future__ import annotations
 import json
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.serializers import serialize, deserialize
+from django.core.serializers import deserialize
+from django.db.models import Count, Q
 from django.http import JsonResponse
 from django.views import View
 from django.views.generic import ListView
 from django.contrib.auth import get_user_model
 from apps.iiif.manifests.models import Manifest
 from apps.iiif.canvases.models import Canvas
+from apps.iiif.serializers.base import serialize_to_dicts
+from .cache import get_annotation_counts
 from .models import UserAnnotation
 
 USER = get_user_model()
@@ -47,9 +50,7 @@ class Annotations(View):
                 )
                 if self.request.user == owner or username == "ocr":
                     return JsonResponse(
-                        json.loads(
-                            serialize(anno_serializer, queryset, owners=[owner])
-                        ),
+                        serialize_to_dicts(anno_serializer, queryset, owners=[owner])[0],
                         safe=False,
                     )
 
@@ -64,11 +65,9 @@ class Annotations(View):
                     )
 
                 return JsonResponse(
-                    json.loads(
-                        serialize(
-                            "annotation_page_v3", queryset, annotations=annotations
-                        )
-                    )
+                    serialize_to_dicts(
+                        "annotation_page_v3", queryset, annotations=annotations
+                    )[0]
                 )
 
             return JsonResponse(
@@ -95,15 +94,13 @@ class WebAnnotations(ListView):
             owner = USER.objects.get(username=username)
             if self.request.user == owner:
                 return JsonResponse(
-                    json.loads(
-                        serialize(
-                            "annotation_page_v3",
-                            query_set,
-                            annotations=query_set.first().userannotation_set.filter(
-                                owner=owner
-                            ),
-                        )
-                    ),
+                    serialize_to_dicts(
+                        "annotation_page_v3",
+                        query_set,
+                        annotations=query_set.first().userannotation_set.filter(
+                            owner=owner
+                        ),
+                    )[0],
                     safe=False,
                 )
             return JsonResponse(
@@ -162,7 +159,7 @@ class AnnotationCrud(View):
             for tag in tags:
                 annotation.tags.add(tag)
         return JsonResponse(
-            json.loads(serialize("annotation_v3", [annotation])), safe=False, status=201
+            serialize_to_dicts("annotation_v3", [annotation])[0], safe=False, status=201
         )
 
     def put(self, request):
@@ -191,7 +188,7 @@ class AnnotationCrud(View):
             annotation.refresh_from_db()
 
             return JsonResponse(
-                json.loads(serialize("annotation_v3", [annotation])),
+                serialize_to_dicts("annotation_v3", [annotation])[0],
                 safe=False,
                 status=200,
             )
@@ -227,23 +224,40 @@ class AnnotationCountByCanvas(View):
     def get(self, request, *args, **kwargs):
         username = kwargs["username"]
         try:
-            manifest = Manifest.objects.get(pid=self.kwargs["manifest"])
             owner = USER.objects.get(username=username)
-            counts = [
-                {
-                    "canvas": c.pid,
-                    "count": c.userannotation_set.filter(owner=owner).count(),
-                }
-                for c in manifest.canvas_set.all()
-            ]
-            if self.request.user == owner:
-                return JsonResponse(status=200, data=counts, safe=False)
-            return JsonResponse(
-                status=401,
-                data={
-                    "Permission to see annotations not allowed for logged in account.": username
-                },
-            )
-
+            # Check permission before doing any counting.
+            if self.request.user != owner:
+                return JsonResponse(
+                    status=401,
+                    data={
+                        "Permission to see annotations not allowed for logged in account.": username
+                    },
+                )
+            manifest = Manifest.objects.get(pid=self.kwargs["manifest"])
         except ObjectDoesNotExist:
             return JsonResponse(status=404, data={"USER not found.": username})
+
+        counts = get_annotation_counts(
+            manifest.id, owner.id, lambda: self.count_by_canvas(manifest, owner)
+        )
+        return JsonResponse(status=200, data=counts, safe=False)
+
+    @staticmethod
+    def count_by_canvas(manifest, owner):
+        """Count the owner's annotations on each of the manifest's canvases in one query.
+
+        :param manifest: Manifest the annotations are on
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :param owner: Owner of the annotations
+        :type owner: apps.users.models.User
+        :return: List of {canvas, count} dicts in canvas order
+        :rtype: list
+        """
+        counts = (
+            manifest.canvas_set.annotate(
+                count=Count("userannotation", filter=Q(userannotation__owner=owner))
+            )
+            .order_by("position")
+            .values_list("pid", "count")
+        )
+        return [{"canvas": pid, "count": count} for pid, count in counts]
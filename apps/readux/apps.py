@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ReaduxConfig(AppConfig):
     """Configuration for Readux Django app"""
     name = 'apps.readux'
+
+    def ready(self):
+        from . import signals  # noqa F401 pylint: disable = import-outside-toplevel, unused-import
@@ -0,0 +1,84 @@
+"""Cache of each user's annotation counts per canvas of a manifest.
+
+The counts back the viewer's sidebar. A user's counts are dropped whenever
+one of their annotations on the manifest is saved or deleted, and every user's
+counts on a manifest are dropped when its canvases change, see
+:func:`invalidate_manifest_annotation_counts`.
+"""
+
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import cache
+
+
+def annotation_counts_generation_key(manifest_id):
+    """Cache key for the generation token of a manifest's annotation counts.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :return: Cache key
+    :rtype: str
+    """
+    return f"readux-annotation-counts-generation-{manifest_id}"
+
+
+def annotation_counts_cache_key(manifest_id, owner_id):
+    """Cache key for a user's annotation counts on a manifest.
+
+    The key includes a generation token that
+    :func:`invalidate_manifest_annotation_counts` replaces.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :param owner_id: Primary key for the annotations' owner
+    :type owner_id: int
+    :return: Cache key
+    :rtype: str
+    """
+    generation = cache.get_or_set(
+        annotation_counts_generation_key(manifest_id), uuid4().hex, None
+    )
+    return f"readux-annotation-counts-{manifest_id}-{generation}-{owner_id}"
+
+
+def get_annotation_counts(manifest_id, owner_id, count):
+    """Get a user's annotation counts on a manifest, counting on a miss.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :param owner_id: Primary key for the annotations' owner
+    :type owner_id: int
+    :param count: Function returning the counts
+    :type count: callable
+    :return: List of {canvas, count} dicts
+    :rtype: list
+    """
+    if not settings.ANNOTATION_COUNT_CACHE_TIMEOUT:
+        return count()
+    return cache.get_or_set(
+        annotation_counts_cache_key(manifest_id, owner_id),
+        count,
+        settings.ANNOTATION_COUNT_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_annotation_counts(manifest_id, owner_id):
+    """Drop a user's cached annotation counts on a manifest.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :param owner_id: Primary key for the annotations' owner
+    :type owner_id: int
+    """
+    cache.delete(annotation_counts_cache_key(manifest_id, owner_id))
+
+
+def invalidate_manifest_annotation_counts(manifest_id):
+    """Drop every user's cached annotation counts on a manifest.
+
+    Called when canvases are added to, changed on or removed from the manifest.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    """
+    cache.set(annotation_counts_generation_key(manifest_id), uuid4().hex, None)
@@ -1,10 +1,56 @@
 """Global template contexts."""
 
-from os import environ
+import json
+import logging
+from functools import lru_cache
+from os import environ, path
 from git import Repo
 from django.conf import settings
 from . import __version__
 
+LOGGER = logging.getLogger(__name__)
+
+
+def read_git_info():
+    """Read the branch and commit of the checkout from Git.
+
+    Returns:
+        dict: Dict with keys 'BRANCH', 'COMMIT' and 'COMMIT_DATE'.
+    """
+    repo = Repo(settings.ROOT_DIR.path())
+    return {
+        "BRANCH": repo.active_branch.name,
+        "COMMIT": repo.active_branch.commit.hexsha,
+        "COMMIT_DATE": repo.active_branch.commit.committed_datetime.strftime(
+            "%m/%d/%Y, %H:%M:%S"
+        ),
+    }
+
+
+@lru_cache(maxsize=None)
+def git_info():
+    """Branch and commit info, looked up once per process.
+
+    Read from `settings.VERSION_INFO_FILE` when it exists, e.g. written at build
+    time by the `version_info` management command. Otherwise read from Git,
+    unless `settings.VERSION_INFO_FROM_GIT` is False.
+
+    Returns:
+        dict: Dict with keys 'BRANCH', 'COMMIT' and 'COMMIT_DATE', or an empty
+        dict when the info is not available.
+    """
+    if settings.VERSION_INFO_FILE and path.exists(settings.VERSION_INFO_FILE):
+        with open(settings.VERSION_INFO_FILE, encoding="utf-8") as version_file:
+            return json.load(version_file)
+    if not settings.VERSION_INFO_FROM_GIT:
+        return {}
+    try:
+        return read_git_info()
+    except Exception:  # pylint: disable = broad-except
+        # e.g. not a checkout or a detached HEAD
+        LOGGER.warning("Could not read version info from Git", exc_info=True)
+        return {}
+
 
 def current_version(_=None):
     """Display current version. On non-production instances, display Git information.
@@ -25,20 +71,11 @@ def current_version(_=None):
     Returns:
         dict: Dict of version and Git info.
     """
-    repo = Repo(settings.ROOT_DIR.path())
-
     version_info = {"DJANGO_ENV": environ["DJANGO_ENV"], "APP_VERSION": __version__}
 
     if environ["DJANGO_ENV"] == "production":
         return version_info
-    return {
-        **version_info,
-        "BRANCH": repo.active_branch.name,
-        "COMMIT": repo.active_branch.commit.hexsha,
-        "COMMIT_DATE": repo.active_branch.commit.committed_datetime.strftime(
-            "%m/%d/%Y, %H:%M:%S"
-        ),
-    }
+    return {**version_info, **git_info()}
 
 
 def footer_template(_):
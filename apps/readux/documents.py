@@ -32,6 +32,8 @@ class UserAnnotationDocument(Document):
         """Settings for automatically pulling data from Django"""
 
         model = UserAnnotation
+        # Indexed by `apps.readux.tasks.reindex_dirty_manifest_task` rather than on every save.
+        ignore_signals = True
 
     def prepare_content(self, instance):
         """Strip HTML tags from content"""
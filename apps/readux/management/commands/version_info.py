@@ -0,0 +1,25 @@
+"""
+Manage command to stamp the branch and commit info at build time.
+"""
+
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ...context_processors import read_git_info
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the Git branch and commit to settings.VERSION_INFO_FILE so running "
+        "sites can show them without probing Git."
+    )
+
+    def handle(self, *args, **options):
+        info = read_git_info()
+        with open(settings.VERSION_INFO_FILE, "w", encoding="utf-8") as version_file:
+            json.dump(info, version_file)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {info['BRANCH']} {info['COMMIT']} to {settings.VERSION_INFO_FILE}"
+            )
+        )
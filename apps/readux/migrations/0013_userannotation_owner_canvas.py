@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('readux', '0012_userannotation_raw_content'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='userannotation',
+            index=models.Index(fields=['owner', 'canvas'], name='userannotation_owner_canvas'),
+        ),
+    ]
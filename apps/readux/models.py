@@ -2,12 +2,14 @@
 
 import json
 import re
+from collections import defaultdict
 from taggit.managers import TaggableManager
 from taggit.models import TaggedItemBase
 from django.db import models
 from apps.iiif.annotations.models import AbstractAnnotation, Annotation
 from apps.iiif.canvases.models import Canvas
-from apps.iiif.manifests.documents import ManifestDocument
+from .cache import invalidate_annotation_counts
+from .tasks import mark_manifest_dirty
 
 
 class TaggedUserAnnotations(TaggedItemBase):
@@ -48,6 +50,12 @@ class UserAnnotation(AbstractAnnotation):
     end_offset = models.IntegerField(null=True, blank=True, default=None)
     tags = TaggableManager(through=TaggedUserAnnotations)
 
+    class Meta:  # pylint: disable=too-few-public-methods, missing-class-docstring
+        # A user's annotations are counted and listed per canvas.
+        indexes = [
+            models.Index(fields=["owner", "canvas"], name="userannotation_owner_canvas")
+        ]
+
     @property
     def item(self):
         """_summary_
@@ -108,17 +116,22 @@ class UserAnnotation(AbstractAnnotation):
 
     def save(self, *args, **kwargs):
         self.pre_save()
-        if self.canvas:
-            index = ManifestDocument()
-            index.update(self.canvas.manifest, True, "index")
         super().save(*args, **kwargs)
         self.post_save()
+        if self.canvas:
+            invalidate_annotation_counts(self.canvas.manifest_id, self.owner_id)
+            # Reindexing is coalesced per manifest, see `apps.readux.tasks`.
+            mark_manifest_dirty(self.canvas.manifest_id, self.modified_at)
 
     def delete(self, *args, **kwargs):
-        if self.canvas:
-            index = ManifestDocument()
-            index.update(self.canvas.manifest, True, "delete")
+        from .documents import UserAnnotationDocument
+
+        UserAnnotationDocument().update(self, True, "delete", raise_on_error=False)
+        manifest_id = self.canvas.manifest_id if self.canvas else None
         super().delete(*args, **kwargs)
+        if manifest_id:
+            # The cached annotation counts are dropped by `apps.readux.signals`.
+            mark_manifest_dirty(manifest_id)
 
     def update(self, attrs=None, tags=None):
         """Method to update an annotation object with a dict of attributes and a list of tags
@@ -301,3 +314,30 @@ class UserAnnotation(AbstractAnnotation):
             self.y = dimensions[1]
             self.w = dimensions[2]
             self.h = dimensions[3]
+
+
+def annotations_by_canvas(manifest, owners, queryset=None):
+    """Group the owners' annotations on a manifest by canvas, in one query.
+
+    :param manifest: Manifest the annotations are on
+    :type manifest: apps.iiif.manifests.models.Manifest
+    :param owners: Users, or user ids, whose annotations to include
+    :type owners: list
+    :param queryset: Annotations to group, defaults to all annotations with the
+        related objects the annotation serializers need
+    :type queryset: django.db.models.QuerySet, optional
+    :return: Lists of annotations keyed by canvas id
+    :rtype: dict
+    """
+    if queryset is None:
+        queryset = (
+            UserAnnotation.objects.select_related(
+                "owner", "canvas__manifest", "start_selector", "end_selector"
+            )
+            .prefetch_related("tags")
+            .order_by("created_at")
+        )
+    grouped = defaultdict(list)
+    for annotation in queryset.filter(canvas__manifest=manifest, owner__in=owners):
+        grouped[annotation.canvas_id].append(annotation)
+    return dict(grouped)
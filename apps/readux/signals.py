@@ -0,0 +1,25 @@
+"""Signals to keep the cached annotation counts current."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.iiif.canvases.models import Canvas
+from .cache import invalidate_annotation_counts, invalidate_manifest_annotation_counts
+from .models import UserAnnotation
+
+
+@receiver(post_save, sender=Canvas)
+@receiver(post_delete, sender=Canvas)
+def canvas_changed(sender, instance, **kwargs):  # pylint: disable = unused-argument
+    """Drop the counts on the canvas' manifest, which list every canvas."""
+    invalidate_manifest_annotation_counts(instance.manifest_id)
+
+
+@receiver(post_delete, sender=UserAnnotation)
+def user_annotation_deleted(sender, instance, **kwargs):  # pylint: disable = unused-argument
+    """Drop the owner's counts, including for cascades and queryset deletes."""
+    manifest_id = (
+        Canvas.objects.filter(pk=instance.canvas_id)
+        .values_list("manifest_id", flat=True)
+        .first()
+    )
+    if manifest_id:
+        invalidate_annotation_counts(manifest_id, instance.owner_id)
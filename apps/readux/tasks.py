@@ -0,0 +1,92 @@
+"""Background tasks for Readux user annotations."""
+from os import environ
+from celery import Celery
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+app = Celery('apps.readux', result_extended=True)
+app.config_from_object('django.conf:settings')
+app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+def dirty_manifest_key(manifest_id):
+    """Cache key marking a manifest as needing a reindex.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :return: Cache key
+    :rtype: str
+    """
+    return f'readux-dirty-manifest-{manifest_id}'
+
+
+def mark_manifest_dirty(manifest_id, since=None):
+    """Mark a manifest as needing a reindex after a user annotation changed.
+
+    The mark is set when the current transaction commits, so an edit that is
+    rolled back neither reindexes nor holds back later edits.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :param since: Annotations modified at or after this time will be reindexed,
+        defaults to now
+    :type since: datetime.datetime, optional
+    """
+    since = since or timezone.now()
+    transaction.on_commit(lambda: enqueue_dirty_manifest_reindex(manifest_id, since))
+
+
+def enqueue_dirty_manifest_reindex(manifest_id, since):
+    """Enqueue :func:`reindex_dirty_manifest_task` unless one is already pending.
+
+    Only the first mark within `settings.ANNOTATION_REINDEX_WINDOW` seconds
+    enqueues the task. Later marks are coalesced into that run.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    :param since: Annotations modified at or after this time will be reindexed
+    :type since: datetime.datetime
+    """
+    window = settings.ANNOTATION_REINDEX_WINDOW
+    # The key outlives the window so a stalled worker does not block
+    # reindexing forever, but it is normally removed by the task itself.
+    if not cache.add(dirty_manifest_key(manifest_id), since, window * 10):
+        return
+
+    if environ['DJANGO_ENV'] != 'test':  # pragma: no cover
+        reindex_dirty_manifest_task.apply_async(args=[str(manifest_id)], countdown=window)
+    else:
+        reindex_dirty_manifest_task(str(manifest_id))
+
+
+@app.task(name='reindex_dirty_manifest', autoretry_for=(Exception,), retry_backoff=True, max_retries=20)
+def reindex_dirty_manifest_task(manifest_id):
+    """Background task to reindex a manifest marked dirty by annotation edits.
+
+    Refreshes the Manifest document and only the UserAnnotation documents
+    modified since the manifest was marked.
+
+    :param manifest_id: Primary key for Manifest object
+    :type manifest_id: UUID
+    """
+    from apps.iiif.manifests.models import Manifest
+    from apps.iiif.manifests.documents import ManifestDocument
+    from .models import UserAnnotation
+    from .documents import UserAnnotationDocument
+
+    key = dirty_manifest_key(manifest_id)
+    since = cache.get(key)
+    # Clear the mark before indexing so edits made while this runs enqueue a new task.
+    cache.delete(key)
+
+    manifest = Manifest.objects.get(pk=manifest_id)
+    ManifestDocument().update(manifest, True, 'index')
+
+    annotations = UserAnnotation.objects.filter(
+        canvas__manifest=manifest
+    ).select_related('canvas__manifest', 'owner')
+    if since is not None:
+        annotations = annotations.filter(modified_at__gte=since)
+    UserAnnotationDocument().update(annotations, True, 'index')
@@ -0,0 +1,40 @@
+"""Test the database indexes used by hot lookups."""
+from uuid import uuid4
+from django.db import connection
+from django.test import TestCase
+from apps.iiif.annotations.models import Annotation
+from apps.iiif.canvases.models import Canvas
+from apps.iiif.kollections.models import Collection
+from apps.iiif.manifests.models import Manifest
+from apps.readux.models import UserAnnotation
+
+
+class IndexTests(TestCase):
+    """Check the query plans of hot lookups use their indexes."""
+
+    def setUp(self):
+        # The test tables are tiny, so make Postgres prefer any index it can use.
+        # SET LOCAL ends with the transaction each test runs in.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index):  # pylint: disable = invalid-name
+        plan = queryset.explain()
+        assert index in plan, plan
+
+    def test_pid_lookups(self):
+        self.assertUsesIndex(Manifest.objects.filter(pid="abc"), "manifest_pid_idx")
+        self.assertUsesIndex(Canvas.objects.filter(pid="abc"), "canvas_pid_idx")
+        self.assertUsesIndex(Collection.objects.filter(pid="abc"), "collection_pid_idx")
+
+    def test_canvas_ocr_lookup(self):
+        self.assertUsesIndex(
+            Annotation.objects.filter(canvas_id=uuid4(), owner_id=1).order_by("order"),
+            "annotation_canvas_owner_order",
+        )
+
+    def test_user_annotations_on_canvas_lookup(self):
+        self.assertUsesIndex(
+            UserAnnotation.objects.filter(owner_id=1, canvas_id=uuid4()),
+            "userannotation_owner_canvas",
+        )
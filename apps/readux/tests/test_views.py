@@ -5,8 +5,12 @@ from unittest.mock import Mock, patch
 from tempfile import gettempdir
 from pathlib import Path
 import pytest
-from django.http import HttpResponse
-from django.test import RequestFactory, TestCase
+from django.http import FileResponse, Http404
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django_elasticsearch_dsl.test import ESTestCase
 from apps.readux import views
 from apps.iiif.manifests.models import Language, Manifest
@@ -15,7 +19,9 @@ from apps.iiif.manifests.documents import ManifestDocument
 from apps.iiif.kollections.tests.factories import CollectionFactory
 from apps.iiif.kollections.models import Collection
 from apps.iiif.canvases.models import Canvas
+from apps.iiif.canvases.tests.factories import CanvasFactory
 from apps.users.tests.factories import UserFactory
+from apps.readux.tests.factories import UserAnnotationFactory
 
 pytestmark = pytest.mark.django_db
 
@@ -55,6 +61,52 @@ class TestReaduxViews:
         assert data["volume"].pid == volume.pid
         assert data["page"].pid == volume.canvas_set.all().first().pid
 
+    def test_page_detail_annotation_counts(self):
+        """It should count the user's annotations per page and volume in one query"""
+        request = RequestFactory().get("/")
+        request.user = UserFactory.create()
+        volume = ManifestFactory.create()
+        first = volume.canvas_set.first()
+        Canvas.objects.filter(pk=first.pk).update(position=1)
+        second = CanvasFactory.create(manifest=volume, position=2)
+        view = views.PageDetail(request=request)
+
+        # Warm the landmark page cache.
+        view.get_context_data(volume=volume.pid, page=first.pid)
+        with CaptureQueriesContext(connection) as without_annotations:
+            view.get_context_data(volume=volume.pid, page=first.pid)
+
+        for canvas in (first, first, second):
+            UserAnnotationFactory.create(owner=request.user, canvas=canvas)
+        # Another user's annotations are not counted.
+        UserAnnotationFactory.create(canvas=first)
+        with CaptureQueriesContext(connection) as with_annotations:
+            data = view.get_context_data(volume=volume.pid, page=first.pid)
+
+        assert len(with_annotations) == len(without_annotations)
+        assert data["user_annotation_page_count"] == 2
+        assert data["user_annotation_count"] == 3
+        assert [
+            (index["canvas__pid"], index["canvas__position__count"])
+            for index in data["json_data"]["json_data"]
+        ] == [(first.pid, 2), (second.pid, 1)]
+        assert data["user_annotation_index"][0]["canvas__manifest__label"] == volume.label
+
+    def test_page_detail_anonymous_skips_annotation_query(self):
+        """It should not query annotations for an anonymous user"""
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        volume = ManifestFactory.create()
+        view = views.PageDetail(request=request)
+        view.get_context_data(volume=volume.pid)
+        with CaptureQueriesContext(connection) as queries:
+            data = view.get_context_data(volume=volume.pid)
+        # The manifest, with its image server, and the first canvas.
+        assert len(queries) == 2
+        assert data["user_annotation_page_count"] == 0
+        assert data["user_annotation_count"] == 0
+        assert data["json_data"] == {"json_data": []}
+
     def test_manifests_sitemap(self):
         """Test"""
         for _ in range(5):
@@ -82,13 +134,40 @@ class TestReaduxViews:
         user = UserFactory.create()
         request.user = user
         dummy_file = os.path.join(gettempdir(), "dummy.txt")
-        Path(dummy_file).touch()
+        Path(dummy_file).write_bytes(b"0123456789")
         view = views.ExportDownloadZip(request=request)
         response = view.get(request, filename=dummy_file)
-        assert isinstance(response, HttpResponse)
+        assert isinstance(response, FileResponse)
         assert response.status_code == 200
-        assert isinstance(response.serialize(), bytes)
-        assert "jekyll_site_export.zip" in str(response.serialize())
+        assert response["Accept-Ranges"] == "bytes"
+        assert "jekyll_site_export.zip" in response["Content-Disposition"]
+        assert b"".join(response.streaming_content) == b"0123456789"
+
+        request = factory.get("/", HTTP_RANGE="bytes=4-")
+        request.user = user
+        response = view.get(request, filename="dummy.txt")
+        assert response.status_code == 206
+        assert response["Content-Range"] == "bytes 4-9/10"
+        assert b"".join(response.streaming_content) == b"456789"
+
+    def test_export_download_zip_missing(self):
+        """Test"""
+        request = RequestFactory().get("/")
+        request.user = UserFactory.create()
+        view = views.ExportDownloadZip(request=request)
+        with pytest.raises(Http404):
+            view.get(request, filename="../../etc/passwd")
+
+    @override_settings(DOWNLOAD_SENDFILE="x-accel-redirect")
+    def test_export_download_zip_accel_redirect(self):
+        """Test"""
+        request = RequestFactory().get("/")
+        request.user = UserFactory.create()
+        Path(os.path.join(gettempdir(), "dummy.txt")).touch()
+        view = views.ExportDownloadZip(request=request)
+        response = view.get(request, filename="dummy.txt")
+        assert response["X-Accel-Redirect"] == "/export-downloads/dummy.txt"
+        assert response.content == b""
 
 
 class TestVolumeSearchView(ESTestCase, TestCase):
@@ -153,6 +232,19 @@ class TestVolumeSearchView(ESTestCase, TestCase):
         # should sort by label alphabetically by default
         assert response.hits[0]["label"] == self.volume1.label
 
+    def test_aggregations_are_kept_off_the_paginated_search(self):
+        """Should only run the facet aggregations in their own search, without hits"""
+        volume_search_view = views.VolumeSearchView()
+        volume_search_view.request = Mock()
+        volume_search_view.request.GET = {}
+        assert "aggs" not in volume_search_view.get_queryset().to_dict()
+        aggregation_search = volume_search_view.get_aggregation_search().to_dict()
+        assert aggregation_search["size"] == 0
+        assert "sort" not in aggregation_search
+        assert {"language", "author", "collection", "min_date", "max_date"} <= set(
+            aggregation_search["aggs"]
+        )
+
     def test_get_queryset_filters(self):
         """Should filter according to chosen filters"""
 
@@ -298,6 +390,7 @@ class TestVolumeSearchView(ESTestCase, TestCase):
     @patch("apps.readux.forms.ManifestSearchForm.set_date")
     def test_get_context_data(self, mock_set_date, mock_set_facets):
         """Should call form's set_facets method on returned facets from Elasticsearch"""
+        cache.clear()
         volume_search_view = views.VolumeSearchView(kwargs={})
         volume_search_view.request = Mock()
         volume_search_view.request.GET = {}
@@ -306,15 +399,27 @@ class TestVolumeSearchView(ESTestCase, TestCase):
             ("author", Mock()),
             ("collections", Mock()),
         ]
-        with patch("apps.readux.views.VolumeSearchView.get_queryset") as mock_queryset:
+        with patch(
+            "apps.readux.views.VolumeSearchView.get_aggregation_search"
+        ) as mock_search, patch(
+            "apps.readux.views.VolumeSearchView.get_queryset"
+        ) as mock_queryset:
             volume_search_view.queryset = mock_queryset
             volume_search_view.object_list = mock_queryset
-            mock_queryset.return_value.execute.return_value = Mock()
-            response = mock_queryset.return_value.execute.return_value
+            mock_search.return_value.execute.return_value = Mock()
+            response = mock_search.return_value.execute.return_value
 
             # these are not nested facets, so delete "inner" attributes
             del response.aggregations.language.inner
             del response.aggregations.author.inner
+            # buckets and dates are cached, so they must be plain values
+            response.aggregations.language.buckets = [{"key": "en", "doc_count": 2}]
+            response.aggregations.author.buckets = [{"key": "Ben", "doc_count": 2}]
+            response.aggregations.collections.inner.buckets = [
+                {"key": "test collection", "doc_count": 2}
+            ]
+            response.aggregations.min_date.value_as_string = "1900-01-01T00:00:00.000Z"
+            response.aggregations.max_date.value_as_string = "2022-11-23T00:00:00.000Z"
 
             volume_search_view.get_context_data()
             mock_set_facets.assert_called_with(
@@ -331,3 +436,74 @@ class TestVolumeSearchView(ESTestCase, TestCase):
                 response.aggregations.min_date.value_as_string,
                 response.aggregations.max_date.value_as_string,
             )
+
+    def test_custom_metadata_facets_are_not_shared(self):
+        """Custom metadata facets should only be added to each view instance"""
+        with patch.object(
+            views.settings, "CUSTOM_METADATA", {"Place": {"faceted": True}}, create=True
+        ):
+            for _ in range(3):
+                volume_search_view = views.VolumeSearchView()
+        assert len(volume_search_view.facets) == len(views.VolumeSearchView.facets) + 1
+        assert "Place" not in dict(views.VolumeSearchView.facets)
+
+    def test_aggregations_cached_until_reindex(self):
+        """Facets for searches without a query should be cached until the index changes"""
+        cache.clear()
+        volume_search_view = views.VolumeSearchView()
+        volume_search_view.request = Mock()
+        volume_search_view.request.GET = {"language": ["English"]}
+        aggregations = volume_search_view.get_aggregations()
+        assert {"key": "English", "doc_count": 2} in aggregations["facets"]["language"]
+
+        with patch(
+            "apps.readux.views.VolumeSearchView.get_aggregation_search"
+        ) as mock_queryset:
+            mock_queryset.return_value.execute.return_value.aggregations = Mock(spec=[])
+            assert volume_search_view.get_aggregations() == aggregations
+            mock_queryset.assert_not_called()
+
+            ManifestDocument().update(self.volume3, True, "index")
+            assert volume_search_view.get_aggregations() == {"facets": {}, "dates": None}
+            mock_queryset.assert_called_once()
+
+            # searches with a query are never cached
+            volume_search_view.request.GET = {"q": "secondary"}
+            volume_search_view.get_aggregations()
+            volume_search_view.get_aggregations()
+            assert mock_queryset.call_count == 3
+
+    def test_get_context_data_start_canvases(self):
+        """Should find the start canvas of every volume on the page in one query"""
+        cache.clear()
+        canvases = {}
+        for volume in (self.volume1, self.volume2):
+            canvases[volume.pid] = [
+                CanvasFactory.create(manifest=volume, position=position)
+                for position in range(1, 4)
+            ]
+        Canvas.objects.update(is_starting_page=False)
+        Canvas.objects.filter(pk=canvases[self.volume1.pid][1].pk).update(
+            is_starting_page=True
+        )
+
+        volume_search_view = views.VolumeSearchView(kwargs={})
+        volume_search_view.request = RequestFactory().get("/search/")
+        volume_search_view.object_list = volume_search_view.get_queryset()
+        # warm the facet cache so only the start canvas query is counted
+        volume_search_view.get_aggregations()
+
+        with self.assertNumQueries(1):
+            context_data = volume_search_view.get_context_data()
+            start_canvases = {
+                volume.pid: volume.start_canvas
+                for volume in context_data["volumes"].object_list
+            }
+            # the templates' thumbnail URLs need no more queries
+            for start_canvas in start_canvases.values():
+                if start_canvas is not None:
+                    start_canvas.resource_id  # pylint: disable = pointless-statement
+
+        assert start_canvases[self.volume1.pid] == canvases[self.volume1.pid][1]
+        assert start_canvases[self.volume2.pid] == canvases[self.volume2.pid][0]
+        assert start_canvases[self.volume3.pid] is None
@@ -1,10 +1,15 @@
 import json
+import os
+import tempfile
 import uuid
+from unittest.mock import patch
 from cssutils import parseString
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
 from django.urls import reverse
 from django.core.serializers import serialize
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.test import RequestFactory
 from apps import readux
 from apps.iiif.manifests.models import Manifest
@@ -16,7 +21,8 @@ from apps.readux.views import ExportOptions, AnnotationCount
 from apps.users.tests.factories import UserFactory
 from ..annotations import Annotations, AnnotationCrud, AnnotationCountByCanvas
 from ..models import UserAnnotation
-from ..context_processors import current_version
+from ..context_processors import current_version, git_info
+from ..tasks import dirty_manifest_key, mark_manifest_dirty
 from .factories import UserAnnotationFactory
 
 
@@ -334,6 +340,54 @@ class AnnotationTests(TestCase):
         response_data = json.loads(response.content.decode("UTF-8-sig"))
         assert response_data[0]["count"] == 5
 
+    def test_user_annotation_count_by_canvas_is_cached(self):
+        """Test"""
+        cache.clear()
+        self.create_user_annotations(2, self.user_a)
+        kwargs = {"username": self.user_a.username, "manifest": self.manifest.pid}
+        request = self.factory.get(reverse("annotation_count_by_canvas", kwargs=kwargs))
+        request.user = self.user_a
+        view = AnnotationCountByCanvas.as_view()
+
+        # The owner, the manifest and one grouped count.
+        with self.assertNumQueries(3):
+            response = view(request, **kwargs)
+        counts = json.loads(response.content.decode("UTF-8-sig"))
+        assert len(counts) == self.manifest.canvas_set.count()
+        assert sum(count["count"] for count in counts) == 2
+
+        with self.assertNumQueries(2):
+            view(request, **kwargs)
+
+        self.create_user_annotations(1, self.user_a)
+        counts = json.loads(view(request, **kwargs).content.decode("UTF-8-sig"))
+        assert sum(count["count"] for count in counts) == 3
+
+        # Queryset deletes and canvas changes outside the annotation views.
+        UserAnnotation.objects.filter(owner=self.user_a).delete()
+        counts = json.loads(view(request, **kwargs).content.decode("UTF-8-sig"))
+        assert sum(count["count"] for count in counts) == 0
+
+        canvas_count = self.manifest.canvas_set.count()
+        Canvas.objects.bulk_import(
+            self.manifest, [{"pid": "counted", "width": 10, "height": 20}]
+        )
+        counts = json.loads(view(request, **kwargs).content.decode("UTF-8-sig"))
+        assert len(counts) == canvas_count + 1
+
+        Canvas.objects.filter(pid="counted").delete()
+        counts = json.loads(view(request, **kwargs).content.decode("UTF-8-sig"))
+        assert len(counts) == canvas_count
+
+    def test_user_annotation_count_by_canvas_checks_permission_first(self):
+        """Test"""
+        kwargs = {"username": self.user_a.username, "manifest": self.manifest.pid}
+        request = self.factory.get(reverse("annotation_count_by_canvas", kwargs=kwargs))
+        request.user = self.user_b
+        with self.assertNumQueries(1):
+            response = AnnotationCountByCanvas.as_view()(request, **kwargs)
+        assert response.status_code == 401
+
     def test_mirador_svg_annotation_creation(self):
         """Test"""
         request = self.factory.post(
@@ -903,6 +957,34 @@ class AnnotationTests(TestCase):
         """It should return the current version."""
         assert readux.__version__ == current_version()["APP_VERSION"]
 
+    def test_current_version_git_info_is_read_once(self):
+        """It should only probe Git once per process."""
+        git_info.cache_clear()
+        with override_settings(VERSION_INFO_FILE=""), patch(
+            "apps.readux.context_processors.read_git_info",
+            return_value={"BRANCH": "develop"},
+        ) as read_git_info:
+            current_version()
+            assert current_version()["BRANCH"] == "develop"
+            assert read_git_info.call_count == 1
+        git_info.cache_clear()
+
+    def test_current_version_from_stamp_file(self):
+        """It should prefer the build-time stamp file, and probing Git can be off."""
+        stamp = os.path.join(tempfile.mkdtemp(), "version.json")
+        with open(stamp, "w", encoding="utf-8") as stamp_file:
+            json.dump({"BRANCH": "release", "COMMIT": "abc123"}, stamp_file)
+        git_info.cache_clear()
+        with override_settings(VERSION_INFO_FILE=stamp):
+            assert current_version()["COMMIT"] == "abc123"
+        git_info.cache_clear()
+        with override_settings(
+            VERSION_INFO_FILE="", VERSION_INFO_FROM_GIT=False
+        ), patch("apps.readux.context_processors.Repo") as repo:
+            assert "BRANCH" not in current_version()
+            repo.assert_not_called()
+        git_info.cache_clear()
+
     def test_text_anno_dimensions(self):
         """It should set dimensions for text annotation."""
         ocr_user = UserFactory.create(username="ocr", name="OCR")
@@ -942,3 +1024,39 @@ class AnnotationTests(TestCase):
         assert ua.y == 5
         assert ua.h == 33
         assert ua.w == 32
+
+    def test_annotation_edits_coalesce_manifest_reindex(self):
+        """It should enqueue one reindex per manifest for a burst of edits."""
+        cache.clear()
+        with patch("apps.readux.tasks.reindex_dirty_manifest_task") as reindex:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_user_annotations(3, self.user_a)
+                UserAnnotation.objects.filter(owner=self.user_a).first().delete()
+        reindex.assert_called_once_with(str(self.manifest.id))
+        cache.clear()
+
+    def test_reindex_dirty_manifest_clears_mark(self):
+        """It should clear the dirty mark so later edits reindex again."""
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_manifest_dirty(self.manifest.id)
+        assert cache.get(dirty_manifest_key(self.manifest.id)) is None
+
+    def test_rolled_back_edit_does_not_hold_back_reindex(self):
+        """It should only mark the manifest dirty once the edit commits."""
+        cache.clear()
+        with patch("apps.readux.tasks.reindex_dirty_manifest_task") as reindex:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        mark_manifest_dirty(self.manifest.id)
+                        raise DatabaseError
+                except DatabaseError:
+                    pass
+            assert cache.get(dirty_manifest_key(self.manifest.id)) is None
+            reindex.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                mark_manifest_dirty(self.manifest.id)
+        reindex.assert_called_once_with(str(self.manifest.id))
+        cache.clear()
@@ -3,23 +3,26 @@
 import re
 from os import path
 from urllib.parse import urlencode
-from django.http import HttpResponse
+from django.http import Http404
 from django.views.generic import ListView
 from django.views.generic.base import TemplateView, View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import FormMixin
 from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
 from django.db.models import Max, Count, F
 from django.urls import reverse
 from elasticsearch_dsl import Q, NestedFacet, TermsFacet
 from elasticsearch_dsl.query import MultiMatch
 import config.settings.local as settings
+from apps.iiif.manifests.cache import search_facets_cache_key
 from apps.iiif.manifests.documents import ManifestDocument
 from apps.readux.forms import AllVolumesForm, ManifestSearchForm
 from apps.export.export import JekyllSiteExport
 from apps.export.forms import JekyllExportForm
+from apps.utils.download import file_download_response
 from .models import UserAnnotation
-from ..cms.models import Page, CollectionsPage, VolumesPage
+from ..cms.landmarks import landmark_page
 from ..iiif.kollections.models import Collection
 from ..iiif.canvases.models import Canvas
 from ..iiif.manifests.models import Manifest
@@ -128,7 +131,7 @@ class CollectionDetail(DetailView, FormMixin):
                 "paginator_range": paginator.get_elided_page_range(
                     page, on_each_side=2
                 ),
-                "collectionlink": Page.objects.type(CollectionsPage).first(),
+                "collectionlink": landmark_page("collections"),
             }
         )
 
@@ -176,30 +179,67 @@ class PageDetail(TemplateView):
 
     template_name = "page.html"
 
-    def get_metadatum(self, volume, key):
+    def get_metadatum(self, volume, key, metadata_index=None):
         """Attempt to retrieve a value from a volume's metadata by key. If it cannot
-        be found, return an empty string."""
+        be found, return an empty string.
+
+        Pass `metadata_index`, from :meth:`index_metadata`, to avoid scanning
+        the metadata list for every key."""
         if hasattr(volume, key):
             # first try volume's model attributes
             return getattr(volume, key)
-        elif isinstance(volume.metadata, dict):
-            # if not a model attr, attempt to get value from volume metadata;
-            # if metadata is a dict (rare), just lookup by key
-            return volume.metadata.get(key, "")
-        else:
-            # if metadata is a list (more common / correct IIIF spec), find the matching
-            # "label" attribute by key
-            meta_list = list(volume.metadata)
-            metadatum = filter(lambda m: m["label"] == key, meta_list)
-            try:
-                # filter() returns an iterator; try to retrieve the first matching entry's value
-                return next(metadatum).get("value", "") if metadatum else ""
-            except StopIteration:
-                return ""
+        if metadata_index is None:
+            metadata_index = self.index_metadata(volume)
+        return metadata_index.get(key, "")
+
+    @staticmethod
+    def index_metadata(volume):
+        """Map a volume's metadata labels to values.
+
+        If metadata is a dict (rare) it is used as is. If it is a list (more
+        common / correct IIIF spec), the first entry with each "label" wins."""
+        if isinstance(volume.metadata, dict):
+            return volume.metadata
+        metadata_index = {}
+        for metadatum in volume.metadata or []:
+            if "label" in metadatum:
+                metadata_index.setdefault(metadatum["label"], metadatum.get("value", ""))
+        return metadata_index
+
+    @staticmethod
+    def get_user_annotation_index(user, manifest):
+        """Count the user's annotations on each annotated canvas of the manifest.
+
+        :param user: Current user
+        :type user: apps.users.models.User
+        :param manifest: Manifest being read
+        :type manifest: apps.iiif.manifests.models.Manifest
+        :return: List of dicts for the annotations sidebar, in canvas order
+        :rtype: list
+        """
+        if not user.is_authenticated:
+            return []
+        counts = (
+            UserAnnotation.objects.filter(owner=user, canvas__manifest_id=manifest.id)
+            .values("canvas__position", "canvas__pid")
+            .annotate(Count("canvas__position"))
+            .order_by("canvas__position")
+        )
+        return [
+            {
+                "canvas__position": count["canvas__position"],
+                "canvas__manifest__label": manifest.label,
+                "canvas__pid": count["canvas__pid"],
+                "canvas__position__count": count["canvas__position__count"],
+            }
+            for count in counts
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        manifest = Manifest.objects.get(pid=kwargs["volume"])
+        manifest = Manifest.objects.select_related("image_server").get(
+            pid=kwargs["volume"]
+        )
         if "page" in kwargs:
             canvas = Canvas.objects.filter(pid=kwargs["page"]).first()
         else:
@@ -209,49 +249,34 @@ class PageDetail(TemplateView):
         context["page"] = canvas
         context["volume"] = manifest
         context["pagelink"] = manifest.image_server
-        context["collectionlink"] = Page.objects.type(CollectionsPage).first()
-        context["volumelink"] = Page.objects.type(VolumesPage).first()
-        context["user_annotation_page_count"] = (
-            UserAnnotation.objects.filter(owner_id=self.request.user.id)
-            .filter(canvas__id=canvas.id)
-            .count()
-        )
-        context["user_annotation_count"] = (
-            UserAnnotation.objects.filter(owner_id=self.request.user.id)
-            .filter(canvas__manifest__id=manifest.id)
-            .count()
-        )
-
-        user_annotation_index = UserAnnotation.objects.all()
+        context["collectionlink"] = landmark_page("collections")
+        context["volumelink"] = landmark_page("volumes")
 
-        user_annotation_index = user_annotation_index.filter(
-            canvas__manifest__label=manifest.label
+        # One grouped query gives the page, volume and per canvas counts.
+        user_annotation_index = self.get_user_annotation_index(
+            self.request.user, manifest
         )
-
-        user_annotation_index = user_annotation_index.filter(
-            owner_id=self.request.user.id
-        ).distinct()
-
-        user_annotation_index = (
-            user_annotation_index.values(
-                "canvas__position", "canvas__manifest__label", "canvas__pid"
-            )
-            .annotate(Count("canvas__position"))
-            .order_by("canvas__position")
+        context["user_annotation_page_count"] = sum(
+            count["canvas__position__count"]
+            for count in user_annotation_index
+            if canvas is not None and count["canvas__pid"] == canvas.pid
+        )
+        context["user_annotation_count"] = sum(
+            count["canvas__position__count"] for count in user_annotation_index
         )
-
         context["user_annotation_index"] = user_annotation_index
-        context["json_data"] = {"json_data": list(user_annotation_index)}
+        context["json_data"] = {"json_data": user_annotation_index}
 
         # add custom metadata from django settings to context
         if hasattr(settings, "CUSTOM_METADATA"):
             custom_metadata = {}
+            metadata_index = self.index_metadata(manifest)
             for key, metadata in settings.CUSTOM_METADATA.items():
                 # Extract multi flag
                 multi = metadata.get("multi", False)  # Default to False if not specified
 
                 # Attempt to get this manifest's value for each key
-                value = self.get_metadatum(manifest, key)
+                value = self.get_metadatum(manifest, key, metadata_index)
                 if value:
                     custom_metadata[key] = {"value": value, "multi": multi}
 
@@ -291,7 +316,7 @@ class ExportDownload(TemplateView):
         filename = kwargs["filename"]
         context["filename"] = filename
         # check to see if the file exists
-        if path.exists(JekyllSiteExport.get_zip_path(filename)):
+        if path.exists(JekyllSiteExport.get_zip_path(path.basename(filename))):
             context["file_exists"] = True
         else:
             context["file_exists"] = False
@@ -303,27 +328,27 @@ class ExportDownloadZip(View):
     """Django View for downloading the zipped up export."""
 
     def get(self, request, *args, **kwargs):
-        """[summary]
-
-        :param View: [description]
-        :type View: [type]
-        :param request: [description]
-        :type request: [type]
-        :return: [description]
-        :rtype: [type]
+        """Send the export's zip file without reading it into memory.
+
+        Range requests are supported so large downloads can be resumed, or the
+        file is handed to the web server, see `settings.DOWNLOAD_SENDFILE`.
+
+        :param request: Request for the export
+        :type request: django.http.HttpRequest
+        :raises Http404: If the export does not exist, e.g. it has been cleaned up.
+        :return: Response sending the zip file
+        :rtype: django.http.HttpResponseBase
         """
-        jekyll_export = JekyllSiteExport(
-            None,
-            "v2",
-            github_repo=None,
-            deep_zoom=False,
-            owners=[self.request.user.id],
-            user=self.request.user,
+        # Only files in the export directory can be downloaded.
+        zip_path = JekyllSiteExport.get_zip_path(path.basename(kwargs["filename"]))
+        if not path.isfile(zip_path):
+            raise Http404("Export not found")
+        return file_download_response(
+            request,
+            zip_path,
+            "jekyll_site_export.zip",
+            "application/x-zip-compressed",
         )
-        zip = jekyll_export.get_zip_file(kwargs["filename"])
-        resp = HttpResponse(zip, content_type="application/x-zip-compressed")
-        resp["Content-Disposition"] = "attachment; filename=jekyll_site_export.zip"
-        return resp
 
 
 class VolumeSearchView(ListView, FormMixin):
@@ -355,8 +380,13 @@ class VolumeSearchView(ListView, FormMixin):
     ]
     defaults = {"sort": "label_alphabetical", "display": "list", "per_page": "60"}
 
+    # form fields that do not change the facet buckets
+    non_filter_fields = ["q", "scope", "sort", "display", "per_page"]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # copy the class-level facets so the custom ones are only added to this instance
+        self.facets = list(self.facets)
         # pull additional facets from Elasticsearch
         if (
             settings
@@ -428,7 +458,63 @@ class VolumeSearchView(ListView, FormMixin):
             else []
         )
 
-        volumes_response = self.get_queryset().execute()
+        aggregations = self.get_aggregations()
+        context_data["form"].set_facets(aggregations["facets"])
+        if aggregations["dates"]:
+            context_data["form"].set_date(*aggregations["dates"])
+
+        # Attach start_canvas to each volume in the current page.
+        # Handle both: paginator page and raw list-like.
+        vol_page = context_data.get("volumes")
+
+        if vol_page is not None:
+            # Get the underlying sequence (Paginator Page vs list)
+            items = getattr(vol_page, "object_list", vol_page)
+
+            # ES hits should have a "pid"; collect them
+            pids = [getattr(v, "pid", None) for v in items if getattr(v, "pid", None)]
+
+            if pids:
+                # One query for every start canvas on the page: prefer an explicitly
+                # marked starting page, else the first by position.
+                start_canvases = {
+                    canvas.manifest.pid: canvas
+                    for canvas in Canvas.objects.filter(manifest__pid__in=pids)
+                    .select_related("manifest__image_server", "image_server")
+                    .order_by("manifest_id", "-is_starting_page", "position")
+                    .distinct("manifest_id")
+                }
+
+                for v in items:
+                    v.start_canvas = start_canvases.get(getattr(v, "pid", None))
+
+        return context_data
+
+    def get_aggregations(self):
+        """Facet buckets and the published date range for the current search.
+
+        Searches without a query, i.e. the unfiltered search page and filter-only
+        searches, are cached for `settings.SEARCH_FACET_CACHE_TIMEOUT` seconds.
+
+        :return: Dict with `facets`, a dict of buckets for each facet, and `dates`,
+            a (min, max) tuple or None
+        :rtype: dict
+        """
+        form = self.get_form()
+        cache_key = None
+        if form.is_valid() and not form.cleaned_data.get("q"):
+            cache_key = search_facets_cache_key(
+                {
+                    name: value
+                    for name, value in form.cleaned_data.items()
+                    if name not in self.non_filter_fields and value
+                }
+            )
+            aggregations = cache.get(cache_key)
+            if aggregations is not None:
+                return aggregations
+
+        volumes_response = self.get_aggregation_search().execute()
         # populate a dict with "buckets" of extant categories for each facet
         facets = {}
         for facet, _ in self.facets:
@@ -437,15 +523,14 @@ class VolumeSearchView(ListView, FormMixin):
                 # use "inner" to handle NestedFacet
                 if hasattr(aggs, "inner"):
                     aggs = getattr(aggs, "inner")
-                facets.update(
-                    {
-                        # get buckets array from each facet in the aggregations dict
-                        facet: getattr(aggs, "buckets"),
-                    }
-                )
-        context_data["form"].set_facets(facets)
-
-        # get min and max date aggregations and set on form
+                # get buckets array from each facet in the aggregations dict
+                facets[facet] = [
+                    bucket.to_dict() if hasattr(bucket, "to_dict") else dict(bucket)
+                    for bucket in getattr(aggs, "buckets")
+                ]
+
+        # get min and max date aggregations
+        dates = None
         if hasattr(volumes_response.aggregations, "min_date"):
             min_date = getattr(volumes_response.aggregations, "min_date")
             if hasattr(volumes_response.aggregations, "max_date"):
@@ -453,45 +538,37 @@ class VolumeSearchView(ListView, FormMixin):
                 if hasattr(min_date, "value_as_string") and hasattr(
                     max_date, "value_as_string"
                 ):
-                    context_data["form"].set_date(
+                    dates = (
                         getattr(min_date, "value_as_string"),
                         getattr(max_date, "value_as_string"),
                     )
 
-        # Attach start_canvas to each volume in the current page.
-        # Handle both: paginator page and raw list-like.
-        vol_page = context_data.get("volumes")
+        aggregations = {"facets": facets, "dates": dates}
+        if cache_key:
+            cache.set(cache_key, aggregations, settings.SEARCH_FACET_CACHE_TIMEOUT)
+        return aggregations
 
-        if vol_page is not None:
-            # Get the underlying sequence (Paginator Page vs list)
-            items = getattr(vol_page, "object_list", vol_page)
+    def get_aggregation_search(self):
+        """Search for the facet buckets and published date range of the current search.
 
-            # ES hits should have a "pid"; collect them
-            pids = [getattr(v, "pid", None) for v in items if getattr(v, "pid", None)]
+        Kept apart from :meth:`get_queryset` so paginating the results does not
+        run the aggregations, which are cached by :meth:`get_aggregations`.
 
-            if pids:
-                # Use the default reverse name: canvas_set
-                manifests = {
-                    m.pid: m
-                    for m in Manifest.objects
-                            .filter(pid__in=pids)
-                            .prefetch_related("canvas_set")
-                }
+        :return: Search returning only aggregations
+        :rtype: elasticsearch_dsl.Search
+        """
+        # no hits, so no sorting or pagination
+        volumes = self.get_queryset().extra(size=0).sort()
 
-                for v in items:
-                    pid = getattr(v, "pid", None)
-                    m = manifests.get(pid)
-                    if not m:
-                        v.start_canvas = None
-                        continue
-
-                    # Prefer an explicitly marked starting page, else first by position
-                    start = m.canvas_set.filter(is_starting_page=True).order_by("position").first()
-                    if start is None:
-                        start = m.canvas_set.order_by("position").first()
-                    v.start_canvas = start
-                    
-        return context_data
+        # create aggregation buckets for facet fields
+        for facet_name, facet in self.facets:
+            volumes.aggs.bucket(facet_name, facet.get_aggregation())
+
+        # get min and max date published values
+        volumes.aggs.metric("min_date", "min", field="date_earliest")
+        volumes.aggs.metric("max_date", "max", field="date_latest")
+
+        return volumes
 
     def get_queryset(self):
         form = self.get_form()
@@ -632,14 +709,6 @@ class VolumeSearchView(ListView, FormMixin):
                         query=Q("terms", **{f"metadata.{key}": meta_filter}),
                     )
 
-        # create aggregation buckets for facet fields
-        for facet_name, facet in self.facets:
-            volumes.aggs.bucket(facet_name, facet.get_aggregation())
-
-        # get min and max date published values
-        volumes.aggs.metric("min_date", "min", field="date_earliest")
-        volumes.aggs.metric("max_date", "max", field="date_latest")
-
         # sort
         volumes = volumes.sort(form_data["sort"])
 
@@ -0,0 +1,119 @@
+""" Utility functions for sending files as downloads. """
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """ Parse a single `Range: bytes=start-end` header.
+
+    Multiple ranges are not supported and, like a missing header, mean the
+    whole file should be sent.
+
+    :param header: Value of the Range header
+    :type header: str or None
+    :param size: Size of the file in bytes
+    :type size: int
+    :return: Tuple of the first and last byte, None to send the whole file or
+        False if the range cannot be satisfied
+    :rtype: tuple or None or bool
+    """
+    match = RANGE_RE.match((header or "").strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # A suffix range, e.g. bytes=-500 for the last 500 bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        return False
+    return first, last
+
+
+def iter_file_range(file, first, last, chunk_size=CHUNK_SIZE):
+    """ Read bytes `first` to `last`, inclusive, in chunks and close the file. """
+    try:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            data = file.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def file_download_response(request, file_path, filename, content_type):
+    """ Send a file as an attachment without reading it into memory.
+
+    With `settings.DOWNLOAD_SENDFILE` set to "x-accel-redirect" or "x-sendfile"
+    the web server sends the file. Otherwise it is streamed from Django, with
+    support for single range requests so interrupted downloads can resume.
+
+    :param request: Request for the file
+    :type request: django.http.HttpRequest
+    :param file_path: Path to the file
+    :type file_path: str
+    :param filename: Name to save the download as
+    :type filename: str
+    :param content_type: Content type of the file
+    :type content_type: str
+    :return: Response sending the file
+    :rtype: django.http.HttpResponseBase
+    """
+    stat = os.stat(file_path)
+    etag = quote_etag(f"{int(stat.st_mtime)}-{stat.st_size}")
+    disposition = f"attachment; filename={filename}"
+
+    if settings.DOWNLOAD_SENDFILE == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = escape_uri_path(
+            settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + os.path.basename(file_path)
+        )
+    elif settings.DOWNLOAD_SENDFILE == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = file_path
+    else:
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        # A stale If-Range validator means the file changed, so send all of it.
+        if if_range in (None, etag) or parse_http_date_safe(if_range) == int(stat.st_mtime):
+            byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(file_path, "rb"), content_type=content_type)
+        else:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(open(file_path, "rb"), first, last),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = str(last - first + 1)
+            response["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Disposition"] = disposition
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
@@ -1,16 +1,58 @@
 """ Utility functions for fetching remote data. """
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import getpid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 logging.getLogger("urllib3").setLevel(logging.ERROR)
 
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """ Shared `requests.Session` for this process.
+
+    Connections are pooled per host and idempotent requests are retried with
+    exponential backoff on connection errors and 429/5xx responses. A new
+    session is made after a fork so workers never share sockets.
+    """
+    global _session, _session_pid  # pylint: disable = global-statement
+    with _session_lock:
+        if _session is None or _session_pid != getpid():
+            retries = Retry(
+                total=settings.HTTP_REQUEST_RETRIES,
+                backoff_factor=settings.HTTP_REQUEST_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=settings.HTTP_POOL_SIZE,
+                pool_maxsize=settings.HTTP_POOL_SIZE,
+                max_retries=retries,
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_pid = getpid()
+        return _session
+
+
 def fetch_url(url, timeout=30, data_format='json', verbosity=1):
     """ Given a url, this function returns the data."""
     data = None
     try:
-        resp = requests.get(url, timeout=timeout, verify=True)
+        resp = get_session().get(url, timeout=timeout, verify=True)
     except requests.exceptions.Timeout as err:
         if verbosity > 2:
             logger.warning('Connection timeoutout for {}'.format(url))
@@ -39,30 +81,55 @@ def fetch_url(url, timeout=30, data_format='json', verbosity=1):
         data = resp.content
     return data
 
-# Not sure this is really needed for us, but not a bad thing to keep around.
-# def rate_limited(max_per_second):
-#     """ Throttle remote API calls by limiting api calls per seconds """
-#     lock = threading.Lock()
-#     min_interval = 1.0 / max_per_second
+class RateLimiter:
+    """ Throttle remote calls, across threads, to at most `max_per_second`. """
+    def __init__(self, max_per_second=None):
+        self.min_interval = 1.0 / max_per_second if max_per_second else 0
+        self.lock = threading.Lock()
+        self.next_call = time.monotonic()
+
+    def wait(self):
+        """ Block until another call is allowed. """
+        if not self.min_interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.min_interval
+        if wait_for > 0:
+            time.sleep(wait_for)
 
-#     def decorate(func):
-#         last_time_called = time.perf_counter()
 
-#         @wraps(func)
-#         def rate_limited_function(*args, **kwargs):
-#             lock.acquire()
-#             nonlocal last_time_called
-#             elapsed = time.perf_counter() - last_time_called
-#             left_to_wait = min_interval - elapsed
+def fetch_concurrently(fetch, items, max_workers=None, max_per_second=None):
+    """ Call `fetch` for each item on a bounded pool of threads.
 
-#             if left_to_wait > 0:
-#                 time.sleep(left_to_wait)
+    Calls are rate limited. An item whose call raises gets `None`. HTTP
+    requests made with :func:`get_session`, as :func:`fetch_url` does, are
+    already retried with backoff, so failed calls are not retried here.
 
-#             ret = func(*args, **kwargs)
-#             last_time_called = time.perf_counter()
-#             lock.release()
-#             return ret
+    `fetch` should not touch the database; load what it needs first, e.g.
+    with `select_related`.
 
-#         return rate_limited_function
+    :param fetch: Function taking one item
+    :type fetch: callable
+    :param items: Items to fetch
+    :type items: iterable
+    :param max_workers: Concurrent calls, defaults to `settings.FETCH_MAX_WORKERS`
+    :type max_workers: int, optional
+    :param max_per_second: Rate limit, defaults to `settings.FETCH_MAX_PER_SECOND`
+    :type max_per_second: float, optional
+    :return: Results in the same order as `items`
+    :rtype: list
+    """
+    limiter = RateLimiter(max_per_second or settings.FETCH_MAX_PER_SECOND)
+
+    def fetch_one(item):
+        limiter.wait()
+        try:
+            return fetch(item)
+        except Exception as err: # pylint: disable = broad-except
+            logger.warning('Fetching {} failed. ({})'.format(item, str(err)))
+            return None
 
-#     return decorate
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=max_workers or settings.FETCH_MAX_WORKERS) as executor:
+        return list(executor.map(fetch_one, items))
@@ -1,7 +1,8 @@
 from apps.utils.noid import encode_noid
 from time import time
 from django.test import TestCase
-from .fetch import fetch_url
+from .download import parse_range
+from .fetch import fetch_concurrently, fetch_url, get_session
 from .noid import _digits, decode_noid, encode_noid
 import httpretty
 import json
@@ -43,6 +44,48 @@ class TestUtils(TestCase):
             assert 'bad content' in cm.output[0]
             assert 'WARNING' in cm.output[0]
 
+    def test_session_is_reused(self):
+        assert get_session() is get_session()
+
+    @httpretty.activate
+    def test_retrying_server_errors(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            'http://readux.org',
+            responses=[
+                httpretty.Response(body='busy', status=503),
+                httpretty.Response(body='{"key": "value"}', status=200),
+            ]
+        )
+        response = fetch_url('http://readux.org')
+        assert response == {'key': 'value'}
+        assert len(httpretty.latest_requests()) == 2
+
+    def test_fetching_concurrently(self):
+        attempts = {}
+
+        def flaky(item):
+            attempts[item] = attempts.get(item, 0) + 1
+            if item == 'broken':
+                raise ConnectionError('never works')
+            return item.upper()
+
+        items = ['one', 'broken', 'two']
+        with self.assertLogs('apps.utils', level='WARN'):
+            results = fetch_concurrently(flaky, items, max_workers=2)
+        assert results == ['ONE', None, 'TWO']
+        # Retrying is left to the HTTP session.
+        assert attempts['broken'] == 1
+
+    def test_parsing_ranges(self):
+        assert parse_range(None, 100) is None
+        assert parse_range('bytes=0-9', 100) == (0, 9)
+        assert parse_range('bytes=90-', 100) == (90, 99)
+        assert parse_range('bytes=90-200', 100) == (90, 99)
+        assert parse_range('bytes=-10', 100) == (90, 99)
+        assert parse_range('bytes=0-1,5-6', 100) is None
+        assert parse_range('bytes=100-', 100) is False
+
     def test_digits_with_empty_sting(self):
         assert _digits('') == []
 
@@ -2,6 +2,8 @@
 Base settings to build other settings files upon.
 """
 
+import os
+import tempfile
 import environ
 
 ROOT_DIR = environ.Path(__file__) - 3  # (readux/config/settings/base.py - 3 = /)
@@ -328,6 +330,9 @@ SERIALIZATION_MODULES = {
     "annotation_v2": "apps.iiif.serializers.v2.annotation",
 }
 
+# Number of objects fetched per query when streaming large IIIF documents.
+IIIF_STREAM_CHUNK_SIZE = env.int("IIIF_STREAM_CHUNK_SIZE", default=2000)
+
 WAGTAIL_SITE_NAME = "Readux"
 WAGTAILADMIN_BASE_URL = "https://localhost"
 
@@ -340,6 +345,25 @@ ELASTICSEARCH_DSL = {
     "default": {"hosts": env("ELASTICSEARCH_URL", default="http://localhost:9200")},
 }
 
+# Seconds a rendered IIIF manifest stays cached. Saving the manifest or one of its
+# canvases clears it sooner.
+MANIFEST_CACHE_TIMEOUT = env.int("MANIFEST_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# Seconds the facets of a search without a query stay cached. Indexing a manifest
+# clears them sooner.
+SEARCH_FACET_CACHE_TIMEOUT = env.int("SEARCH_FACET_CACHE_TIMEOUT", default=60 * 5)
+
+# Seconds a user's annotation counts per canvas stay cached, 0 to always count.
+# Saving or deleting one of the user's annotations clears them sooner.
+ANNOTATION_COUNT_CACHE_TIMEOUT = env.int("ANNOTATION_COUNT_CACHE_TIMEOUT", default=60 * 60)
+
+# Seconds each process reuses the active custom style's CSS while its fingerprint
+# matches the one in the shared cache, which saving or deleting a style clears.
+CUSTOM_STYLE_PROCESS_TIMEOUT = env.int("CUSTOM_STYLE_PROCESS_TIMEOUT", default=60)
+
+# Seconds to wait, coalescing further user annotation edits, before reindexing a manifest.
+ANNOTATION_REINDEX_WINDOW = env.int("ANNOTATION_REINDEX_WINDOW", default=30)
+
 SOCIALACCOUNT_STORE_TOKENS = True
 
 # django-summernote rich text editor settings. see https://github.com/hackerwins/django-summernote
@@ -351,3 +375,51 @@ SUMMERNOTE_THEME = "lite"
 
 # Background image URL configuration
 BACKGROUND_IMAGE_URL = "/static/images/bg.jpg"  # Background image for the homepage; when it doesn't exist, it will fall back to a default solid color
+
+# OCR
+# ------------------------------------------------------------------------------
+# Number of OCR annotations written per INSERT when adding OCR to a canvas.
+OCR_ANNOTATION_BATCH_SIZE = env.int("OCR_ANNOTATION_BATCH_SIZE", default=1000)
+
+# Remote fetching
+# ------------------------------------------------------------------------------
+# Retries, with exponential backoff starting at HTTP_REQUEST_BACKOFF seconds, for
+# failed remote requests, and connections kept open per host.
+HTTP_REQUEST_RETRIES = env.int("HTTP_REQUEST_RETRIES", default=3)
+HTTP_REQUEST_BACKOFF = env.float("HTTP_REQUEST_BACKOFF", default=0.5)
+HTTP_POOL_SIZE = env.int("HTTP_POOL_SIZE", default=10)
+# Concurrent fetches, and fetches per second, when pulling OCR for a whole volume.
+FETCH_MAX_WORKERS = env.int("FETCH_MAX_WORKERS", default=8)
+FETCH_MAX_PER_SECOND = env.float("FETCH_MAX_PER_SECOND", default=20)
+# Seconds a canvas' IIIF image info (info.json) stays cached. Tests default to 0,
+# which turns the cache off.
+IMAGE_INFO_CACHE_TIMEOUT = env.int(
+    "IMAGE_INFO_CACHE_TIMEOUT", default=0 if DJANGO_ENV == "test" else 60 * 60 * 24
+)
+
+# Version info
+# ------------------------------------------------------------------------------
+# Branch and commit shown on non-production sites, read once per process from
+# this file when it exists (see `manage.py version_info`), or else from Git.
+VERSION_INFO_FILE = env("VERSION_INFO_FILE", default=str(ROOT_DIR.path("version.json")))
+# Set to False to never probe Git, e.g. when deploying without the .git directory.
+VERSION_INFO_FROM_GIT = env.bool("VERSION_INFO_FROM_GIT", default=True)
+
+# Downloads
+# ------------------------------------------------------------------------------
+# Leave empty to stream export downloads from Django, or set to "x-accel-redirect"
+# (nginx) or "x-sendfile" (Apache, lighttpd) to have the web server send them.
+DOWNLOAD_SENDFILE = env("DOWNLOAD_SENDFILE", default="")
+# Internal nginx location aliased to the export directory, for "x-accel-redirect".
+DOWNLOAD_ACCEL_PREFIX = env("DOWNLOAD_ACCEL_PREFIX", default="/export-downloads/")
+
+# Exports
+# ------------------------------------------------------------------------------
+# Generated Jekyll sites are kept here, and reused for identical exports, for
+# EXPORT_CACHE_TIMEOUT seconds. Tests default to 0, which turns the cache off.
+EXPORT_CACHE_DIR = env(
+    "EXPORT_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "readux-export-cache")
+)
+EXPORT_CACHE_TIMEOUT = env.int(
+    "EXPORT_CACHE_TIMEOUT", default=0 if DJANGO_ENV == "test" else 7 * 24 * 60 * 60
+)
@@ -38,6 +38,7 @@ urlpatterns = [
     re_path(r"^", include("apps.iiif.annotations.urls")),
     re_path(r"^", include("apps.iiif.kollections.urls")),
     re_path(r"^", include("apps.export.urls")),
+    re_path(r"^", include("apps.custom_styles.urls")),
     path(
         "accounts/", include("allauth.urls")
     ),  # re_path(r'^', include('readux.collection.urls')),